@@ -1,8 +1,16 @@
+import avvio  # first, so --profile-startup times every import below
+avvio.attiva()
+
 import ctypes
+import functools
+import multiprocessing
 import os
 import sys
 import threading
+import time
 import tkinter as tk
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import filedialog
 
 import customtkinter as ctk
@@ -17,6 +25,10 @@ STRINGS = {
         "clear_btn":             "Clear all",
         "add_tooltip":           "Select images to process\n(PNG, JPG, SVG)",
         "clear_tooltip":         "Remove all files from the list",
+        "add_folder_btn":        "+ Folder",
+        "add_folder_tooltip":    "Add every image in a folder and its subfolders\n"
+                                 "(scanned in the background; files found while\n"
+                                 "processing are processed too)",
         "mode_label":            "Mode",
         "mode_format":           "Format Conversion",
         "mode_ico":              "Convert ICO",
@@ -37,15 +49,21 @@ STRINGS = {
         "remove_bg_tooltip":     "Use AI (rembg) to remove background",
         "model_label":           "Model:",
         "model_tooltip":         "Choose AI model for background removal",
+        "provider_tooltip":      "Run the model on the CPU or on a CUDA GPU\n(GPU is enabled when one is detected)",
         "crop_square":           "2. Crop to square",
         "crop_square_tooltip":   "Center image on transparent square background",
         "convert_ico":           "3. Convert to ICO  (otherwise save PNG)",
         "convert_ico_tooltip":   "Convert to multi-frame ICO\n(If no, save PNG only)",
+        "save_nobg":             "4. Also save full-size _nobg.png",
+        "save_nobg_tooltip":     "Keep the background-removed PNG at the original resolution\n"
+                                 "(If no, background removal runs at icon resolution: faster)",
         "output_dest_label":     "Output destination",
         "dest_same":             "Same folder as source file",
         "dest_custom":           "Custom folder:",
         "choose_btn":            "Choose...",
         "choose_tooltip":        "Select output folder",
+        "skip_unchanged":        "Skip unchanged files",
+        "skip_unchanged_tooltip": "Skip files already processed with the same options\n(inputs and outputs unchanged since the last run)",
         "process_btn":           "PROCESS",
         "process_tooltip":       "Start processing selected files",
         "log_label":             "Log",
@@ -53,16 +71,25 @@ STRINGS = {
         "preview_orig":          "Original",
         "preview_result":        "Result",
         "preview_select":        "← Select\na file",
+        "preview_loading":       "Loading preview…",
         "output_fixed_favicon":  "3.  Fixed output: ICO + PNG + manifest.json",
         "output_fixed_appstore": "3.  Fixed output: PNG at store dimensions",
         "transparency_yes":      "transparency ✓",
         "transparency_no":       "no transparency",
         "distorted_info":        "⚠ distorted → 512×512",
         "bg_removed_preview":    "— bg removal not in preview",
+        "bg_preview_running":    "— removing background…",
+        "bg_preview_live":       "— bg removed (low-res preview)",
         "no_files_log":          "[!] No files in list.",
         "invalid_dir_log":       "[ERROR] Invalid output folder.",
         "done_log":              "─── Done ───",
+        "progress_eta":          "{done}/{total}  ·  {rate:.1f} s/file  ·  ETA {eta}",
+        "progress_started":      "{done}/{total}  ·  {file}",
+        "progress_finished":     "{total} files in {elapsed}",
         "open_images_title":     "Select images",
+        "open_folder_title":     "Select a folder of images",
+        "scan_started_log":      "[...] Scanning {folder}",
+        "scan_done_log":         "[OK] {n} images found in {folder}",
         "choose_dir_title":      "Choose output folder",
         "images_types_label":    "Images",
         # Model descriptions
@@ -72,6 +99,7 @@ STRINGS = {
         "desc_u2net":                 "Fast, ideal for large non-critical batches",
         "desc_u2net_human_seg":       "Optimized for human subjects",
         "desc_isnet-anime":           "For illustrations, cartoons and anime",
+        "desc_int8":                  "INT8 (CPU, faster) — {desc}",
     },
     "it": {
         "images_label":          "Immagini",
@@ -79,6 +107,10 @@ STRINGS = {
         "clear_btn":             "Pulisci tutto",
         "add_tooltip":           "Seleziona immagini da elaborare\n(PNG, JPG, SVG)",
         "clear_tooltip":         "Rimuovi tutti i file dalla lista",
+        "add_folder_btn":        "+ Cartella",
+        "add_folder_tooltip":    "Aggiungi tutte le immagini di una cartella e delle sottocartelle\n"
+                                 "(scansione in background; i file trovati durante\n"
+                                 "l'elaborazione vengono elaborati anch'essi)",
         "mode_label":            "Modalità",
         "mode_format":           "Format Conversion",
         "mode_ico":              "Converti ICO",
@@ -99,15 +131,21 @@ STRINGS = {
         "remove_bg_tooltip":     "Usa AI (rembg) per rimuovere lo sfondo",
         "model_label":           "Modello:",
         "model_tooltip":         "Scegli il modello AI per rimozione sfondo",
+        "provider_tooltip":      "Esegui il modello su CPU o su GPU CUDA\n(GPU attiva se ne viene rilevata una)",
         "crop_square":           "2. Ritaglia a quadrato",
         "crop_square_tooltip":   "Centra l'immagine su sfondo trasparente quadrato",
         "convert_ico":           "3. Converti in ICO  (altrimenti salva PNG)",
         "convert_ico_tooltip":   "Converti in ICO multi-frame\n(Se no, salva solo PNG)",
+        "save_nobg":             "4. Salva anche _nobg.png a piena risoluzione",
+        "save_nobg_tooltip":     "Conserva il PNG senza sfondo alla risoluzione originale\n"
+                                 "(Se no, la rimozione sfondo lavora alla risoluzione dell'icona: più veloce)",
         "output_dest_label":     "Destinazione output",
         "dest_same":             "Stessa cartella del file",
         "dest_custom":           "Cartella personalizzata:",
         "choose_btn":            "Scegli...",
         "choose_tooltip":        "Seleziona la cartella di output",
+        "skip_unchanged":        "Salta i file invariati",
+        "skip_unchanged_tooltip": "Salta i file già elaborati con le stesse opzioni\n(input e output invariati dall'ultima esecuzione)",
         "process_btn":           "PROCESSA",
         "process_tooltip":       "Avvia l'elaborazione dei file selezionati",
         "log_label":             "Log",
@@ -115,16 +153,25 @@ STRINGS = {
         "preview_orig":          "Originale",
         "preview_result":        "Risultato",
         "preview_select":        "← Seleziona\nun file",
+        "preview_loading":       "Caricamento anteprima…",
         "output_fixed_favicon":  "3.  Output fisso: ICO + PNG + manifest.json",
         "output_fixed_appstore": "3.  Output fisso: PNG nelle dimensioni store",
         "transparency_yes":      "trasparenza ✓",
         "transparency_no":       "no trasparenza",
         "distorted_info":        "⚠ distorta → 512×512",
         "bg_removed_preview":    "— sfondo rimosso non in preview",
+        "bg_preview_running":    "— rimozione sfondo…",
+        "bg_preview_live":       "— sfondo rimosso (anteprima a bassa ris.)",
         "no_files_log":          "[!] Nessun file in lista.",
         "invalid_dir_log":       "[ERRORE] Cartella di output non valida.",
         "done_log":              "─── Completato ───",
+        "progress_eta":          "{done}/{total}  ·  {rate:.1f} s/file  ·  fine tra {eta}",
+        "progress_started":      "{done}/{total}  ·  {file}",
+        "progress_finished":     "{total} file in {elapsed}",
         "open_images_title":     "Seleziona immagini",
+        "open_folder_title":     "Seleziona una cartella di immagini",
+        "scan_started_log":      "[...] Scansione di {folder}",
+        "scan_done_log":         "[OK] {n} immagini trovate in {folder}",
         "choose_dir_title":      "Scegli cartella di output",
         "images_types_label":    "Immagini",
         # Descrizioni modelli
@@ -134,6 +181,7 @@ STRINGS = {
         "desc_u2net":                 "Veloce, ideale per batch grandi non critici",
         "desc_u2net_human_seg":       "Ottimizzato per soggetti umani",
         "desc_isnet-anime":           "Per illustrazioni, cartoon e anime",
+        "desc_int8":                  "INT8 (CPU, più veloce) — {desc}",
     },
 }
 
@@ -143,12 +191,112 @@ def _t(key: str) -> str:
     return STRINGS.get(_lang, STRINGS["en"]).get(key, key)
 
 
+def _desc_modello(modello: str) -> str:
+    """Description of a model; INT8 variants reuse the one of their base model."""
+    if modello.endswith(SUFFISSO_INT8):
+        return _t("desc_int8").format(desc=_t(f"desc_{modello.removesuffix(SUFFISSO_INT8)}"))
+    return _t(f"desc_{modello}")
+
+
 def _resource_path(name: str) -> str:
     """Resolves resource path both in script mode and inside PyInstaller exe."""
     base = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
     return os.path.join(base, name)
 
 
+@functools.lru_cache(maxsize=8)
+def _scacchiera(w: int, h: int, tile: int = 8):
+    """Checkerboard shown behind transparent previews, built once per size."""
+    import numpy as np
+    from PIL import Image
+    celle = (np.arange(h)[:, None] // tile + np.arange(w)[None, :] // tile) % 2
+    return Image.fromarray(np.where(celle, 160, 200).astype(np.uint8)).convert('RGB')
+
+
+class ListaFile:
+    """Insertion-ordered set of paths: add, remove and membership are O(1)
+    amortized, positional lookups (rows of the virtualized list) O(log n).
+
+    Removed paths leave a tombstone in the order list; a Fenwick tree counting
+    the live slots maps a row number to its slot without rebuilding anything.
+    The list is compacted once tombstones outnumber the live paths.
+    """
+    COMPATTA_MIN = 64  # tombstones tolerated regardless of the list size
+
+    def __init__(self):
+        self.svuota()
+
+    def __len__(self):
+        return len(self._slot)
+
+    def __contains__(self, path: str):
+        return path in self._slot
+
+    def __iter__(self):
+        return (path for path in self._ordine if path is not None)
+
+    def __getitem__(self, indice: int) -> str:
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError(indice)
+        # descend the tree to the slot holding the (indice + 1)-th live path
+        pos, resto = 0, indice + 1
+        passo = 1 << (len(self._albero) - 1).bit_length()
+        while passo:
+            if pos + passo < len(self._albero) and self._albero[pos + passo] < resto:
+                pos += passo
+                resto -= self._albero[pos]
+            passo >>= 1
+        return self._ordine[pos]
+
+    def _vivi_prima(self, n: int) -> int:
+        """Live paths among the first n slots."""
+        totale = 0
+        while n > 0:
+            totale += self._albero[n]
+            n -= n & -n
+        return totale
+
+    def aggiungi(self, path: str) -> bool:
+        """Append path unless already present; returns whether it was added."""
+        if path in self._slot:
+            return False
+        self._slot[path] = len(self._ordine)
+        self._ordine.append(path)
+        n = len(self._ordine)
+        self._albero.append(1 + self._vivi_prima(n - 1) - self._vivi_prima(n - (n & -n)))
+        return True
+
+    def rimuovi(self, path: str):
+        slot = self._slot.pop(path)
+        self._ordine[slot] = None
+        i = slot + 1
+        while i < len(self._albero):
+            self._albero[i] -= 1
+            i += i & -i
+        if len(self._ordine) - len(self._slot) > max(len(self._slot), self.COMPATTA_MIN):
+            self._compatta()
+
+    def _compatta(self):
+        vivi = [path for path in self._ordine if path is not None]
+        self._ordine = vivi
+        self._slot = {path: i for i, path in enumerate(vivi)}
+        self._albero = [0] + [1] * len(vivi)
+        for i in range(1, len(self._albero)):
+            j = i + (i & -i)
+            if j < len(self._albero):
+                self._albero[j] += self._albero[i]
+
+    def svuota(self):
+        self._slot: dict[str, int] = {}        # path -> its slot in _ordine
+        self._ordine: list[str | None] = []    # slots in insertion order, None = removed
+        self._albero: list[int] = [0]          # Fenwick tree (1-based) of the live slots
+
+    def primo(self) -> str | None:
+        return self[0] if self._slot else None
+
+
 class Tooltip:
     """Creates a popup tooltip on mouse hover with delay."""
     def __init__(self, widget, text):
@@ -202,7 +350,7 @@ class Tooltip:
         self._showing = False
 
 
-from core import elabora_file, SUPPORTED_EXT, MODELLI_REMBG, MODELLO_DEFAULT
+from core import elabora_batch, precarica_modello, precarica_moduli, capacita, anteprima_sfondo, libera_pool, SUPPORTED_EXT, MODELLI_REMBG, MODELLO_DEFAULT, SUFFISSO_INT8
 
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
@@ -217,12 +365,32 @@ class App(ctk.CTk):
         self.geometry("1250x700")
         self.minsize(1100, 650)
         self.resizable(True, True)
-        self._file_list: list[str] = []
+        self._file_list = ListaFile()
+        self._righe_file = []         # canvas items (background, name, ✕) of the visible rows
         self._selected_file: str | None = None
         self._preview_orig_photo = None
         self._preview_result_photo = None
         self._img_orig_pil = None
         self._img_result_pil = None
+        self._proxy = None            # (file key, downscaled RGBA, original size) of the selected file
+        self._cache_preview = OrderedDict()   # file key (path, mtime, size) -> (proxy, original size)
+        self._richiesta_preview = 0   # bumped on every preview request; older results are dropped
+        self._pool_preview = ThreadPoolExecutor(1, thread_name_prefix="preview")
+        self._sfondo_preview = None   # (file key, model, low-res RGBA or None if the model is not downloaded)
+        self._richiesta_sfondo = 0
+        self._sfondo_in_corso = None  # (file key, model) waiting for the debounce timer or running
+        self._timer_sfondo = None
+        self._pool_sfondo = ThreadPoolExecutor(1, thread_name_prefix="bg-preview")
+        self._disegnati = {}          # photo_attr -> (image, max_w, max_h) currently on the canvas
+        self._log_coda = deque(maxlen=self.LOG_MAX_RIGHE - 1)  # one line left for the "skipped" note
+        self._log_persi = 0
+        self._log_pianificato = False
+        self._log_lock = threading.Lock()
+        self._avanzamento = None      # progress of the running batch, fed by core events
+        self._avanzamento_pianificato = False
+        self._coda_scansione = threading.Condition()  # guards the two fields below
+        self._scansioni = 0           # folder scans still running
+        self._in_coda = None          # files found by scans during a run (None = no run)
         self._tooltips: list[tuple[Tooltip, str]] = []
         self._lang_btns: dict[str, ctk.CTkButton] = {}
         self._build_ui()
@@ -278,11 +446,16 @@ class App(ctk.CTk):
         btn_row = ctk.CTkFrame(frm_lista, fg_color="transparent")
         btn_row.grid(row=1, column=0, padx=8, pady=(0, 4), sticky="w")
 
-        self.btn_aggiungi = ctk.CTkButton(btn_row, text="", width=110,
+        self.btn_aggiungi = ctk.CTkButton(btn_row, text="", width=80,
                                            command=self._aggiungi)
         self.btn_aggiungi.pack(side="left", padx=(4, 6))
         self._tt(self.btn_aggiungi, "add_tooltip")
 
+        self.btn_cartella = ctk.CTkButton(btn_row, text="", width=90,
+                                           command=self._aggiungi_cartella)
+        self.btn_cartella.pack(side="left", padx=(0, 6))
+        self._tt(self.btn_cartella, "add_folder_tooltip")
+
         self.btn_pulisci = ctk.CTkButton(btn_row, text="", width=110,
                                           fg_color=("gray70", "gray30"), hover_color=("gray60", "gray25"),
                                           text_color=("gray10", "gray90"),
@@ -298,22 +471,19 @@ class App(ctk.CTk):
         frm_files_box.grid_columnconfigure(0, weight=1)
         frm_files_box.grid_rowconfigure(0, weight=1)
 
+        # rows are drawn directly on the canvas, only those in view (see _disegna_righe)
         self._canvas_files = tk.Canvas(
-            frm_files_box, bg=self._canvas_bg, highlightthickness=0)
+            frm_files_box, bg=self._canvas_bg, highlightthickness=0,
+            yscrollincrement=self.ALTEZZA_RIGA)
         self._canvas_files.grid(row=0, column=0, padx=4, pady=4, sticky="nsew")
+        self._font_file = ctk.CTkFont(size=12)
+        self._colore_testo = ctk.ThemeManager.theme["CTkLabel"]["text_color"][1 if _is_dark else 0]
+        self._colore_croce = "gray70" if _is_dark else "gray30"
+        self._colore_selezione = "gray30" if _is_dark else "gray75"
 
-        self.scroll_files = tk.Frame(self._canvas_files, bg=self._canvas_bg)
-        self._cw = self._canvas_files.create_window(0, 0, window=self.scroll_files, anchor="nw")
-
-        self.scroll_files.bind("<Configure>", lambda e: self._canvas_files.config(
-            scrollregion=self._canvas_files.bbox("all")))
-        self._canvas_files.bind("<Configure>", lambda e: self._canvas_files.itemconfig(
-            self._cw, width=e.width))
-
-        self._canvas_files.bind("<MouseWheel>", lambda e: self._canvas_files.yview_scroll(
-            int(-1 * (e.delta / 120)), "units"))
-        self.scroll_files.bind("<MouseWheel>", lambda e: self._canvas_files.yview_scroll(
-            int(-1 * (e.delta / 120)), "units"))
+        self._canvas_files.bind("<Configure>", lambda e: self._render_file_list())
+        self._canvas_files.bind("<Button-1>", self._click_file)
+        self._canvas_files.bind("<MouseWheel>", self._scorri_file)
 
         # ── mode (main content center) ─────────────────────────────────────────
         frm_mod = ctk.CTkFrame(self)
@@ -413,14 +583,19 @@ class App(ctk.CTk):
         self.var_bg  = tk.BooleanVar(value=True)
         self.var_sq  = tk.BooleanVar(value=True)
         self.var_ico = tk.BooleanVar(value=True)
+        self.var_nobg = tk.BooleanVar(value=True)
         self.var_modello = tk.StringVar(value=MODELLO_DEFAULT)
+        self.var_provider = tk.StringVar(value="CPU")
+        self._gpu = False  # set once the capability probes have run
+        self._int8 = True
 
         bg_row = ctk.CTkFrame(frm_op, fg_color="transparent")
         bg_row.grid(row=1, column=0, padx=8, pady=3, sticky="w")
 
         self.chk_bg = ctk.CTkCheckBox(bg_row, text="",
                                        variable=self.var_bg,
-                                       command=lambda: (self._toggle_modello(), self._aggiorna_preview()))
+                                       command=lambda: (self._toggle_modello(), self._aggiorna_preview(),
+                                                        self._precarica_modello()))
         self.chk_bg.pack(side="left", padx=(4, 14))
         self._tt(self.chk_bg, "remove_bg_tooltip")
 
@@ -434,6 +609,12 @@ class App(ctk.CTk):
         self.om_modello.pack(side="left", padx=(6, 10))
         self._tt(self.om_modello, "model_tooltip")
 
+        self.seg_provider = ctk.CTkSegmentedButton(
+            bg_row, values=["CPU", "GPU"], variable=self.var_provider, state="disabled",
+            command=lambda _: self._cambia_provider())
+        self.seg_provider.pack(side="left", padx=(0, 10))
+        self._tt(self.seg_provider, "provider_tooltip")
+
         self.lbl_desc = ctk.CTkLabel(
             bg_row, text="",
             text_color=("gray40", "gray60"),
@@ -448,9 +629,14 @@ class App(ctk.CTk):
 
         self.chk_ico = ctk.CTkCheckBox(frm_op, text="",
                                         variable=self.var_ico)
-        self.chk_ico.grid(row=3, column=0, padx=12, pady=(3, 10), sticky="w")
+        self.chk_ico.grid(row=3, column=0, padx=12, pady=3, sticky="w")
         self._tt(self.chk_ico, "convert_ico_tooltip")
 
+        self.chk_nobg = ctk.CTkCheckBox(frm_op, text="",
+                                         variable=self.var_nobg)
+        self.chk_nobg.grid(row=4, column=0, padx=12, pady=(3, 10), sticky="w")
+        self._tt(self.chk_nobg, "save_nobg_tooltip")
+
         self.lbl_output_info = ctk.CTkLabel(
             frm_op, text="",
             text_color=("gray40", "gray60"),
@@ -469,7 +655,7 @@ class App(ctk.CTk):
         self.rad_dest_same.grid(row=1, column=0, padx=12, pady=3, sticky="w")
 
         dest_row = ctk.CTkFrame(frm_out, fg_color="transparent")
-        dest_row.grid(row=2, column=0, columnspan=3, padx=8, pady=(0, 10), sticky="ew")
+        dest_row.grid(row=2, column=0, columnspan=3, padx=8, pady=(0, 3), sticky="ew")
         dest_row.grid_columnconfigure(1, weight=1)
 
         self.rad_dest_custom = ctk.CTkRadioButton(dest_row, text="",
@@ -486,6 +672,11 @@ class App(ctk.CTk):
         self.btn_scegli.grid(row=0, column=2, padx=(0, 4))
         self._tt(self.btn_scegli, "choose_tooltip")
 
+        self.var_incr = tk.BooleanVar(value=False)
+        self.chk_incr = ctk.CTkCheckBox(frm_out, text="", variable=self.var_incr)
+        self.chk_incr.grid(row=3, column=0, columnspan=3, padx=12, pady=(3, 10), sticky="w")
+        self._tt(self.chk_incr, "skip_unchanged_tooltip")
+
         # ── process button ─────────────────────────────────────────────────────
         self.btn_processa = ctk.CTkButton(
             self, text="", height=44,
@@ -509,10 +700,13 @@ class App(ctk.CTk):
                      font=ctk.CTkFont(size=13, weight="bold"))
         self.lbl_log.grid(row=0, column=0, padx=12, pady=(10, 4), sticky="w")
 
+        self.lbl_progresso = ctk.CTkLabel(frm_log, text="", font=ctk.CTkFont(size=11), text_color="gray60")
+        self.lbl_progresso.grid(row=0, column=1, padx=12, pady=(10, 4), sticky="e")
+
         self.log_text = ctk.CTkTextbox(
             frm_log, height=160,
             font=ctk.CTkFont(family="Consolas", size=10))
-        self.log_text.grid(row=1, column=0, padx=8, pady=(0, 10), sticky="nsew")
+        self.log_text.grid(row=1, column=0, columnspan=2, padx=8, pady=(0, 10), sticky="nsew")
         self.log_text.configure(state="disabled")
 
         # ── preview (right sidebar) ────────────────────────────────────────────
@@ -559,6 +753,32 @@ class App(ctk.CTk):
         # Apply initial texts and mode state
         self._set_texts()
         self._on_modalita_change()
+        self.after(0, self._finestra_pronta)
+        self.after(500, self._precarica_modello)
+
+    def _finestra_pronta(self):
+        """First mainloop turn: the window is on screen, warm up the rest off the UI thread."""
+        self.update_idletasks()
+        avvio.segna("first_window")
+
+        def _preriscalda():
+            # rembg/onnxruntime/svglib imports, then environment probes (providers, nvidia-smi, ImageMagick)
+            precarica_moduli()
+            avvio.segna("heavy_modules_ready")
+            cap = capacita()
+            avvio.segna("capabilities_ready")
+            self.after(0, self._capacita_pronte, cap["gpu"], cap["int8"])
+
+        threading.Thread(target=_preriscalda, daemon=True).start()
+
+    def _capacita_pronte(self, gpu: bool, int8: bool):
+        self._gpu = gpu
+        self._int8 = int8
+        self._toggle_modello()
+        self._cambia_provider()
+
+    def _provider(self) -> str:
+        return self.var_provider.get().lower()
 
     # ── language switch ────────────────────────────────────────────────────────
 
@@ -572,6 +792,7 @@ class App(ctk.CTk):
         # Sidebar
         self.lbl_images.configure(text=_t("images_label"))
         self.btn_aggiungi.configure(text=_t("add_btn"))
+        self.btn_cartella.configure(text=_t("add_folder_btn"))
         self.btn_pulisci.configure(text=_t("clear_btn"))
         # Mode
         self.lbl_modalita.configure(text=_t("mode_label"))
@@ -590,11 +811,13 @@ class App(ctk.CTk):
         self.lbl_modello_label.configure(text=_t("model_label"))
         self.chk_sq.configure(text=_t("crop_square"))
         self.chk_ico.configure(text=_t("convert_ico"))
+        self.chk_nobg.configure(text=_t("save_nobg"))
         # Output destination
         self.lbl_output_dest.configure(text=_t("output_dest_label"))
         self.rad_dest_same.configure(text=_t("dest_same"))
         self.rad_dest_custom.configure(text=_t("dest_custom"))
         self.btn_scegli.configure(text=_t("choose_btn"))
+        self.chk_incr.configure(text=_t("skip_unchanged"))
         # Process / Log / Preview
         self.btn_processa.configure(text=_t("process_btn"))
         self.lbl_log.configure(text=_t("log_label"))
@@ -602,7 +825,7 @@ class App(ctk.CTk):
         self.lbl_preview_orig_label.configure(text=_t("preview_orig"))
         self.lbl_preview_result_label.configure(text=_t("preview_result"))
         # Model description
-        self.lbl_desc.configure(text=_t(f"desc_{self.var_modello.get()}"))
+        self.lbl_desc.configure(text=_desc_modello(self.var_modello.get()))
         # Tooltips
         for tooltip, key in self._tooltips:
             tooltip.text = _t(key)
@@ -618,50 +841,146 @@ class App(ctk.CTk):
 
     # ── file list management ───────────────────────────────────────────────────
 
+    # Virtualized list: a fixed pool of canvas items, one set per row that fits
+    # in the view, is repositioned and relabelled on scroll, resize and changes,
+    # so the cost of a redraw does not depend on how many files are queued.
+    ALTEZZA_RIGA = 26
+    LARGHEZZA_CROCE = 28
+
     def _render_file_list(self):
-        for w in self.scroll_files.winfo_children():
-            w.destroy()
-        for i, path in enumerate(self._file_list):
-            is_sel = (path == self._selected_file)
-            row_bg = ("gray75", "gray30") if is_sel else "transparent"
-            row = ctk.CTkFrame(self.scroll_files, fg_color=row_bg, corner_radius=4)
-            row.grid(row=i, column=0, sticky="ew", pady=1)
-            row.grid_columnconfigure(0, weight=1)
-            lbl = ctk.CTkLabel(row, text=os.path.basename(path), anchor="w")
-            lbl.grid(row=0, column=0, padx=6, sticky="ew")
-            btn = ctk.CTkButton(row, text="✕", width=28, height=24,
-                          fg_color="transparent",
-                          hover_color=("gray80", "gray25"),
-                          text_color=("gray30", "gray70"),
-                          command=lambda p=path: self._rimuovi_file(p))
-            btn.grid(row=0, column=1, padx=(0, 4))
-            for widget in (row, lbl):
-                widget.bind("<Button-1>", lambda e, p=path: self._on_file_select(p))
-            for widget in (row, lbl, btn):
-                widget.bind("<MouseWheel>", lambda e: self._canvas_files.yview_scroll(
-                    int(-1 * (e.delta / 120)), "units"))
+        """Resize the scroll region to the whole list and redraw the visible rows."""
+        c = self._canvas_files
+        c.configure(scrollregion=(0, 0, c.winfo_width(), len(self._file_list) * self.ALTEZZA_RIGA))
+        self._disegna_righe()
+
+    def _disegna_righe(self):
+        c = self._canvas_files
+        larghezza = c.winfo_width()
+        primo = max(0, int(c.canvasy(0)) // self.ALTEZZA_RIGA)
+        visibili = c.winfo_height() // self.ALTEZZA_RIGA + 2
+        while len(self._righe_file) < visibili:
+            self._righe_file.append((
+                c.create_rectangle(0, 0, 0, 0, width=0, fill=""),
+                c.create_text(0, 0, anchor="w", fill=self._colore_testo, font=self._font_file),
+                c.create_text(0, 0, text="✕", fill=self._colore_croce, font=self._font_file)))
+        for k, (sfondo, nome, croce) in enumerate(self._righe_file):
+            i = primo + k
+            if i >= len(self._file_list) or k >= visibili:
+                for item in (sfondo, nome, croce):
+                    c.itemconfigure(item, state="hidden")
+                continue
+            path = self._file_list[i]
+            y = i * self.ALTEZZA_RIGA
+            centro = y + self.ALTEZZA_RIGA / 2
+            c.coords(sfondo, 2, y + 1, larghezza - 2, y + self.ALTEZZA_RIGA - 1)
+            c.coords(nome, 8, centro)
+            c.coords(croce, larghezza - self.LARGHEZZA_CROCE / 2 - 2, centro)
+            c.itemconfigure(sfondo, state="normal",
+                            fill=self._colore_selezione if path == self._selected_file else "")
+            c.itemconfigure(nome, state="normal",
+                            text=self._accorcia(os.path.basename(path), larghezza - self.LARGHEZZA_CROCE - 14))
+            c.itemconfigure(croce, state="normal")
+
+    def _accorcia(self, testo: str, max_px: int) -> str:
+        """Cut testo with an ellipsis so that it fits in max_px."""
+        misura = self._font_file.measure
+        if misura(testo) <= max_px:
+            return testo
+        basso, alto = 0, len(testo)
+        while basso < alto:
+            meta = (basso + alto + 1) // 2
+            if misura(testo[:meta] + "…") <= max_px:
+                basso = meta
+            else:
+                alto = meta - 1
+        return testo[:basso] + "…"
+
+    def _click_file(self, event):
+        c = self._canvas_files
+        i = int(c.canvasy(event.y)) // self.ALTEZZA_RIGA
+        if not 0 <= i < len(self._file_list):
+            return
+        path = self._file_list[i]
+        if event.x >= c.winfo_width() - self.LARGHEZZA_CROCE - 4:
+            self._rimuovi_file(path)
+        else:
+            self._on_file_select(path)
+
+    def _scorri_file(self, event):
+        self._canvas_files.yview_scroll(int(-1 * (event.delta / 120)), "units")
+        self._disegna_righe()
 
     def _aggiungi(self):
         tipi = [(_t("images_types_label"), " ".join(f"*{e}" for e in SUPPORTED_EXT)),
                 ("All files", "*.*")]
         files = filedialog.askopenfilenames(title=_t("open_images_title"), filetypes=tipi)
-        for f in files:
-            if f not in self._file_list:
-                self._file_list.append(f)
-        if files and self._selected_file is None and self._file_list:
-            self._selected_file = self._file_list[0]
+        self._aggiungi_blocco(files)
+
+    def _aggiungi_blocco(self, files, dalla_scansione: bool = False):
+        """Queue files; those found by a folder scan also join the running batch, if any."""
+        nuovi = [f for f in files if self._file_list.aggiungi(f)]
+        if nuovi and self._selected_file is None:
+            self._selected_file = self._file_list.primo()
             self._aggiorna_preview()
+        if nuovi and dalla_scansione:
+            with self._coda_scansione:
+                in_corsa = self._in_coda is not None
+                if in_corsa:
+                    self._in_coda.extend(nuovi)
+                    self._coda_scansione.notify_all()
+            if in_corsa:
+                with self._log_lock:
+                    self._avanzamento["totale"] += len(nuovi)
         self._render_file_list()
 
+    # Folders are walked on a background thread (core.scansiona_cartelle) and
+    # their images reach the list in chunks, so the UI stays responsive and a
+    # run can start before the scan is over.
+
+    def _aggiungi_cartella(self):
+        cartella = filedialog.askdirectory(title=_t("open_folder_title"))
+        if not cartella:
+            return
+        with self._coda_scansione:
+            self._scansioni += 1
+        self._log(_t("scan_started_log").format(folder=cartella))
+        threading.Thread(target=self._scansiona, args=(cartella,), daemon=True).start()
+
+    def _scansiona(self, cartella: str):
+        from core import scansiona_cartelle
+        trovati = 0
+        try:
+            for blocco in scansiona_cartelle([cartella], verifica_contenuto=True):
+                trovati += len(blocco)
+                self.after(0, self._aggiungi_blocco, blocco, True)
+        finally:
+            # queued after the last chunk, so the run sees every file before the scan ends
+            self.after(0, self._fine_scansione, cartella, trovati)
+
+    def _fine_scansione(self, cartella: str, trovati: int):
+        with self._coda_scansione:
+            self._scansioni -= 1
+            self._coda_scansione.notify_all()
+        self._log(_t("scan_done_log").format(n=trovati, folder=cartella))
+
+    def _file_in_arrivo(self) -> list[str]:
+        """Files found by folder scans since the last call; waits while a scan is still running.
+        An empty list ends the run."""
+        with self._coda_scansione:
+            while not self._in_coda and self._scansioni:
+                self._coda_scansione.wait()
+            files, self._in_coda = self._in_coda, ([] if self._in_coda else None)
+        return files
+
     def _rimuovi_file(self, path: str):
-        self._file_list.remove(path)
+        self._file_list.rimuovi(path)
         if self._selected_file == path:
-            self._selected_file = self._file_list[0] if self._file_list else None
+            self._selected_file = self._file_list.primo()
             self._aggiorna_preview()
         self._render_file_list()
 
     def _pulisci(self):
-        self._file_list.clear()
+        self._file_list.svuota()
         self._selected_file = None
         self._aggiorna_preview()
         self._render_file_list()
@@ -670,26 +989,74 @@ class App(ctk.CTk):
 
     def _on_file_select(self, path: str):
         self._selected_file = path
-        self._render_file_list()
+        self._disegna_righe()  # only the highlight changes
         self._aggiorna_preview()
 
     def _make_checkerboard(self, size, tile=8):
-        """Create checkerboard background to visualize transparency."""
-        from PIL import Image, ImageDraw
-        w, h = size
-        bg = Image.new('RGB', (w, h), (200, 200, 200))
-        draw = ImageDraw.Draw(bg)
-        for y in range(0, h, tile):
-            for x in range(0, w, tile):
-                if ((x // tile) + (y // tile)) % 2:
-                    draw.rectangle([x, y, x + tile - 1, y + tile - 1], fill=(160, 160, 160))
-        return bg
+        """Checkerboard background to visualize transparency (a fresh copy of the cached one)."""
+        return _scacchiera(size[0], size[1], tile).copy()
+
+    # Longest side of the preview proxy: larger than any canvas, small enough to redraw instantly
+    LATO_PROXY = 1024
+    # Decoded proxies kept for quick reselection (about 4 MB each at most)
+    CACHE_PREVIEW = 16
+
+    @staticmethod
+    def _chiave_file(path: str) -> tuple:
+        """(path, mtime, size): identifies one version of a file, so edited files are decoded again."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return (path, None, None)
+        return (path, st.st_mtime_ns, st.st_size)
+
+    def _proxy_di(self, chiave: tuple):
+        """Downscaled RGBA proxy of the file version chiave (see _chiave_file) and its
+        original size (preview thread only). Served from an LRU of recent proxies."""
+        from PIL import Image
+        path = chiave[0]
+        if chiave in self._cache_preview:
+            self._cache_preview.move_to_end(chiave)
+            return self._cache_preview[chiave]
+        with Image.open(path) as img:
+            dimensioni = img.size
+            # Shrink before converting when the mode allows it, so RGBA is never built at full size;
+            # thumbnail() first calls draft(), so JPEGs are decoded at a reduced DCT scale
+            if img.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                img = img.convert('RGBA')
+            img.thumbnail((self.LATO_PROXY, self.LATO_PROXY), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            proxy = img.convert('RGBA')
+        self._cache_preview[chiave] = (proxy, dimensioni)
+        while len(self._cache_preview) > self.CACHE_PREVIEW:
+            self._cache_preview.popitem(last=False)
+        return proxy, dimensioni
+
+    def _decodifica_preview(self, richiesta: int, chiave: tuple):
+        """Preview thread: decode the file unless a newer selection superseded the request."""
+        if richiesta != self._richiesta_preview:
+            return
+        try:
+            proxy, dimensioni = self._proxy_di(chiave)
+            errore = None
+        except Exception as e:
+            proxy, dimensioni, errore = None, None, e
+        self.after(0, self._preview_pronta, richiesta, chiave, proxy, dimensioni, errore)
+
+    def _preview_pronta(self, richiesta: int, chiave: tuple, proxy, dimensioni, errore):
+        if richiesta != self._richiesta_preview:
+            return  # stale: the selection or the options changed meanwhile
+        if errore is not None:
+            self._preview_errore(errore)
+            return
+        self._proxy = (chiave, proxy, dimensioni)
+        self._mostra_preview()
 
     def _redraw_canvas(self, canvas, img_pil, photo_attr: str):
         """Redraw PIL image fitted to current canvas dimensions."""
         from PIL import Image, ImageTk
-        canvas.delete("all")
         if img_pil is None:
+            canvas.delete("all")
+            self._disegnati.pop(photo_attr, None)
             return
         canvas.update_idletasks()
         cw = canvas.winfo_width()
@@ -700,18 +1067,23 @@ class App(ctk.CTk):
         max_w = max(cw - 2 * pad, 1)
         max_h = max(ch - 2 * pad, 1)
 
-        thumb = img_pil.copy()
-        thumb.thumbnail((max_w, max_h), Image.Resampling.LANCZOS)
-        tw, th = thumb.size
-        bg = self._make_checkerboard((tw, th))
-        bg.paste(thumb, mask=thumb.split()[3])
-        photo = ImageTk.PhotoImage(bg)
-        setattr(self, photo_attr, photo)
-        canvas.create_image(cw // 2, ch // 2, anchor="center", image=photo)
+        disegnato = self._disegnati.get(photo_attr)
+        if disegnato is None or disegnato[0] is not img_pil or disegnato[1:] != (max_w, max_h):
+            scala = min(max_w / img_pil.width, max_h / img_pil.height, 1)
+            tw, th = max(1, round(img_pil.width * scala)), max(1, round(img_pil.height * scala))
+            thumb = img_pil if scala == 1 else img_pil.resize((tw, th), Image.Resampling.LANCZOS, reducing_gap=2.0)
+            bg = self._make_checkerboard((tw, th))
+            bg.paste(thumb, mask=thumb.getchannel('A'))
+            setattr(self, photo_attr, ImageTk.PhotoImage(bg))
+            self._disegnati[photo_attr] = (img_pil, max_w, max_h)
+        canvas.delete("all")
+        canvas.create_image(cw // 2, ch // 2, anchor="center", image=getattr(self, photo_attr))
 
     def _aggiorna_preview(self):
-        """Update the preview for the selected file with current settings."""
-        from PIL import Image, ImageDraw
+        """Update the preview for the selected file with current settings.
+        Option changes reuse the current proxy; a newly selected file is decoded on the
+        preview thread and shown when ready, dropping requests superseded meanwhile."""
+        self._richiesta_preview += 1
 
         self._canvas_orig.delete("all")
         self._canvas_result.delete("all")
@@ -724,19 +1096,37 @@ class App(ctk.CTk):
             return
 
         path = self._selected_file
-        ext = os.path.splitext(path)[1].lower()
+        chiave = self._chiave_file(path)
+        if os.path.splitext(path)[1].lower() == '.svg':
+            from PIL import Image, ImageDraw
+            sz = 200
+            img_orig = Image.new('RGBA', (sz, sz), (70, 70, 70, 255))
+            draw = ImageDraw.Draw(img_orig)
+            draw.text((sz // 2 - 14, sz // 2 - 8), "SVG", fill=(180, 180, 180, 255))
+            self._proxy = (chiave, img_orig, None)
+            self._mostra_preview()
+        elif self._proxy is not None and self._proxy[0] == chiave:
+            self._mostra_preview()
+        else:
+            self.lbl_preview_orig_label.configure(text=_t("preview_orig"))
+            self.lbl_preview_info.configure(text=_t("preview_loading"))
+            self._pool_preview.submit(self._decodifica_preview, self._richiesta_preview, chiave)
 
+    def _preview_errore(self, e: Exception):
+        self.lbl_preview_orig_label.configure(text=_t("preview_orig"))
+        self.lbl_preview_info.configure(text=f"Preview N/A\n{str(e)[:35]}")
+
+    def _mostra_preview(self):
+        """Render the current proxy with the current options (main thread, proxy-sized work only)."""
+        from PIL import Image
+
+        img_orig, dimensioni = self._proxy[1], self._proxy[2]
         try:
-            if ext == '.svg':
-                sz = 200
-                img_orig = Image.new('RGBA', (sz, sz), (70, 70, 70, 255))
-                draw = ImageDraw.Draw(img_orig)
-                draw.text((sz // 2 - 14, sz // 2 - 8), "SVG", fill=(180, 180, 180, 255))
-                w_orig, h_orig = sz, sz
+            if dimensioni is None:  # SVG placeholder
+                w_orig, h_orig = img_orig.size
                 self.lbl_preview_orig_label.configure(text=_t("preview_orig"))
             else:
-                img_orig = Image.open(path).convert('RGBA')
-                w_orig, h_orig = img_orig.size
+                w_orig, h_orig = dimensioni
                 self.lbl_preview_orig_label.configure(
                     text=f'{_t("preview_orig")} ({w_orig}×{h_orig})')
 
@@ -745,16 +1135,31 @@ class App(ctk.CTk):
             forza_quadrato = (modalita in ("ico", "favicon", "appstore"))
             ha_sq = (modalita != "format")
 
+            # Result side: the live background-removed proxy once available
+            sorgente = img_orig
+            nota_bg = None
+            if self.var_bg.get():
+                chiave = (self._proxy[0], self.var_modello.get())
+                if self._sfondo_preview is not None and self._sfondo_preview[:2] == chiave:
+                    sorgente = self._sfondo_preview[2] or img_orig
+                    nota_bg = "bg_preview_live" if self._sfondo_preview[2] else "bg_removed_preview"
+                elif dimensioni is None:
+                    nota_bg = "bg_removed_preview"
+                else:
+                    self._pianifica_preview_sfondo(img_orig, *chiave)
+                    nota_bg = "bg_preview_running"
+
             if ha_sq and self.var_sq.get() and non_quadrata:
-                size = max(w_orig, h_orig)
+                pw, ph = sorgente.size  # proxy scale
+                size = max(pw, ph)
                 img_result = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-                img_result.paste(img_orig, ((size - w_orig) // 2, (size - h_orig) // 2))
+                img_result.paste(sorgente, ((size - pw) // 2, (size - ph) // 2))
                 risultato_tag = "padding"
             elif ha_sq and not self.var_sq.get() and non_quadrata and forza_quadrato:
-                img_result = img_orig.resize((512, 512), Image.Resampling.LANCZOS)
+                img_result = sorgente.resize((512, 512), Image.Resampling.LANCZOS)
                 risultato_tag = "distorta"
             else:
-                img_result = img_orig.copy()
+                img_result = sorgente
                 risultato_tag = "ok"
 
             self._img_orig_pil = img_orig
@@ -780,25 +1185,92 @@ class App(ctk.CTk):
             elif risultato_tag == "distorta":
                 info += "\n" + _t("distorted_info")
 
-            if self.var_bg.get():
-                info += "\n" + _t("bg_removed_preview")
+            if nota_bg:
+                info += "\n" + _t(nota_bg)
 
             self.lbl_preview_info.configure(text=info)
 
         except Exception as e:
-            self.lbl_preview_orig_label.configure(text=_t("preview_orig"))
-            self.lbl_preview_info.configure(text=f"Preview N/A\n{str(e)[:35]}")
+            self._preview_errore(e)
+
+    # Quiet time after the last selection/option change before running the model
+    RITARDO_PREVIEW_SFONDO_MS = 300
+
+    def _pianifica_preview_sfondo(self, proxy, chiave: tuple, modello: str):
+        """Debounced: (re)start the timer for a low-res background-removal preview of the
+        file version chiave. A request for the same file and model already waiting or
+        running is left alone."""
+        if self._sfondo_in_corso == (chiave, modello):
+            return
+        if self._timer_sfondo is not None:
+            self.after_cancel(self._timer_sfondo)
+        self._richiesta_sfondo += 1
+        self._sfondo_in_corso = (chiave, modello)
+        self._timer_sfondo = self.after(self.RITARDO_PREVIEW_SFONDO_MS, self._avvia_preview_sfondo,
+                                        self._richiesta_sfondo, proxy, chiave, modello)
+
+    def _avvia_preview_sfondo(self, richiesta: int, proxy, chiave: tuple, modello: str):
+        self._timer_sfondo = None
+        self._pool_sfondo.submit(self._rimuovi_sfondo_preview, richiesta, proxy, chiave, modello, self._provider())
+
+    def _rimuovi_sfondo_preview(self, richiesta: int, proxy, chiave: tuple, modello: str, provider: str):
+        """bg-preview thread: run the model unless a newer request superseded this one."""
+        if richiesta != self._richiesta_sfondo:
+            return
+        try:
+            risultato = anteprima_sfondo(proxy, modello, provider)
+        except Exception:
+            risultato = None
+        self.after(0, self._preview_sfondo_pronta, richiesta, chiave, modello, risultato)
+
+    def _preview_sfondo_pronta(self, richiesta: int, chiave: tuple, modello: str, risultato):
+        if richiesta != self._richiesta_sfondo:
+            return  # a newer file or model was requested meanwhile
+        self._sfondo_in_corso = None
+        self._sfondo_preview = (chiave, modello, risultato)
+        if self._proxy is not None and self._proxy[0] == chiave:
+            self._mostra_preview()
 
     # ── helpers ───────────────────────────────────────────────────────────────
 
     def _toggle_modello(self):
         stato = "normal" if self.var_bg.get() else "disabled"
         self.om_modello.configure(state=stato)
+        self.chk_nobg.configure(state=stato)
+        self.seg_provider.configure(state=stato if self._gpu else "disabled")
         colore = ("gray40", "gray60") if self.var_bg.get() else ("gray70", "gray40")
         self.lbl_desc.configure(text_color=colore)
 
+    def _cambia_provider(self):
+        """INT8 models are CPU-only and need onnxruntime.quantization: hidden while GPU
+        is selected or when it is missing, falling back to their base model."""
+        int8 = self._int8 and self._provider() != "gpu"
+        self.om_modello.configure(values=[m for m in MODELLI_REMBG if int8 or not m.endswith(SUFFISSO_INT8)])
+        if not int8 and self.var_modello.get().endswith(SUFFISSO_INT8):
+            self.var_modello.set(self.var_modello.get().removesuffix(SUFFISSO_INT8))
+            self._aggiorna_desc_modello(self.var_modello.get())
+        else:
+            self._precarica_modello()
+
     def _aggiorna_desc_modello(self, modello: str):
-        self.lbl_desc.configure(text=_t(f"desc_{modello}"))
+        self.lbl_desc.configure(text=_desc_modello(modello))
+        self._precarica_modello()
+        self._aggiorna_preview()
+
+    def _precarica_modello(self):
+        """Warm up the selected model in background (only if already downloaded)."""
+        if not self.var_bg.get():
+            return
+        modello = self.var_modello.get()
+        provider = self._provider()
+
+        def _carica():
+            try:
+                precarica_modello(modello, provider, log_fn=lambda msg: None, solo_se_in_cache=True)
+            except Exception:
+                pass
+
+        threading.Thread(target=_carica, daemon=True).start()
 
     def _toggle_dest(self):
         custom = self.var_dest.get() == "custom"
@@ -813,12 +1285,81 @@ class App(ctk.CTk):
             self.entry_dest.delete(0, "end")
             self.entry_dest.insert(0, d)
 
+    # Log lines reach the textbox in batches, at most once per LOG_INTERVALLO_MS,
+    # and only the last LOG_MAX_RIGHE lines are kept (pending and on screen).
+    LOG_INTERVALLO_MS = 50
+    LOG_MAX_RIGHE = 5000
+
     def _log(self, msg: str):
+        """Queue a log line; safe to call from any thread."""
+        with self._log_lock:
+            if len(self._log_coda) == self._log_coda.maxlen:
+                self._log_persi += 1
+            self._log_coda.append(msg)
+            if self._log_pianificato:
+                return
+            self._log_pianificato = True
+        self.after(self.LOG_INTERVALLO_MS, self._svuota_log)
+
+    def _svuota_log(self):
+        """Write the queued lines with one insert, then trim the scrollback."""
+        with self._log_lock:
+            righe = list(self._log_coda)
+            self._log_coda.clear()
+            persi, self._log_persi = self._log_persi, 0
+            self._log_pianificato = False
+        if persi:
+            righe.insert(0, f"[...] {persi} log lines skipped")
         self.log_text.configure(state="normal")
-        self.log_text.insert("end", msg + "\n")
+        self.log_text.insert("end", "\n".join(righe) + "\n")
+        eccesso = int(self.log_text.index("end-1c").split(".")[0]) - 1 - self.LOG_MAX_RIGHE
+        if eccesso > 0:
+            self.log_text.delete("1.0", f"{eccesso + 1}.0")
         self.log_text.see("end")
         self.log_text.configure(state="disabled")
 
+    # Progress/ETA label, driven by the structured events of core (see core._notifica)
+    # and refreshed at most once per LOG_INTERVALLO_MS like the log.
+
+    @staticmethod
+    def _durata(secondi: float) -> str:
+        minuti, secondi = divmod(int(round(secondi)), 60)
+        return f"{minuti // 60}:{minuti % 60:02d}:{secondi:02d}" if minuti >= 60 else f"{minuti}:{secondi:02d}"
+
+    def _evento_batch(self, evento: dict):
+        """eventi_fn of the batch functions; safe to call from any thread."""
+        if evento["event"] not in ("started", "finished"):
+            return
+        with self._log_lock:
+            stato = self._avanzamento
+            if evento["event"] == "started":
+                stato["file"] = os.path.basename(evento["file"])
+            else:
+                stato["completati"] = stato["base"] + evento["completed"]
+                if evento["status"] != "unchanged":
+                    stato["elaborati"] += 1
+            if self._avanzamento_pianificato:
+                return
+            self._avanzamento_pianificato = True
+        self.after(self.LOG_INTERVALLO_MS, self._aggiorna_avanzamento)
+
+    def _aggiorna_avanzamento(self):
+        with self._log_lock:
+            stato = dict(self._avanzamento)
+            self._avanzamento_pianificato = False
+        trascorso = stato.get("fine", time.perf_counter()) - stato["t0"]
+        if "fine" in stato:
+            testo = _t("progress_finished").format(total=stato["completati"], elapsed=self._durata(trascorso))
+        elif stato["elaborati"]:
+            # ETA from the files actually processed (unchanged ones are skipped in no time)
+            media = trascorso / stato["elaborati"]
+            testo = _t("progress_eta").format(done=stato["completati"], total=stato["totale"], rate=media,
+                                              eta=self._durata(media * (stato["totale"] - stato["completati"])))
+        else:
+            testo = _t("progress_started").format(done=stato["completati"], total=stato["totale"],
+                                                  file=stato["file"])
+        self.lbl_progresso.configure(text=testo)
+
     def _aggiorna_lbl_output(self):
         """Update output info label text based on current mode."""
         modalita = self.var_modalita.get()
@@ -854,9 +1395,11 @@ class App(ctk.CTk):
 
         if modalita == "ico":
             self.chk_ico.grid()
+            self.chk_nobg.grid()
             self.lbl_output_info.grid_remove()
         else:
             self.chk_ico.grid_remove()
+            self.chk_nobg.grid_remove()
             self.lbl_output_info.grid()
             self._aggiorna_lbl_output()
 
@@ -882,11 +1425,18 @@ class App(ctk.CTk):
 
         self._set_ui_busy(True)
         self.progress.set(0)
+        with self._log_lock:
+            self._avanzamento = {"t0": time.perf_counter(), "completati": 0, "elaborati": 0,
+                                 "totale": len(self._file_list), "base": 0, "file": ""}
+        with self._coda_scansione:
+            self._in_coda = []
+        self.lbl_progresso.configure(text="")
 
         modalita = self.var_modalita.get()
         kwargs = {
             'modalita': modalita,
             'output_dir': output_dir,
+            'incrementale': self.var_incr.get(),
         }
 
         if modalita == "format":
@@ -902,56 +1452,88 @@ class App(ctk.CTk):
             kwargs=kwargs,
             daemon=True).start()
 
-    def _worker(self, files: list[str], modalita: str, output_dir: str,
+    def _worker(self, files: list[str], modalita: str, output_dir: str, incrementale: bool = False,
                 formato: str = None, qualita: int = 85, store: str = None):
-        totale = len(files)
-
         from core import converti_formato_batch, genera_favicon_batch, genera_app_store_icons_batch
 
-        log_fn = lambda msg: self.after(0, self._log, msg)
-
-        if modalita == "ico":
-            rimuovi_bg = self.var_bg.get()
-            quadrato   = self.var_sq.get()
-            ico        = self.var_ico.get()
-            modello    = self.var_modello.get()
-
-            for i, path in enumerate(files, 1):
-                elabora_file(
-                    input_path=path,
+        log_fn = self._log
+        eventi_fn = self._evento_batch
+        provider = self._provider()
+        base = 0  # files of the previous rounds
+
+        def progress_fn(i, n, _):
+            avvio.segna("first_result")
+            with self._log_lock:
+                frazione = (base + i) / max(1, self._avanzamento["totale"])
+            self.after(0, self.progress.set, frazione)
+
+        # one round for the files queued at start, then one per chunk of files
+        # that folder scans still running have found in the meantime
+        while files:
+            with self._log_lock:
+                self._avanzamento["base"] = base
+            if modalita == "ico":
+                rimuovi_bg = self.var_bg.get()
+                quadrato   = self.var_sq.get()
+                ico        = self.var_ico.get()
+                png_nobg   = self.var_nobg.get()
+                modello    = self.var_modello.get()
+
+                elabora_batch(
+                    files,
                     output_dir=output_dir,
                     rimuovi_bg=rimuovi_bg,
                     quadrato=quadrato,
                     converti_ico=ico,
                     modello=modello,
                     log_fn=log_fn,
+                    provider=provider,
+                    progress_fn=progress_fn,
+                    incrementale=incrementale,
+                    png_nobg=png_nobg,
+                    eventi_fn=eventi_fn,
                 )
-                self.after(0, self.progress.set, i / totale)
 
-        elif modalita == "format":
-            converti_formato_batch(
-                files, formato, qualita, output_dir, log_fn,
-                rimuovi_bg=self.var_bg.get(),
-                modello=self.var_modello.get(),
-                quadrato=self.var_sq.get(),
-            )
-            self.after(0, self.progress.set, 1.0)
+            elif modalita == "format":
+                converti_formato_batch(
+                    files, formato, qualita, output_dir, log_fn,
+                    rimuovi_bg=self.var_bg.get(),
+                    modello=self.var_modello.get(),
+                    quadrato=self.var_sq.get(),
+                    provider=provider,
+                    progress_fn=progress_fn,
+                    incrementale=incrementale,
+                    eventi_fn=eventi_fn,
+                )
 
-        elif modalita == "favicon":
-            genera_favicon_batch(files, output_dir, log_fn)
-            self.after(0, self.progress.set, 1.0)
+            elif modalita == "favicon":
+                genera_favicon_batch(files, output_dir, log_fn, progress_fn=progress_fn,
+                                     incrementale=incrementale, eventi_fn=eventi_fn)
 
-        elif modalita == "appstore":
-            genera_app_store_icons_batch(files, store, output_dir, log_fn)
-            self.after(0, self.progress.set, 1.0)
+            elif modalita == "appstore":
+                genera_app_store_icons_batch(files, store, output_dir, log_fn, progress_fn=progress_fn,
+                                             incrementale=incrementale, eventi_fn=eventi_fn)
+
+            base += len(files)
+            files = self._file_in_arrivo()
 
         self.after(0, self._done)
 
     def _done(self):
         self._log(_t("done_log"))
         self._set_ui_busy(False)
+        with self._log_lock:
+            self._avanzamento["fine"] = time.perf_counter()  # a refresh still pending keeps the summary
+        self._aggiorna_avanzamento()
+        if self._sfondo_preview is not None and self._sfondo_preview[2] is None:
+            # the run may have downloaded the model: retry the live preview
+            self._sfondo_preview = None
+            self._aggiorna_preview()
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = App()
     app.mainloop()
+    libera_pool()
+    avvio.stampa_rapporto()
@@ -0,0 +1,87 @@
+"""Startup instrumentation for the GUI (enabled with --profile-startup or
+REMBGEXPORTER_PROFILE_STARTUP=1).
+
+Records how long each module takes to import, plus named milestones
+(first window, heavy modules ready, first result) measured from the moment
+this module was imported. The report goes to stderr when the app exits.
+Import it before anything else so the timings cover the whole launch.
+"""
+import importlib.abc
+import os
+import sys
+import threading
+import time
+
+T0 = time.perf_counter()
+
+attivo = ("--profile-startup" in sys.argv
+          or os.environ.get("REMBGEXPORTER_PROFILE_STARTUP") == "1")
+
+_import = {}  # module name -> (seconds, thread name)
+_tappe = {}   # milestone -> seconds since T0
+_lock = threading.Lock()
+
+
+class _CronometroImport(importlib.abc.MetaPathFinder):
+    """Wraps every loader found by the other finders to time exec_module.
+    Times are inclusive of nested imports, like the cumulative column of -X importtime."""
+
+    def find_spec(self, nome, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(nome, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _LoaderCronometrato(spec.loader)
+                return spec
+        return None
+
+
+class _LoaderCronometrato(importlib.abc.Loader):
+    def __init__(self, loader):
+        self._loader = loader
+
+    def __getattr__(self, nome):
+        return getattr(self._loader, nome)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        t0 = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            with _lock:
+                _import[module.__name__] = (time.perf_counter() - t0, threading.current_thread().name)
+
+
+def attiva():
+    """Start timing imports (no-op unless instrumentation is enabled)."""
+    if attivo and not any(isinstance(f, _CronometroImport) for f in sys.meta_path):
+        sys.meta_path.insert(0, _CronometroImport())
+
+
+def segna(tappa: str):
+    """Record a milestone the first time it is reached."""
+    if attivo:
+        with _lock:
+            _tappe.setdefault(tappa, time.perf_counter() - T0)
+
+
+def rapporto(max_moduli: int = 25) -> str:
+    """Milestones followed by the slowest imports."""
+    with _lock:
+        tappe = sorted(_tappe.items(), key=lambda t: t[1])
+        moduli = sorted(((n, s, th) for n, (s, th) in _import.items()), key=lambda m: m[1], reverse=True)
+    righe = ["[STARTUP] Milestones (since launch):"]
+    righe += [f"  {tappa:<22} {secondi * 1000:8.1f} ms" for tappa, secondi in tappe]
+    righe.append(f"[STARTUP] Slowest imports (inclusive, top {max_moduli}):")
+    righe += [f"  {nome:<22} {secondi * 1000:8.1f} ms  [{thread}]" for nome, secondi, thread in moduli[:max_moduli]]
+    return "\n".join(righe)
+
+
+def stampa_rapporto():
+    if attivo:
+        print(rapporto(), file=sys.stderr)
@@ -0,0 +1,204 @@
+"""Headless command-line interface for batch runs (no Tk import).
+
+Usage:
+    python -m cli ico      PATHS... [--remove-bg] [--square] [--model M] [--provider cpu|gpu]
+    python -m cli format   PATHS... --to webp [--quality 85] [--remove-bg] [--square]
+    python -m cli favicon  PATHS...
+    python -m cli appstore PATHS... --store apple
+    python -m cli quantize-report PATHS... [--model M]
+
+PATHS can be files, directories or glob patterns. Every processed file is
+reported on stdout as one JSON line; log messages go to stderr.
+"""
+import glob
+import json
+import multiprocessing
+import os
+import sys
+
+import click
+
+import core
+
+
+def _espandi_percorsi(percorsi: tuple[str, ...], ricorsivo: bool, verifica_contenuto: bool = False) -> list[str]:
+    """Expand files, directories and glob patterns into a sorted list of supported images."""
+    trovati = []
+    for voce in percorsi:
+        if os.path.isdir(voce):
+            for blocco in core.scansiona_cartelle([voce], ricorsivo, verifica_contenuto):
+                trovati.extend(blocco)
+        elif glob.has_magic(voce):
+            trovati.extend(glob.glob(voce, recursive=True))
+        else:
+            trovati.append(voce)
+    immagini = {os.path.abspath(p) for p in trovati
+                if not os.path.exists(p) or (os.path.isfile(p) and p.lower().endswith(core.SUPPORTED_EXT))}
+    return sorted(immagini)
+
+
+def _applica(fn, opzioni):
+    # click shows options in reverse decoration order
+    for opzione in reversed(opzioni):
+        fn = opzione(fn)
+    return fn
+
+
+def _opzioni_comuni(fn):
+    """Arguments and options shared by every mode."""
+    return _applica(fn, [
+        click.argument('percorsi', nargs=-1, required=True, metavar='PATHS...'),
+        click.option('-o', '--output', 'output_dir', type=click.Path(file_okay=False),
+                     help='Output folder (default: next to each input).'),
+        click.option('-r', '--recursive', is_flag=True, help='Descend into subfolders.'),
+        click.option('--check-content', is_flag=True,
+                     help='Skip files in folders whose magic bytes are not an image.'),
+        click.option('-j', '--jobs', type=int, default=None,
+                     help=f'Worker processes (default: {core.JOBS_DEFAULT}).'),
+        click.option('-q', '--quiet', is_flag=True, help='Only print JSON results.'),
+        click.option('-i', '--incremental', is_flag=True,
+                     help='Skip files whose inputs and options are unchanged since the last run.'),
+        click.option('--timings', type=click.Path(dir_okay=False, writable=True), default=None,
+                     help='Write per-stage timing percentiles and histograms (JSON) to this file.'),
+    ])
+
+
+def _opzioni_sfondo(fn):
+    """Options of the modes that can remove the background."""
+    return _applica(fn, [
+        click.option('--remove-bg/--keep-bg', default=False, help='Remove the background with rembg.'),
+        click.option('-m', '--model', type=click.Choice(core.MODELLI_REMBG),
+                     default=core.MODELLO_DEFAULT, show_default=True),
+        click.option('--provider', type=click.Choice(['cpu', 'gpu']), default='cpu', show_default=True),
+        click.option('--batch-size', type=int, default=core.DIMENSIONE_BATCH_DEFAULT, show_default=True,
+                     help='Images per background-removal inference.'),
+        click.option('--square/--no-square', default=False, help='Center on a transparent square.'),
+        click.option('--no-cache', is_flag=True, help='Do not use the background-removal result cache.'),
+        click.option('--refine-edges', is_flag=True,
+                     help='Guided-filter refinement of masks upscaled to large images.'),
+        click.option('--onnx-threads', type=click.IntRange(1), default=None,
+                     help='ONNX Runtime threads per inference (default: the cores left by the workers).'),
+    ])
+
+
+def _esegui(ctx, percorsi, output_dir, ricorsivo, verifica_contenuto, quiet, timings, batch_fn):
+    """Expand inputs, run batch_fn(files, log_fn, progress_fn, eventi_fn) and stream JSON lines."""
+    files = _espandi_percorsi(percorsi, ricorsivo, verifica_contenuto)
+    if not files:
+        raise click.UsageError("No supported images found.")
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    log_fn = (lambda msg: None) if quiet else (lambda msg: click.echo(msg, err=True))
+
+    def progress_fn(completati, totale, risultato):
+        click.echo(json.dumps(risultato, ensure_ascii=False))
+        sys.stdout.flush()
+
+    tempi = core.TempiBatch() if timings else None
+    try:
+        risultati = batch_fn(files, log_fn, progress_fn, tempi)
+    finally:
+        core.libera_pool()
+    if tempi:
+        tempi.esporta(timings)
+        log_fn(f"[STATS] Timings written to {timings}")
+    if any(r['status'] == 'error' for r in risultati):
+        ctx.exit(1)
+
+
+@click.group()
+def cli():
+    """RembgExporter batch processing without the GUI."""
+
+
+@cli.command()
+@_opzioni_comuni
+@_opzioni_sfondo
+@click.option('--ico/--png-only', 'converti_ico', default=True, help='Write the multi-frame ICO.')
+@click.option('--nobg-png/--no-nobg-png', 'png_nobg', default=True,
+              help='With --remove-bg, also write the full-resolution _nobg.png '
+                   '(without it, inference runs at icon resolution).')
+@click.pass_context
+def ico(ctx, percorsi, output_dir, recursive, check_content, jobs, quiet, incremental, timings, remove_bg, square,
+        model, provider, batch_size, no_cache, refine_edges, onnx_threads, converti_ico, png_nobg):
+    """Multi-resolution ICO icons (optionally with background removal)."""
+    _esegui(ctx, percorsi, output_dir, recursive, check_content, quiet, timings,
+            lambda files, log_fn, progress_fn, eventi_fn: core.elabora_batch(
+                files, output_dir, remove_bg, square, converti_ico, modello=model, log_fn=log_fn,
+                provider=provider, dimensione_batch=batch_size, progress_fn=progress_fn, jobs=jobs,
+                incrementale=incremental, png_nobg=png_nobg, eventi_fn=eventi_fn, usa_cache=not no_cache,
+                raffina=refine_edges, thread=onnx_threads))
+
+
+@cli.command('format')
+@_opzioni_comuni
+@_opzioni_sfondo
+@click.option('-t', '--to', 'formato', type=click.Choice(['png', 'jpg', 'webp', 'gif']), required=True)
+@click.option('--quality', type=click.IntRange(1, 100), default=85, show_default=True)
+@click.pass_context
+def formato(ctx, percorsi, output_dir, recursive, check_content, jobs, quiet, incremental, timings, remove_bg,
+            square, model, provider, batch_size, no_cache, refine_edges, onnx_threads, formato, quality):
+    """Convert between PNG / JPG / WebP / GIF."""
+    _esegui(ctx, percorsi, output_dir, recursive, check_content, quiet, timings,
+            lambda files, log_fn, progress_fn, eventi_fn: core.converti_formato_batch(
+                files, formato, quality, output_dir, log_fn, rimuovi_bg=remove_bg, modello=model,
+                quadrato=square, provider=provider, dimensione_batch=batch_size, jobs=jobs,
+                progress_fn=progress_fn, incrementale=incremental, eventi_fn=eventi_fn,
+                usa_cache=not no_cache, raffina=refine_edges, thread=onnx_threads))
+
+
+@cli.command()
+@_opzioni_comuni
+@click.pass_context
+def favicon(ctx, percorsi, output_dir, recursive, check_content, jobs, quiet, incremental, timings):
+    """Complete favicon set (ICO + PNG + manifest.json)."""
+    _esegui(ctx, percorsi, output_dir, recursive, check_content, quiet, timings,
+            lambda files, log_fn, progress_fn, eventi_fn: core.genera_favicon_batch(
+                files, output_dir, log_fn, jobs=jobs, progress_fn=progress_fn, incrementale=incremental,
+                eventi_fn=eventi_fn))
+
+
+@cli.command()
+@_opzioni_comuni
+@click.option('-s', '--store', type=click.Choice(['google', 'apple', 'microsoft']), required=True)
+@click.pass_context
+def appstore(ctx, percorsi, output_dir, recursive, check_content, jobs, quiet, incremental, timings, store):
+    """Icons in the sizes required by an app store."""
+    _esegui(ctx, percorsi, output_dir, recursive, check_content, quiet, timings,
+            lambda files, log_fn, progress_fn, eventi_fn: core.genera_app_store_icons_batch(
+                files, store, output_dir, log_fn, jobs=jobs, progress_fn=progress_fn,
+                incrementale=incremental, eventi_fn=eventi_fn))
+
+
+@cli.command('quantize-report')
+@click.argument('percorsi', nargs=-1, required=True, metavar='PATHS...')
+@click.option('-r', '--recursive', is_flag=True, help='Descend into subfolders.')
+@click.option('--check-content', is_flag=True,
+              help='Skip files in folders whose magic bytes are not an image.')
+@click.option('-m', '--model', 'modelli', multiple=True,
+              type=click.Choice([m for m in core.MODELLI_REMBG if m + core.SUFFISSO_INT8 in core.MODELLI_REMBG]),
+              help='FP32 model to compare with its INT8 variant (repeatable; default: all).')
+@click.option('--provider', type=click.Choice(['cpu', 'gpu']), default='cpu', show_default=True)
+@click.option('-q', '--quiet', is_flag=True, help='Only print JSON results.')
+@click.pass_context
+def quantize_report(ctx, percorsi, recursive, check_content, modelli, provider, quiet):
+    """Compare INT8 models with FP32 ones: latency and mask IoU on sample images."""
+    files = _espandi_percorsi(percorsi, recursive, check_content)
+    if not files:
+        raise click.UsageError("No supported images found.")
+    log_fn = (lambda msg: None) if quiet else (lambda msg: click.echo(msg, err=True))
+    report = core.confronta_int8(files, list(modelli) or None, provider, log_fn)
+    for voce in report:
+        click.echo(json.dumps(voce, ensure_ascii=False))
+    if report and not quiet:
+        click.echo(f"{'model':<20} {'fp32 ms':>9} {'int8 ms':>9} {'speedup':>8} {'IoU mean':>9} "
+                   f"{'IoU min':>8} {'MB':>11}", err=True)
+        for v in report:
+            click.echo(f"{v['model']:<20} {v['fp32_p50_ms']:>9} {v['int8_p50_ms']:>9} {v['speedup']:>7}x "
+                       f"{v['iou_mean']:>9} {v['iou_min']:>8} {v['fp32_mb']:>5}→{v['int8_mb']:<5}", err=True)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    cli(prog_name="python -m cli")
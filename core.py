@@ -1,12 +1,19 @@
+import atexit
+import hashlib
 import io
 import json
 import os
+import queue
 import re
+import statistics
 import struct
 import sys
 import subprocess
-import tempfile
-from PIL import Image, ImageCms
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
 
 # Suppress the black CMD window on Windows when launching ImageMagick
 _NO_WINDOW = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
@@ -23,20 +30,73 @@ MODELLI_REMBG = [
     "u2net_human_seg",
     "isnet-anime",
 ]
+# rembg session that runs a model from any .onnx path with the same
+# preprocessing: used for the optimized and INT8 graphs of these models
+_SESSIONI_CUSTOM = {
+    "u2net":             "u2net_custom",
+    "u2net_human_seg":   "u2net_custom",
+    "isnet-general-use": "dis_custom",
+}
+# INT8-quantized CPU variant, e.g. "u2net-int8": made from the downloaded
+# model on first use and cached in the derived graphs folder (see _modello_int8)
+SUFFISSO_INT8 = "-int8"
+MODELLI_REMBG += [m + SUFFISSO_INT8 for m in MODELLI_REMBG if m in _SESSIONI_CUSTOM]
 MODELLO_DEFAULT = "birefnet-general"
 
 
-def gpu_disponibile() -> bool:
-    """Check whether CUDA GPU acceleration is available for ONNX Runtime."""
+# ── Environment capabilities ──────────────────────────────────────────────────
+# Probes that cost an import, a subprocess or a directory listing (ONNX
+# Runtime providers, nvidia-smi, magick --version, the model cache folder) run
+# lazily once per process and are then served from memory. Each key has its
+# own lock, so a slow probe never holds up the others. aggiorna_capacita()
+# forgets the results, e.g. after installing a driver or ImageMagick.
+
+class _Capacita:
+    def __init__(self):
+        self._valori = {}
+        self._lock = threading.Lock()
+        self._lock_chiavi = {}
+
+    def get(self, chiave, sonda):
+        try:
+            return self._valori[chiave]
+        except KeyError:
+            pass
+        with self._lock:
+            lock = self._lock_chiavi.setdefault(chiave, threading.Lock())
+        with lock:
+            if chiave not in self._valori:
+                self._valori[chiave] = sonda()
+            return self._valori[chiave]
+
+    def invalida(self, filtro=None):
+        """Forget the probes whose key satisfies filtro (all of them if None)."""
+        with self._lock:
+            for chiave in [c for c in self._valori if filtro is None or filtro(c)]:
+                del self._valori[chiave]
+
+
+_capacita = _Capacita()
+
+
+def _sonda_providers() -> tuple[str, ...]:
     try:
         import onnxruntime as ort
-        return "CUDAExecutionProvider" in ort.get_available_providers()
+        return tuple(ort.get_available_providers())
+    except Exception:
+        return ()
+
+
+def _sonda_int8() -> bool:
+    """INT8 variants need onnxruntime.quantization, which imports the onnx package."""
+    try:
+        import onnxruntime.quantization  # noqa: F401
+        return True
     except Exception:
         return False
 
 
-def get_gpu_name() -> str | None:
-    """Return the first GPU name via nvidia-smi, or None if not available."""
+def _sonda_gpu_nome() -> str | None:
     try:
         result = subprocess.run(
             ["nvidia-smi", "--query-gpu=name", "--format=csv,noheader"],
@@ -50,6 +110,65 @@ def get_gpu_name() -> str | None:
         pass
     return None
 
+
+def _indice_modelli(cartella: str | None = None) -> dict[str, int]:
+    """File name → size in bytes of everything in the model cache folder (or in cartella)."""
+    cartella = cartella or _cache_dir()
+
+    def _sonda():
+        try:
+            with os.scandir(cartella) as voci:
+                return {v.name: v.stat().st_size for v in voci if v.is_file()}
+        except OSError:
+            return {}
+    return _capacita.get(("modelli", cartella), _sonda)
+
+
+def _invalida_indice_modelli():
+    _capacita.invalida(lambda chiave: chiave[0] == "modelli")
+
+
+def gpu_disponibile() -> bool:
+    """Check whether CUDA GPU acceleration is available for ONNX Runtime."""
+    return "CUDAExecutionProvider" in _capacita.get("providers", _sonda_providers)
+
+
+def get_gpu_name() -> str | None:
+    """Return the first GPU name via nvidia-smi, or None if not available."""
+    return _capacita.get("gpu_nome", _sonda_gpu_nome)
+
+
+def capacita() -> dict:
+    """Run (or reuse) every environment probe and return their results."""
+    return {
+        "providers": list(_capacita.get("providers", _sonda_providers)),
+        "gpu": gpu_disponibile(),
+        "gpu_nome": get_gpu_name(),
+        "magick": _capacita.get("magick", _cerca_imagemagick),
+        "int8": _capacita.get("int8", _sonda_int8),
+        "modelli_in_cache": [m for m in MODELLI_REMBG if _modello_in_cache(m)],
+    }
+
+
+def aggiorna_capacita():
+    """Discard the memoized probes; they are re-run on next use."""
+    _capacita.invalida()
+
+
+# Imported on first use only; precarica_moduli() lets the GUI pay for them on
+# a background thread once the window is up instead of on the first click.
+MODULI_PESANTI = ("numpy", "PIL.ImageCms", "onnxruntime", "rembg", "svglib.svglib", "reportlab.graphics.renderPM")
+
+
+def precarica_moduli():
+    """Import MODULI_PESANTI, ignoring the ones that are not installed."""
+    import importlib
+    for nome in MODULI_PESANTI:
+        try:
+            importlib.import_module(nome)
+        except Exception:
+            pass
+
 DESCRIZIONI_MODELLI = {
     "birefnet-general":      "Most precise, sharp edges — recommended",
     "birefnet-general-lite": "Fast, slightly lower quality than general",
@@ -99,18 +218,26 @@ class _ProgressCapture:
         return False
 
 
-def _path_univoco(path: str) -> str:
+def _path_univoco(path: str, riservati: set[str] | None = None, propri=()) -> str:
     """Returns path unchanged if file does not exist,
-    otherwise appends (1), (2), ... until a free name is found."""
-    if not os.path.exists(path):
-        return path
+    otherwise appends (1), (2), ... until a free name is found.
+    Names in riservati count as taken and the chosen name is added to it,
+    so a batch can assign output names before any file is written.
+    Existing files listed in propri (previous outputs of the same input)
+    count as free and are overwritten."""
+    def _libero(p):
+        return ((not os.path.exists(p) or os.path.abspath(p) in propri)
+                and (riservati is None or p not in riservati))
+
+    candidato = path
     base, ext = os.path.splitext(path)
     n = 1
-    while True:
+    while not _libero(candidato):
         candidato = f"{base}({n}){ext}"
-        if not os.path.exists(candidato):
-            return candidato
         n += 1
+    if riservati is not None:
+        riservati.add(candidato)
+    return candidato
 
 
 def _cache_dir() -> str:
@@ -119,49 +246,842 @@ def _cache_dir() -> str:
     )
 
 
+def _modello_base(modello: str) -> str:
+    """Model whose weights modello uses ("u2net-int8" → "u2net")."""
+    return modello.removesuffix(SUFFISSO_INT8)
+
+
+def _cartella_derivati() -> str:
+    """Optimized and INT8 graphs, kept apart from the files rembg downloads."""
+    return os.path.join(_cache_dir(), "rembgexporter-graphs")
+
+
 def _modello_in_cache(modello: str) -> bool:
-    """Check whether the model file has already been downloaded to ~/.u2net/"""
-    cartella = _cache_dir()
-    return any(modello in f for f in os.listdir(cartella)) if os.path.isdir(cartella) else False
+    """Check whether the file modello loads is already in ~/.u2net/ (the INT8
+    graph for "-int8" variants, the downloaded model otherwise)."""
+    if modello != _modello_base(modello):
+        return f"{modello}.onnx" in _indice_modelli(_cartella_derivati())
+    return f"{modello}.onnx" in _indice_modelli()
 
 
 def _pulisci_cache_corrotta(modello: str):
-    """Remove partial/corrupt model files from cache."""
-    cartella = _cache_dir()
-    if not os.path.isdir(cartella):
-        return
-    for f in os.listdir(cartella):
-        if modello in f:
+    """Remove partial/corrupt files of modello from cache: its .onnx and the
+    graphs derived from it, never those of models sharing a name prefix."""
+    derivati = _cartella_derivati()
+    percorsi = [os.path.join(derivati if modello != _modello_base(modello) else _cache_dir(), f"{modello}.onnx")]
+    percorsi += [os.path.join(derivati, f) for f in _indice_modelli(derivati) if f.startswith(f"{modello}.")]
+    for percorso in percorsi:
+        try:
+            os.remove(percorso)
+        except OSError:
+            pass
+    _invalida_indice_modelli()
+
+
+# ── rembg session pool ─────────────────────────────────────────────────────────
+# Sessions are shared process-wide and keyed by (model, provider, threads), so
+# a batch loads the ONNX graph once instead of once per file. Least recently
+# used sessions are evicted beyond _SESSIONI_MAX entries or _SESSIONI_MAX_MB
+# of model weights (estimated from the .onnx size on disk).
+_SESSIONI_MAX = 2
+_SESSIONI_MAX_MB = 2048
+
+_sessioni: "OrderedDict[tuple[str, str, int], tuple[object, int]]" = OrderedDict()
+_sessioni_lock = threading.RLock()
+# one lock per key being created: a download or quantization only makes callers
+# of the same key wait, _sessioni_lock is held just to look up and insert
+_sessioni_in_creazione: dict[tuple[str, str, int], threading.Lock] = {}
+
+# ONNX Runtime session options (see _opzioni_sessione)
+THREAD_ONNX = None                # intra-op threads per session; None = derived from the worker count
+ONNX_ESECUZIONE_PARALLELA = False  # ORT_PARALLEL only pays off for graphs with independent branches
+ONNX_ARENA = True                 # CPU memory arena: reused across batches, released with the session
+ONNX_CACHE_OTTIMIZZATO = True     # keep the optimized graph in the cache (faster session creation)
+
+
+def _providers_onnx(provider: str) -> list[str]:
+    return (["CUDAExecutionProvider", "CPUExecutionProvider"]
+            if provider == "gpu" else ["CPUExecutionProvider"])
+
+
+def _thread_inferenza(jobs: int | None = None, thread: int | None = None) -> int:
+    """Intra-op threads for inference running alongside `jobs` encoder processes.
+
+    thread (or else THREAD_ONNX) wins when set. Otherwise: the inference stage
+    is the bottleneck of background-removal batches, but the encoder workers
+    run at the same time, so it gets all cores but half of those the workers
+    can occupy and the two never oversubscribe the CPU.
+    """
+    if thread or THREAD_ONNX:
+        return thread or THREAD_ONNX
+    core_cpu = os.cpu_count() or 1
+    return max(1, core_cpu - min(jobs or JOBS_DEFAULT, core_cpu) // 2)
+
+
+def _opzioni_sessione(thread: int):
+    import onnxruntime as ort
+    opzioni = ort.SessionOptions()
+    opzioni.intra_op_num_threads = thread
+    if ONNX_ESECUZIONE_PARALLELA:
+        opzioni.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        opzioni.inter_op_num_threads = max(1, thread // 2)
+    else:
+        opzioni.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        opzioni.inter_op_num_threads = 1
+    opzioni.enable_cpu_mem_arena = ONNX_ARENA
+    opzioni.enable_mem_pattern = ONNX_ARENA
+    return opzioni
+
+
+def _percorso_ottimizzato(modello: str, provider: str) -> str:
+    """Optimized graph of modello in the derived graphs folder, per provider and ORT version."""
+    import onnxruntime as ort
+    return os.path.join(_cartella_derivati(), f"{modello}.{provider}.ort-{ort.__version__}.opt.onnx")
+
+
+def _sessione_ottimizzata(modello: str, provider: str, thread: int):
+    """
+    rembg session for modello with our SessionOptions. Models that rembg can
+    run from another path (_SESSIONI_CUSTOM) load their optimized graph from
+    the cache when present, so graph fusions are not redone, and write it
+    while creating the session otherwise; the others always load the
+    downloaded .onnx.
+    """
+    import onnxruntime as ort
+    from rembg import new_session
+    providers = _providers_onnx(provider)
+    custom = _SESSIONI_CUSTOM.get(_modello_base(modello))
+    if custom is None:
+        if modello != _modello_base(modello):
+            raise RuntimeError(f"no INT8 variant for '{_modello_base(modello)}'")
+        opzioni = _opzioni_sessione(thread)
+        opzioni.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return new_session(modello, sess_opts=opzioni, providers=providers)
+
+    ottimizzato = _percorso_ottimizzato(modello, provider)
+    if ONNX_CACHE_OTTIMIZZATO and os.path.isfile(ottimizzato):
+        opzioni = _opzioni_sessione(thread)
+        # the extended fusions are already done; layout ones depend on the CPU
+        opzioni.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        try:
+            return new_session(custom, sess_opts=opzioni, providers=providers, model_path=ottimizzato)
+        except Exception:
+            try:
+                os.remove(ottimizzato)  # corrupt or from another build: rebuilt below
+            except OSError:
+                pass
+
+    # the INT8 graph only runs through the custom session; the FP32 one through
+    # its own, which also downloads it on first use
+    nome, argomenti = modello, {}
+    if modello != _modello_base(modello):
+        nome, argomenti = custom, {"model_path": _modello_int8(modello)}
+    if ONNX_CACHE_OTTIMIZZATO:
+        # EXTENDED is the highest level that is portable across CPUs; written to a
+        # private name first so parallel processes and threads never read a partial file
+        temporaneo = f"{ottimizzato}.{os.getpid()}-{threading.get_ident()}.tmp.onnx"
+        opzioni = _opzioni_sessione(thread)
+        opzioni.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+        opzioni.optimized_model_filepath = temporaneo
+        try:
+            os.makedirs(_cartella_derivati(), exist_ok=True)
+            sessione = new_session(nome, sess_opts=opzioni, providers=providers, **argomenti)
+            os.replace(temporaneo, ottimizzato)
+            return sessione
+        except Exception:
+            pass  # e.g. read-only cache: run without writing it (a broken model fails again below)
+        finally:
+            if os.path.exists(temporaneo):
+                os.remove(temporaneo)
+            _invalida_indice_modelli()
+    opzioni = _opzioni_sessione(thread)
+    opzioni.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return new_session(nome, sess_opts=opzioni, providers=providers, **argomenti)
+
+
+def _modello_int8(modello: str) -> str:
+    """
+    Path of the INT8 model, quantizing the downloaded FP32 one the first time.
+    Dynamic quantization: weights of Conv/MatMul layers are stored as uint8
+    and activations are quantized at run time, so no calibration set is
+    needed. Compare the variants with confronta_int8 before switching.
+    """
+    percorso = os.path.join(_cartella_derivati(), f"{modello}.onnx")
+    if os.path.isfile(percorso):
+        return percorso
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    sorgente = _scarica_modello(_modello_base(modello))
+    os.makedirs(_cartella_derivati(), exist_ok=True)
+    temporaneo = f"{percorso}.{os.getpid()}-{threading.get_ident()}.tmp.onnx"
+    try:
+        # uint8 weights: the CPU ConvInteger kernel does not take int8 ones
+        quantize_dynamic(sorgente, temporaneo, weight_type=QuantType.QUInt8)
+        os.replace(temporaneo, percorso)
+    finally:
+        if os.path.exists(temporaneo):
+            os.remove(temporaneo)
+        _invalida_indice_modelli()
+    return percorso
+
+
+def _dimensione_modello_mb(modello: str) -> int:
+    """Size of the downloaded model in MB (0 if unknown)."""
+    cartella = _cartella_derivati() if modello != _modello_base(modello) else None
+    return _indice_modelli(cartella).get(f"{modello}.onnx", 0) // (1024 * 1024)
+
+
+def _scarica_modello(modello: str) -> str:
+    """Path of the downloaded model, fetched by its rembg session class if not there yet."""
+    from rembg.sessions import sessions_class
+    classe = next((c for c in sessions_class if c.name() == modello), None)
+    if classe is None:
+        raise ValueError(f"No session class found for model '{modello}'")
+    return str(classe.download_models())
+
+
+def _crea_sessione(modello: str, provider: str, log_fn, thread: int):
+    """
+    Create a new rembg session, downloading (and for INT8 variants quantizing)
+    the model on first use. Failures name the step that failed: only a failed
+    download points at the network, and only download and quantization leave
+    partial files to clean up.
+    """
+    base = _modello_base(modello)
+    download = not _modello_in_cache(modello)
+    if download and base != modello and _modello_in_cache(base):
+        download = False
+        log_fn(f"[...] Quantizing model '{base}' to INT8 (first use only, please wait...)")
+    if download:
+        log_fn(f"[...] Downloading model '{base}' (first use only, please wait...)")
+    # sys.stderr is process-wide: only the first of concurrent creations captures it
+    old_stderr = sys.stderr
+    cattura = not isinstance(old_stderr, _ProgressCapture)
+    if cattura:
+        sys.stderr = _ProgressCapture(log_fn)
+    fase = "download"
+    try:
+        _scarica_modello(base)
+        if base != modello:
+            fase = "quantize"
+            _modello_int8(modello)
+        fase = "session"
+        return _sessione_ottimizzata(modello, provider, thread)
+    except Exception as e:
+        if fase == "download":
+            _pulisci_cache_corrotta(base)
+            raise RuntimeError(f"Model download '{base}' failed ({e}). "
+                               "Check your internet connection and try again.") from e
+        if fase == "quantize":
+            _pulisci_cache_corrotta(modello)
+            raise RuntimeError(f"INT8 quantization of model '{base}' failed ({e}).") from e
+        raise RuntimeError(f"Loading model '{modello}' on {provider.upper()} failed ({e}).") from e
+    finally:
+        if cattura:
+            sys.stderr = old_stderr
+        if download:
+            _invalida_indice_modelli()
+
+
+def _applica_limiti_sessioni():
+    """Evict least recently used sessions until count and memory limits are met.
+    The most recent session is always kept, even if it alone exceeds the cap."""
+    while len(_sessioni) > 1 and (
+            len(_sessioni) > _SESSIONI_MAX
+            or sum(mb for _, mb in _sessioni.values()) > _SESSIONI_MAX_MB):
+        _sessioni.popitem(last=False)
+
+
+def get_sessione(modello: str = MODELLO_DEFAULT, provider: str = "cpu", log_fn=print,
+                 jobs: int | None = None, thread: int | None = None):
+    """Return the shared rembg session for (modello, provider), creating it if needed.
+    jobs is the number of encoder workers running next to it and thread an
+    explicit intra-op thread count (see _thread_inferenza)."""
+    thread = _thread_inferenza(jobs, thread)
+    chiave = (modello, provider, thread)
+    with _sessioni_lock:
+        if chiave in _sessioni:
+            _sessioni.move_to_end(chiave)
+            return _sessioni[chiave][0]
+        creazione = _sessioni_in_creazione.setdefault(chiave, threading.Lock())
+    with creazione:
+        with _sessioni_lock:
+            if chiave in _sessioni:  # created by the caller we waited for
+                _sessioni.move_to_end(chiave)
+                return _sessioni[chiave][0]
+        sessione = _crea_sessione(modello, provider, log_fn, thread)
+        with _sessioni_lock:
+            _sessioni[chiave] = (sessione, _dimensione_modello_mb(modello))
+            _sessioni_in_creazione.pop(chiave, None)
+            _applica_limiti_sessioni()
+        return sessione
+
+
+def imposta_limiti_sessioni(max_sessioni: int | None = None, max_mb: int | None = None):
+    """Change the session pool limits and evict immediately if they are now exceeded."""
+    global _SESSIONI_MAX, _SESSIONI_MAX_MB
+    with _sessioni_lock:
+        if max_sessioni is not None:
+            _SESSIONI_MAX = max(1, max_sessioni)
+        if max_mb is not None:
+            _SESSIONI_MAX_MB = max_mb
+        _applica_limiti_sessioni()
+
+
+def libera_sessioni(modello: str | None = None, provider: str | None = None):
+    """Drop cached sessions: all of them, or only those matching modello/provider."""
+    with _sessioni_lock:
+        for chiave in list(_sessioni):
+            m, p, _ = chiave
+            if (modello is None or m == modello) and (provider is None or p == provider):
+                del _sessioni[chiave]
+
+
+def precarica_modello(modello: str = MODELLO_DEFAULT, provider: str = "cpu", log_fn=print,
+                      solo_se_in_cache: bool = False):
+    """Warm up the session for (modello, provider) before the first file arrives.
+
+    Loads the model into the pool and runs one tiny inference so the first real
+    image does not pay for graph initialization. With solo_se_in_cache=True
+    nothing happens (returns None) if the model still has to be downloaded.
+    """
+    if solo_se_in_cache and not _modello_in_cache(modello):
+        return None
+    from rembg import remove
+    sessione = get_sessione(modello, provider, log_fn)
+    remove(Image.new('RGB', (64, 64)), session=sessione)
+    return sessione
+
+
+# ── Background-removal result cache ───────────────────────────────────────────
+CACHE_RISULTATI_MB = 1024  # 0 disables the cache
+
+
+class _CacheRisultati:
+    """
+    On-disk cache of background-removed RGBA results, next to the models in
+    _cache_dir(). Entries are addressed by a hash of the source pixels, the
+    model name and the rembg version; least recently used entries (by mtime,
+    refreshed on every hit) are evicted beyond max_mb.
+    """
+    VERSIONE = 1
+
+    def __init__(self, cartella: str, max_mb: int):
+        self.cartella = cartella
+        self.max_byte = max_mb * 1024 * 1024
+        self.hit = 0
+        self.miss = 0
+        self._totale = None
+        self._lock = threading.Lock()
+        self.versione_rembg = _capacita.get("versione_rembg", self._versione_rembg)
+
+    @staticmethod
+    def _versione_rembg() -> str:
+        try:
+            from importlib.metadata import version
+            return version("rembg")
+        except Exception:
+            return "unknown"
+
+    def chiave(self, img: Image.Image, modello: str) -> str:
+        h = hashlib.blake2b(digest_size=20)
+        h.update(f"{self.VERSIONE}|{modello}|{self.versione_rembg}|{img.mode}|{img.size}".encode())
+        h.update(img.tobytes())
+        return h.hexdigest()
+
+    def _percorso(self, chiave: str) -> str:
+        return os.path.join(self.cartella, chiave + '.png')
+
+    def leggi(self, chiave: str) -> Image.Image | None:
+        percorso = self._percorso(chiave)
+        try:
+            with Image.open(percorso) as img:
+                img.load()
+                risultato = img.convert('RGBA')
+        except (OSError, ValueError):
+            with self._lock:
+                self.miss += 1
+            return None
+        try:
+            os.utime(percorso)
+        except OSError:
+            pass
+        with self._lock:
+            self.hit += 1
+        return risultato
+
+    def scrivi(self, chiave: str, img: Image.Image):
+        os.makedirs(self.cartella, exist_ok=True)
+        percorso = self._percorso(chiave)
+        tmp = f"{percorso}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            img.save(tmp, format='PNG', compress_level=1)
+            os.replace(tmp, percorso)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        with self._lock:
+            if self._totale is not None:
+                self._totale += os.path.getsize(percorso)
+            self._libera_spazio()
+
+    def _libera_spazio(self):
+        """Evict oldest entries until the cache fits in max_byte (caller holds the lock)."""
+        if self._totale is not None and self._totale <= self.max_byte:
+            return
+        voci = []
+        for voce in os.scandir(self.cartella):
+            if voce.name.endswith('.png'):
+                st = voce.stat()
+                voci.append((st.st_mtime, st.st_size, voce.path))
+        self._totale = sum(dim for _, dim, _ in voci)
+        for _, dim, path in sorted(voci):
+            if self._totale <= self.max_byte:
+                break
             try:
-                os.remove(os.path.join(cartella, f))
+                os.remove(path)
+                self._totale -= dim
             except OSError:
                 pass
 
+    def imposta_limite(self, max_mb: int):
+        """Change the size limit in place, evicting at once if it shrank."""
+        with self._lock:
+            self.max_byte = max_mb * 1024 * 1024
+            if os.path.isdir(self.cartella):
+                self._libera_spazio()
+
+    def statistiche(self) -> tuple[int, int]:
+        with self._lock:
+            return self.hit, self.miss
+
+
+_cache_risultati: _CacheRisultati | None = None
+
+
+def _get_cache_risultati() -> _CacheRisultati | None:
+    """Process-wide result cache, or None if disabled (CACHE_RISULTATI_MB = 0)."""
+    global _cache_risultati
+    if CACHE_RISULTATI_MB <= 0:
+        return None
+    cartella = os.path.join(_cache_dir(), 'rembgexporter-results')
+    if _cache_risultati is None or _cache_risultati.cartella != cartella:
+        _cache_risultati = _CacheRisultati(cartella, CACHE_RISULTATI_MB)
+    elif _cache_risultati.max_byte != CACHE_RISULTATI_MB * 1024 * 1024:
+        _cache_risultati.imposta_limite(CACHE_RISULTATI_MB)
+    return _cache_risultati
+
+
+def imposta_cache_risultati(max_mb: int):
+    """Set the size limit of the result cache in MB (0 disables it)."""
+    global CACHE_RISULTATI_MB
+    CACHE_RISULTATI_MB = max_mb
+
+
+def _log_statistiche_cache(prima: tuple[int, int], log_fn):
+    """Log hits/misses of the result cache since the `prima` snapshot."""
+    cache = _get_cache_risultati()
+    if cache is None:
+        return
+    hit, miss = cache.statistiche()
+    hit, miss = hit - prima[0], miss - prima[1]
+    if hit or miss:
+        log_fn(f"[STATS] Result cache: {hit} hit, {miss} miss")
+
+
+def _snapshot_cache() -> tuple[int, int]:
+    cache = _get_cache_risultati()
+    return cache.statistiche() if cache else (0, 0)
+
 
 def rimuovi_sfondo(img: Image.Image, modello: str = MODELLO_DEFAULT, log_fn=print,
-                   provider: str = "cpu") -> Image.Image:
-    """Remove background using rembg with the chosen model. Returns RGBA image."""
-    from rembg import remove, new_session
-    providers = (["CUDAExecutionProvider", "CPUExecutionProvider"]
-                 if provider == "gpu" else ["CPUExecutionProvider"])
+                   provider: str = "cpu", usa_cache: bool = True, thread: int | None = None) -> Image.Image:
+    """Remove background using rembg with the chosen model. Returns RGBA image.
+    Results are served from / stored in the on-disk result cache unless
+    usa_cache=False. thread: ONNX Runtime intra-op threads (see get_sessione)."""
+    from PIL import ImageOps
+    from rembg import remove
+    cache = _get_cache_risultati() if usa_cache else None
+    chiave = cache.chiave(ImageOps.exif_transpose(img).convert('RGBA'), modello) if cache else None
+    if chiave:
+        risultato = cache.leggi(chiave)
+        if risultato is not None:
+            return risultato
+    session = get_sessione(modello, provider, log_fn, thread=thread)
+    # PIL in, PIL out: no PNG encode/decode around the model
+    risultato = remove(img, session=session).convert('RGBA')
+    if chiave:
+        cache.scrivi(chiave, risultato)
+    return risultato
+
+
+# ── Batched background removal ────────────────────────────────────────────────
+# Preprocessing of the rembg session classes, per model:
+# (mean, std, input size, sigmoid on the raw output)
+_PARAMETRI_MODELLI = {
+    "birefnet-general":      ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (1024, 1024), True),
+    "birefnet-general-lite": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (1024, 1024), True),
+    "isnet-general-use":     ((0.5, 0.5, 0.5), (1.0, 1.0, 1.0), (1024, 1024), False),
+    "u2net":                 ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320), False),
+    "u2net_human_seg":       ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320), False),
+    "isnet-anime":           ((0.485, 0.456, 0.406), (1.0, 1.0, 1.0), (1024, 1024), False),
+}
+DIMENSIONE_BATCH_DEFAULT = 4
+RAFFINA_BORDI = False  # guided-filter refinement when masks are upsampled (sharper edges, slower)
+
+
+def _tensore_batch(immagini: list[Image.Image], mean, std, size):
+    """Resize and normalize images into one NCHW float32 tensor (same math as rembg)."""
+    import numpy as np
+    arr = np.stack([
+        np.asarray(im.convert('RGB').resize(size, Image.Resampling.LANCZOS), dtype=np.float32)
+        for im in immagini
+    ])
+    arr /= np.maximum(arr.max(axis=(1, 2, 3), keepdims=True), 1e-6)
+    arr = (arr - np.asarray(mean, dtype=np.float32)) / np.asarray(std, dtype=np.float32)
+    return np.ascontiguousarray(arr.transpose(0, 3, 1, 2), dtype=np.float32)
+
+
+def _media_box(x, raggio: int):
+    """Mean over a (2·raggio+1)² window (edges replicated), from an integral image."""
+    import numpy as np
+    k = 2 * raggio + 1
+    c = np.pad(np.pad(x, raggio, mode='edge').cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+    return (c[k:, k:] - c[:-k, k:] - c[k:, :-k] + c[:-k, :-k]) / (k * k)
+
+
+def _filtro_guidato_veloce(guida: Image.Image, maschera: Image.Image, eps: float = 1e-3) -> Image.Image:
+    """Upsample an L mask to guida's size with the fast guided filter (He & Sun, 2015).
+
+    The local linear model mask ≈ a·I + b is fitted at mask resolution against
+    the downscaled grayscale guide; a and b are then upsampled bilinearly and
+    applied to the full-resolution guide, so mask edges snap to image edges.
+    """
+    import numpy as np
+    raggio = max(1, min(maschera.size) // 256)
+    I = np.asarray(guida.convert('L').resize(maschera.size, Image.Resampling.BOX), dtype=np.float64) / 255
+    p = np.asarray(maschera, dtype=np.float64) / 255
+    mI, mp = _media_box(I, raggio), _media_box(p, raggio)
+    a = (_media_box(I * p, raggio) - mI * mp) / (_media_box(I * I, raggio) - mI * mI + eps)
+    b = mp - a * mI
+    A, B = (np.asarray(Image.fromarray(_media_box(x, raggio).astype(np.float32))
+                       .resize(guida.size, Image.Resampling.BILINEAR)) for x in (a, b))
+    q = A * (np.asarray(guida.convert('L'), dtype=np.float32) / 255) + B
+    return Image.fromarray((np.clip(q, 0, 1) * 255 + 0.5).astype(np.uint8))
+
+
+def _maschere_batch(pred, sigmoid: bool, immagini: list[Image.Image], raffina: bool = False) -> list[Image.Image]:
+    """Turn raw model output (N, C, H, W) into per-image L masks at the images' size.
+
+    Masks are resized with LANCZOS, like the rembg sessions do; with raffina,
+    masks upscaled to images larger than the model input are guided by the
+    image itself instead.
+    """
+    import numpy as np
+    pred = pred[:, 0, :, :]
+    if sigmoid:
+        pred = 1.0 / (1.0 + np.exp(-pred))
+    mi = pred.min(axis=(1, 2), keepdims=True)
+    ma = pred.max(axis=(1, 2), keepdims=True)
+    pred = (pred - mi) / np.maximum(ma - mi, 1e-6)
+    maschere = []
+    for m, img in zip((pred * 255).astype(np.uint8), immagini):
+        maschera = Image.fromarray(m)
+        if raffina and (img.width > maschera.width or img.height > maschera.height):
+            maschera = _filtro_guidato_veloce(img, maschera)
+        else:
+            maschera = maschera.resize(img.size, Image.Resampling.LANCZOS)
+        maschere.append(maschera)
+    return maschere
+
+
+def _inferenza_batch(sessione, tensore):
+    """Run the ONNX graph on a batch, one sample at a time if the batch axis is fixed."""
+    import numpy as np
+    ingresso = sessione.inner_session.get_inputs()[0]
+    if isinstance(ingresso.shape[0], int):
+        return np.concatenate([
+            sessione.inner_session.run(None, {ingresso.name: tensore[i:i + 1]})[0]
+            for i in range(len(tensore))
+        ])
+    return sessione.inner_session.run(None, {ingresso.name: tensore})[0]
+
+
+def rimuovi_sfondo_batch(immagini: list[Image.Image], modello: str = MODELLO_DEFAULT, log_fn=print,
+                         provider: str = "cpu", dimensione_batch: int = DIMENSIONE_BATCH_DEFAULT,
+                         raffina: bool | None = None, usa_cache: bool = True,
+                         jobs: int | None = None, thread: int | None = None) -> list[Image.Image]:
+    """Remove the background from many images, dimensione_batch per forward pass.
+
+    Returns RGBA images in the same order, equivalent to calling rimuovi_sfondo
+    on each one. Cached results skip inference; models without known
+    preprocessing fall back to rimuovi_sfondo. raffina (default RAFFINA_BORDI)
+    refines masks upscaled to images larger than the model input with a
+    guided filter. usa_cache=False bypasses the on-disk result cache. jobs
+    and thread size the session threads (see get_sessione).
+    """
+    from PIL import ImageOps
+    if _modello_base(modello) not in _PARAMETRI_MODELLI:
+        return [rimuovi_sfondo(img, modello, log_fn, provider, usa_cache, thread) for img in immagini]
+
+    raffina = RAFFINA_BORDI if raffina is None else raffina
+    cache = _get_cache_risultati() if usa_cache else None
+    immagini = [ImageOps.exif_transpose(img).convert('RGBA') for img in immagini]
+    variante = f"{modello}|guided" if raffina else modello
+    chiavi = [cache.chiave(img, variante) if cache else None for img in immagini]
+    risultati = [cache.leggi(chiave) if chiave else None for chiave in chiavi]
+    mancanti = [i for i, r in enumerate(risultati) if r is None]
+    if not mancanti:
+        return risultati
+
+    mean, std, size, sigmoid = _PARAMETRI_MODELLI[_modello_base(modello)]
+    sessione = get_sessione(modello, provider, log_fn, jobs, thread)
+    forma = sessione.inner_session.get_inputs()[0].shape
+    if isinstance(forma[2], int) and isinstance(forma[3], int):
+        size = (forma[3], forma[2])
+
+    passo = max(1, dimensione_batch)
+    for inizio in range(0, len(mancanti), passo):
+        indici = mancanti[inizio:inizio + passo]
+        blocco = [immagini[i] for i in indici]
+        pred = _inferenza_batch(sessione, _tensore_batch(blocco, mean, std, size))
+        maschere = _maschere_batch(pred, sigmoid, blocco, raffina)
+        for i, img, maschera in zip(indici, blocco, maschere):
+            vuota = Image.new('RGBA', img.size, 0)
+            risultati[i] = Image.composite(img, vuota, maschera)
+            if chiavi[i]:
+                cache.scrivi(chiavi[i], risultati[i])
+    return risultati
+
+
+LATO_ANTEPRIMA = 384
+
+
+def anteprima_sfondo(img: Image.Image, modello: str = MODELLO_DEFAULT, provider: str = "cpu",
+                     lato: int = LATO_ANTEPRIMA) -> Image.Image | None:
+    """Low-resolution background removal for live previews.
+
+    img is shrunk to at most lato px and cleaned with the shared pooled
+    session, bypassing the on-disk result cache. Returns None, without
+    downloading anything, if the model is not in the local cache yet.
+    """
     if not _modello_in_cache(modello):
-        log_fn(f"[...] Downloading model '{modello}' (first use only, please wait...)")
-    old_stderr = sys.stderr
-    sys.stderr = _ProgressCapture(log_fn)
+        return None
+    img = img.copy()
+    img.thumbnail((lato, lato), Image.Resampling.LANCZOS)
+    return rimuovi_sfondo_batch([img], modello, lambda msg: None, provider, usa_cache=False)[0]
+
+
+def confronta_int8(file_list: list[str], modelli: list[str] | None = None, provider: str = "cpu",
+                   log_fn=print, soglia: float = 0.5) -> list[dict]:
+    """
+    Offline quality-vs-speed report of the INT8 variants against the FP32 models.
+
+    Every image goes through both sessions one at a time (after a warm-up run);
+    quality is the IoU of the two masks binarized at soglia. Returns one dict
+    per model with median latencies, speedup, mean/min IoU and file sizes.
+    Models without known preprocessing are skipped.
+    """
+    import numpy as np
+    immagini = []
+    for path in file_list:
+        try:
+            img = _apri_sorgente(path, log_fn)
+        except Exception as e:
+            log_fn(f"[SKIP] {os.path.basename(path)}: {e}")
+            continue
+        if img is not None:
+            immagini.append(img)
+    if not immagini:
+        return []
+    report = []
+    for modello in modelli or [m for m in MODELLI_REMBG if m + SUFFISSO_INT8 in MODELLI_REMBG]:
+        if modello not in _PARAMETRI_MODELLI:
+            log_fn(f"[SKIP] {modello}: preprocessing unknown, cannot compare")
+            continue
+        mean, std, size, sigmoid = _PARAMETRI_MODELLI[modello]
+        tensori = [_tensore_batch([img], mean, std, size) for img in immagini]
+        tempi, maschere = {}, {}
+        try:
+            for variante in (modello, modello + SUFFISSO_INT8):
+                sessione = get_sessione(variante, provider, log_fn, jobs=1)
+                _inferenza_batch(sessione, tensori[0])
+                tempi[variante], maschere[variante] = [], []
+                for img, tensore in zip(immagini, tensori):
+                    t0 = time.perf_counter()
+                    pred = _inferenza_batch(sessione, tensore)
+                    tempi[variante].append(time.perf_counter() - t0)
+                    maschere[variante].append(np.asarray(_maschere_batch(pred, sigmoid, [img])[0]) >= soglia * 255)
+                libera_sessioni(variante)
+        except Exception as e:
+            log_fn(f"[ERROR] {modello}: {e}")
+            libera_sessioni(modello)
+            libera_sessioni(modello + SUFFISSO_INT8)
+            continue
+        iou = [float((a & b).sum() / max((a | b).sum(), 1))
+               for a, b in zip(maschere[modello], maschere[modello + SUFFISSO_INT8])]
+        fp32_ms = statistics.median(tempi[modello]) * 1000
+        int8_ms = statistics.median(tempi[modello + SUFFISSO_INT8]) * 1000
+        voce = {
+            "model": modello,
+            "images": len(immagini),
+            "fp32_p50_ms": round(fp32_ms, 1),
+            "int8_p50_ms": round(int8_ms, 1),
+            "speedup": round(fp32_ms / max(int8_ms, 1e-6), 2),
+            "iou_mean": round(sum(iou) / len(iou), 4),
+            "iou_min": round(min(iou), 4),
+            "fp32_mb": _dimensione_modello_mb(modello),
+            "int8_mb": _dimensione_modello_mb(modello + SUFFISSO_INT8),
+        }
+        log_fn(f"[STATS] {modello}: INT8 {voce['speedup']}x faster, IoU mean {voce['iou_mean']} "
+               f"(min {voce['iou_min']})")
+        report.append(voce)
+    return report
+
+
+DECODER_DEFAULT = min(4, os.cpu_count() or 1)
+_FINE = object()
+
+
+def _cronometra(fn, *args, **kwargs):
+    """Call fn(*args, **kwargs) and return (result, exception or None, seconds)."""
+    t0 = time.perf_counter()
     try:
-        session = new_session(modello, providers=providers)
+        return fn(*args, **kwargs), None, time.perf_counter() - t0
     except Exception as e:
-        _pulisci_cache_corrotta(modello)
-        raise RuntimeError(
-            f"Model download '{modello}' failed ({e}). "
-            "Check your internet connection and try again."
-        ) from e
+        return None, e, time.perf_counter() - t0
+
+
+def _sfondi_rimossi_pipeline(file_list: list[str], apri, modello: str, log_fn, provider: str,
+                             dimensione_batch: int, decoder: int = DECODER_DEFAULT,
+                             tempi: dict | None = None, eventi_fn=None, jobs: int | None = None,
+                             usa_cache: bool = True, raffina: bool | None = None, thread: int | None = None):
+    """Yield (path, img, errore) per file, in input order, with the background removed.
+
+    Runs as a staged pipeline: `decoder` threads decode files with apri(path)
+    while a single inference stage (owning the shared session) cleans them
+    dimensione_batch at a time. Stages are linked by bounded queues, so a
+    slow consumer stalls decoding instead of buffering the whole batch.
+    apri may return None for files to skip (it logs the reason itself); img
+    is then None, and errore holds the exception if the file failed.
+    Busy seconds per stage are added to tempi['decode'] / tempi['inference']
+    and reported per file as "stage" events to eventi_fn (from the stage threads).
+    usa_cache, raffina and thread are passed to rimuovi_sfondo_batch. Closing the
+    generator early (or an exception in the consumer) stops both stages and
+    drops the images still queued.
+    """
+    dimensione_batch = max(1, dimensione_batch)
+    decoder = max(1, decoder)
+    tempi = tempi if tempi is not None else {}
+    tempi.setdefault('decode', 0.0)
+    tempi.setdefault('inference', 0.0)
+    decodificati = queue.Queue(maxsize=2 * dimensione_batch)
+    puliti = queue.Queue(maxsize=2 * dimensione_batch)
+    stop = threading.Event()
+
+    def _metti(coda, voce) -> bool:
+        """Blocking put that gives up (False) once the consumer has stopped."""
+        while not stop.is_set():
+            try:
+                coda.put(voce, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _prendi(coda):
+        while not stop.is_set():
+            try:
+                return coda.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _FINE
+
+    def _apri_e_decodifica(path):
+        img = apri(path)
+        if img is not None:
+            img.load()
+        return img
+
+    def _stadio_decodifica():
+        try:
+            with ThreadPoolExecutor(decoder) as pool:
+                in_corso = deque()
+
+                def _inoltra() -> bool:
+                    path, futuro = in_corso.popleft()
+                    img, errore, secondi = futuro.result()
+                    tempi['decode'] += secondi
+                    _notifica(eventi_fn, "stage", path, stage="decode", seconds=secondi)
+                    return _metti(decodificati, (path, img, errore))
+
+                try:
+                    for path in file_list:
+                        in_corso.append((path, pool.submit(_cronometra, _apri_e_decodifica, path)))
+                        if len(in_corso) >= 2 * decoder and not _inoltra():
+                            return
+                    while in_corso:
+                        if not _inoltra():
+                            return
+                finally:
+                    for _, futuro in in_corso:
+                        futuro.cancel()
+        finally:
+            _metti(decodificati, _FINE)
+
+    def _stadio_inferenza():
+        try:
+            fine = False
+            while not fine:
+                blocco = []
+                while len(blocco) < dimensione_batch:
+                    voce = _prendi(decodificati)
+                    if voce is _FINE:
+                        fine = True
+                        break
+                    blocco.append(list(voce))
+                validi = [v for v in blocco if v[1] is not None]
+                for path, _, _ in validi:
+                    log_fn(f"[...] Background removal [{modello}] [{provider.upper()}]: "
+                           f"{os.path.basename(path)}")
+                if validi:
+                    risultati, errore, secondi = _cronometra(
+                        rimuovi_sfondo_batch, [v[1] for v in validi], modello, log_fn,
+                        provider, dimensione_batch, raffina, usa_cache, jobs, thread)
+                    esiti = [(img, errore) for img in risultati or [None] * len(validi)]
+                    if errore is not None and len(validi) > 1:
+                        # one odd image must not fail the whole chunk: retry each on its own
+                        esiti = []
+                        for v in validi:
+                            singolo, errore, s = _cronometra(
+                                rimuovi_sfondo_batch, [v[1]], modello, log_fn, provider, 1,
+                                raffina, usa_cache, jobs, thread)
+                            secondi += s
+                            esiti.append((singolo[0] if singolo else None, errore))
+                    tempi['inference'] += secondi
+                    for v, (img, errore) in zip(validi, esiti):
+                        v[1], v[2] = img, errore
+                        # one forward pass serves the whole batch: each file gets its share
+                        _notifica(eventi_fn, "stage", v[0], stage="inference", seconds=secondi / len(validi),
+                                  batch=len(validi))
+                for voce in blocco:
+                    if not _metti(puliti, tuple(voce)):
+                        return
+        finally:
+            _metti(puliti, _FINE)
+
+    threading.Thread(target=_stadio_decodifica, name="pipeline-decode", daemon=True).start()
+    threading.Thread(target=_stadio_inferenza, name="pipeline-inference", daemon=True).start()
+    try:
+        yield from iter(puliti.get, _FINE)
     finally:
-        sys.stderr = old_stderr
-    buf = io.BytesIO()
-    img.save(buf, format='PNG')
-    output_data = remove(buf.getvalue(), session=session)
-    return Image.open(io.BytesIO(output_data)).convert('RGBA')
+        stop.set()
+        for coda in (decodificati, puliti):
+            while True:
+                try:
+                    coda.get_nowait()
+                except queue.Empty:
+                    break
 
 
 def ritaglia_quadrato(img: Image.Image) -> Image.Image:
@@ -200,7 +1120,19 @@ def _render_svg_to_png(svg_path: str) -> Image.Image:
 
 
 def _get_imagemagick_path():
-    """Find the ImageMagick executable (portable or system)."""
+    """Find the ImageMagick executable (portable or system), probing once per process."""
+    magick_path = _capacita.get("magick", _cerca_imagemagick)
+    if magick_path is None:
+        raise FileNotFoundError(
+            "ImageMagick not found! Make sure to:\n"
+            "1. Extract the .7z file into 'third-party/imagemagick/'\n"
+            "2. Or install ImageMagick globally"
+        )
+    return magick_path
+
+
+def _cerca_imagemagick() -> str | None:
+    """Probe for the ImageMagick executable (uncached, see _get_imagemagick_path)."""
     # 1. Try third-party/imagemagick folder in the project
     base_dir = os.path.dirname(__file__)
     portable_paths = [
@@ -223,26 +1155,76 @@ def _get_imagemagick_path():
         return 'magick'
     except (FileNotFoundError, subprocess.CalledProcessError):
         pass
+    return None
 
-    raise FileNotFoundError(
-        "ImageMagick not found! Make sure to:\n"
-        "1. Extract the .7z file into 'third-party/imagemagick/'\n"
-        "2. Or install ImageMagick globally"
-    )
 
+def _esegui_magick(argomenti: list[str], dati: bytes | None = None, magick_path: str | None = None):
+    """Run one ImageMagick invocation. dati is fed on stdin (read it with e.g. 'png:-')."""
+    cmd = [magick_path or _get_imagemagick_path(), *argomenti]
+    subprocess.run(cmd, input=dati, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                   creationflags=_NO_WINDOW)
 
-def salva_ico(img: Image.Image, output_path: str):
-    """Create a perfect multi-frame ICO using ImageMagick.
 
-    Flow:
-    1. Convert image to RGBA
-    2. Resize to 512×512
-    3. Save as temporary PNG
-    4. ImageMagick creates ICO with 7 frames: 256, 128, 64, 48, 32, 24, 16
-    """
+def _png_bytes(img: Image.Image) -> bytes:
+    """Fast in-memory PNG used to hand pixels to ImageMagick without a temp file."""
+    buf = io.BytesIO()
+    img.save(buf, 'PNG', compress_level=1)
+    return buf.getvalue()
+
+
+ICO_BACKEND_DEFAULT = "pillow"  # "pillow" (in-process writer) or "magick" (ImageMagick CLI)
+
+
+def _frame_ico_bmp(frame: Image.Image) -> bytes:
+    """Encode an RGBA frame as an ICO DIB: 32-bit BGRA bottom-up + 1-bit AND mask."""
+    import numpy as np
+    w, h = frame.size
+    arr = np.asarray(frame)[::-1]
+    pixel = np.ascontiguousarray(arr[:, :, [2, 1, 0, 3]]).tobytes()
+    # AND mask: bit set where fully transparent, rows padded to 32 bits
+    maschera = np.packbits(arr[:, :, 3] == 0, axis=1)
+    riga = (w + 31) // 32 * 4
+    maschera = np.pad(maschera, ((0, 0), (0, riga - maschera.shape[1]))).tobytes()
+    header = struct.pack('<IiiHHIIiiII', 40, w, h * 2, 1, 32, 0,
+                         len(pixel) + len(maschera), 0, 0, 0, 0)
+    return header + pixel + maschera
+
+
+def _scrivi_ico(frames: list[Image.Image], output_path: str):
+    """Write RGBA frames to a multi-frame ICO in the given order.
+    256 px frames are stored as PNG, smaller ones as 32-bit BMP (same layout as ImageMagick)."""
+    dati = []
+    for frame in frames:
+        if frame.width >= 256 or frame.height >= 256:
+            buf = io.BytesIO()
+            frame.save(buf, format='PNG')
+            dati.append(buf.getvalue())
+        else:
+            dati.append(_frame_ico_bmp(frame))
+
+    offset = 6 + 16 * len(frames)
+    with open(output_path, 'wb') as f:
+        f.write(struct.pack('<HHH', 0, 1, len(frames)))
+        for frame, d in zip(frames, dati):
+            w, h = frame.size
+            # width/height 0 means 256 in the ICONDIRENTRY
+            f.write(struct.pack('<BBBBHHII', w % 256, h % 256, 0, 0, 1, 32, len(d), offset))
+            offset += len(d)
+        for d in dati:
+            f.write(d)
+
+
+def _salva_ico_magick(img: Image.Image, output_path: str):
+    """ImageMagick backend: PNG on stdin + `icon:auto-resize`."""
+    _esegui_magick(['png:-', '-define', 'icon:auto-resize=256,128,64,48,32,24,16', output_path], _png_bytes(img))
+
+
+def _master_512(img: Image.Image) -> Image.Image:
+    """512×512 sRGB RGBA master from which all icon sizes are derived."""
     # 1. Convert to sRGB color profile to preserve original colors
     if 'icc_profile' in img.info:
         try:
+            from PIL import ImageCms
             profilo_src = ImageCms.ImageCmsProfile(io.BytesIO(img.info['icc_profile']))
             profilo_srgb = ImageCms.createProfile('sRGB')
             img = ImageCms.profileToProfile(img, profilo_src, profilo_srgb, outputMode='RGBA')
@@ -254,32 +1236,636 @@ def salva_ico(img: Image.Image, output_path: str):
     # 2. Resize to 512×512 for maximum quality
     if img.size != (512, 512):
         img = img.resize((512, 512), Image.Resampling.LANCZOS)
+    return img
+
+
+def _piramide_resize(master: Image.Image, lati) -> dict[int, Image.Image]:
+    """Square downscales of master for each side in lati, keyed by side.
+
+    Levels are built largest first; each one is resampled from the smallest
+    level already built that is at least twice its side (else from the
+    master), so intermediate results are reused without LANCZOS ever
+    shrinking by less than 2× from a previously filtered level.
+    """
+    livelli = {master.width: master}
+    for lato in sorted(set(lati), reverse=True):
+        if lato in livelli:
+            continue
+        candidati = [l for l in livelli if l >= 2 * lato]
+        sorgente = livelli[min(candidati)] if candidati else master
+        livelli[lato] = sorgente.resize((lato, lato), Image.Resampling.LANCZOS)
+    return livelli
+
+
+def salva_ico(img: Image.Image, output_path: str, backend: str | None = None):
+    """Create a perfect multi-frame ICO.
+
+    Flow:
+    1. Convert image to RGBA (sRGB)
+    2. Resize to 512×512
+    3. Write ICO with 7 frames: 256, 128, 64, 48, 32, 24, 16
+       - backend "pillow": each frame resampled from the 512 master, encoded in memory
+       - backend "magick": temporary PNG converted by ImageMagick
+    """
+    img = _master_512(img)
+
+    # 3. Write the ICO
+    backend = backend or ICO_BACKEND_DEFAULT
+    if backend == "magick":
+        _salva_ico_magick(img, output_path)
+    elif backend == "pillow":
+        frames = [img.resize(size, Image.Resampling.LANCZOS) for size in sorted(ICON_SIZES, reverse=True)]
+        _scrivi_ico(frames, output_path)
+    else:
+        raise ValueError(f"Unknown ICO backend: {backend}")
+
+
+# ── Input discovery ────────────────────────────────────────────────────────────
+
+BLOCCO_SCANSIONE = 256  # files per chunk yielded by scansiona_cartelle
 
-    # 3. Save as temporary PNG
-    tmp_png = None
+
+# XML prolog items that may precede the root element of an SVG
+_PROLOGO_XML = re.compile(rb'\s*(?:<\?.*?\?>|<!--.*?-->|<!DOCTYPE(?:[^\[>]|\[.*?\])*>)', re.S | re.I)
+_RADICE_SVG = re.compile(rb'\s*<(?:[\w.-]+:)?svg[\s>/]')
+LETTURA_SVG = 64 * 1024  # bytes read to find the root element of an SVG
+
+
+def _radice_svg(testa: bytes) -> bool:
+    """True if the first element after the XML declaration, comments,
+    processing instructions and doctype is <svg> (optionally prefixed)."""
+    testa = testa.removeprefix(b'\xef\xbb\xbf')
+    pos = 0
+    while (m := _PROLOGO_XML.match(testa, pos)) and m.end() > pos:
+        pos = m.end()
+    return _RADICE_SVG.match(testa, pos) is not None
+
+
+def _contenuto_immagine(path: str) -> bool:
+    """True if the first bytes of path look like an image (SVG is parsed up to its root element)."""
+    import filetype
+    svg = path.lower().endswith('.svg')
     try:
-        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-            tmp_png = tmp.name
-            img.save(tmp_png, 'PNG')
-
-        # 4. Call ImageMagick to create multi-frame ICO
-        magick_path = _get_imagemagick_path()
-        cmd = [
-            magick_path,
-            tmp_png,
-            '-define', 'icon:auto-resize=256,128,64,48,32,24,16',
-            output_path
-        ]
+        with open(path, 'rb') as f:
+            testa = f.read(LETTURA_SVG if svg else 1024)
+    except OSError:
+        return False
+    if svg:
+        return _radice_svg(testa)
+    return filetype.is_image(testa)
 
-        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=_NO_WINDOW)
 
-    finally:
-        # Clean up temporary file
-        if tmp_png and os.path.exists(tmp_png):
+def scansiona_cartelle(percorsi, ricorsivo: bool = True, verifica_contenuto: bool = False,
+                       blocco: int = BLOCCO_SCANSIONE):
+    """
+    Yield the supported images under the folders in percorsi, in chunks of
+    at most blocco paths, so callers can queue (and start processing) the
+    first files while the rest of the tree is still being walked.
+    Folders are read with os.scandir, one entry listing per directory,
+    sorted by name; symlinked folders are not followed. verifica_contenuto
+    also drops files whose magic bytes are not an image (misnamed or
+    truncated downloads). Unreadable folders are skipped.
+    """
+    trovati = []
+    da_visitare = [os.path.abspath(p) for p in reversed(percorsi)]
+    while da_visitare:
+        cartella = da_visitare.pop()
+        try:
+            with os.scandir(cartella) as voci:
+                voci = sorted(voci, key=lambda v: v.name.lower())
+        except OSError:
+            continue
+        sottocartelle = []
+        for voce in voci:
             try:
-                os.remove(tmp_png)
-            except Exception:
+                if voce.is_dir(follow_symlinks=False):
+                    sottocartelle.append(voce.path)
+                    continue
+                if not voce.is_file() or not voce.name.lower().endswith(SUPPORTED_EXT):
+                    continue
+            except OSError:
+                continue
+            if verifica_contenuto and not _contenuto_immagine(voce.path):
+                continue
+            trovati.append(voce.path)
+            if len(trovati) >= blocco:
+                yield trovati
+                trovati = []
+        if ricorsivo:
+            da_visitare.extend(reversed(sottocartelle))
+    if trovati:
+        yield trovati
+
+
+# ── Incremental mode ───────────────────────────────────────────────────────────
+MANIFEST_INCREMENTALE = '.rembgexporter-manifest.json'
+
+
+def _hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for blocco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(blocco)
+    return h.hexdigest()
+
+
+class _ManifestIncrementale:
+    """
+    Incremental-mode bookkeeping. Each output folder keeps a manifest with,
+    per mode and input file, the input fingerprint (size, mtime, content
+    hash), the settings used, the outputs written and their size/mtime at the
+    end of that run. A file is skipped when fingerprint and settings match
+    and its outputs are still the ones recorded; the content hash is only
+    recomputed when size or mtime changed. Modes where several inputs write
+    the same files (favicon, appstore) pass uscite_di, the outputs an input
+    will write: when a file reruns, every later file sharing one of its
+    outputs reruns too, so the last one still wins as in a full run.
+    """
+    VERSIONE = 2
+
+    def __init__(self, modalita: str, impostazioni: dict, cartella_di, uscite_di=None):
+        self.modalita = modalita
+        self.impostazioni = hashlib.sha256(
+            json.dumps([self.VERSIONE, impostazioni], sort_keys=True).encode()).hexdigest()[:16]
+        self.cartella_di = cartella_di
+        self.uscite_di = uscite_di
+        self._cartelle: dict[str, dict] = {}
+        self._impronte: dict[str, dict] = {}
+        self._registrate: dict[str, str] = {}  # input key → its folder, stats refreshed by salva()
+
+    def _voci(self, input_path: str) -> dict:
+        cartella = self.cartella_di(input_path)
+        if cartella not in self._cartelle:
+            try:
+                with open(os.path.join(cartella, MANIFEST_INCREMENTALE), encoding='utf-8') as f:
+                    dati = json.load(f)
+            except (OSError, ValueError):
+                dati = {}
+            if not isinstance(dati, dict) or dati.get('version') != self.VERSIONE:
+                dati = {'version': self.VERSIONE}
+            self._cartelle[cartella] = dati
+        return self._cartelle[cartella].setdefault(self.modalita, {})
+
+    @staticmethod
+    def _stat_uscite(uscite: list[str]) -> list | None:
+        """[size, mtime_ns] of each output, None if one is missing."""
+        try:
+            return [[st.st_size, st.st_mtime_ns] for st in map(os.stat, uscite)]
+        except OSError:
+            return None
+
+    def _aggiornato(self, input_path: str) -> bool:
+        chiave = os.path.abspath(input_path)
+        voce = self._voci(input_path).get(chiave)
+        try:
+            st = os.stat(input_path)
+        except OSError:
+            return False
+        impronta = {'size': st.st_size, 'mtime': st.st_mtime_ns}
+        if voce and voce.get('size') == st.st_size and voce.get('mtime') == st.st_mtime_ns:
+            impronta['sha256'] = voce.get('sha256')
+        else:
+            impronta['sha256'] = _hash_file(input_path)
+        self._impronte[chiave] = impronta
+        return (bool(voce) and voce.get('sha256') == impronta['sha256']
+                and voce.get('settings') == self.impostazioni
+                and bool(voce.get('outputs'))
+                and voce.get('output_stats') == self._stat_uscite(voce['outputs']))
+
+    def uscite(self, input_path: str) -> list[str]:
+        """Outputs recorded for input_path by the previous run (reused instead of name(1).ext)."""
+        voce = self._voci(input_path).get(os.path.abspath(input_path)) or {}
+        return voce.get('outputs', [])
+
+    def registra(self, input_path: str, uscite: list[str]):
+        chiave = os.path.abspath(input_path)
+        impronta = self._impronte.get(chiave)
+        if impronta is None:
+            return
+        self._voci(input_path)[chiave] = {**impronta, 'settings': self.impostazioni,
+                                          'outputs': [os.path.abspath(u) for u in uscite]}
+        self._registrate[chiave] = self.cartella_di(input_path)
+
+    def filtra(self, file_list: list[str], log_fn, progress_fn) -> tuple[list[int], dict[int, dict]]:
+        """Split file_list into the indices of the files to process and the
+        results, by index, of the unchanged ones."""
+        da_fare, saltati = [], {}
+        sporche = set()  # outputs about to be rewritten by a file that reruns
+        for i, path in enumerate(file_list):
+            uscite = {os.path.normcase(os.path.abspath(u)) for u in self.uscite(path)}
+            if not self._aggiornato(path) or uscite & sporche:
+                da_fare.append(i)
+                if self.uscite_di:
+                    uscite.update(os.path.normcase(os.path.abspath(u)) for u in self.uscite_di(path))
+                sporche |= uscite
+                continue
+            log_fn(f"[SKIP] Unchanged: {os.path.basename(path)}")
+            risultato = {"file": path, "status": "unchanged", "outputs": self.uscite(path),
+                         "error": None, "seconds": 0.0}
+            saltati[i] = risultato
+            self.registra(path, risultato["outputs"])
+            if progress_fn:
+                progress_fn(len(saltati), len(file_list), risultato)
+        return da_fare, saltati
+
+    def progress(self, progress_fn, saltati: int, totale: int):
+        """Wrap progress_fn: record finished files and count the skipped ones."""
+        def _progress(completati, _totale, risultato):
+            if risultato["status"] == "ok":
+                self.registra(risultato["file"], risultato["outputs"])
+            if progress_fn:
+                progress_fn(saltati + completati, totale, risultato)
+        return _progress
+
+    def salva(self):
+        # output stats are taken once the whole run is over, so files shared
+        # by several inputs are recorded as the last one left them
+        for chiave, cartella in self._registrate.items():
+            voce = self._cartelle[cartella][self.modalita][chiave]
+            voce['output_stats'] = self._stat_uscite(voce['outputs'])
+        for cartella in set(self._registrate.values()):
+            percorso = os.path.join(cartella, MANIFEST_INCREMENTALE)
+            tmp = percorso + '.tmp'
+            try:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(self._cartelle[cartella], f, indent=1)
+                os.replace(tmp, percorso)
+            except OSError:
                 pass
+        self._registrate.clear()
+
+
+def _esegui_incrementale(file_list: list[str], modalita: str, impostazioni: dict, output_dir: str | None,
+                         log_fn, progress_fn, esegui, uscite_di=None) -> list[dict]:
+    """Run esegui(file_list, progress_fn, manifest) on the files whose outputs are
+    not current (manifest=None when not incremental: impostazioni is None).
+    Results keep the order of file_list, skipped files included; uscite_di
+    is passed to _ManifestIncrementale."""
+    if impostazioni is None:
+        return esegui(file_list, progress_fn, None)
+    manifest = _ManifestIncrementale(modalita, impostazioni,
+                                     lambda p: output_dir if output_dir else os.path.dirname(p), uscite_di)
+    da_fare, saltati = manifest.filtra(file_list, log_fn, progress_fn)
+    try:
+        eseguiti = iter(esegui([file_list[i] for i in da_fare],
+                               manifest.progress(progress_fn, len(saltati), len(file_list)), manifest))
+        return [saltati[i] if i in saltati else next(eseguiti) for i in range(len(file_list))]
+    finally:
+        manifest.salva()
+
+
+# ── Batch execution ────────────────────────────────────────────────────────────
+JOBS_DEFAULT = os.cpu_count() or 1
+
+_pool = None  # ProcessPoolExecutor, created by the first parallel batch
+_pool_jobs = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(jobs: int):
+    """Shared worker pool, recreated only when the worker count changes."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    global _pool, _pool_jobs
+    with _pool_lock:
+        if _pool is None or _pool_jobs != jobs:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: safe to start from the GUI worker thread on every platform
+            _pool = ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context("spawn"))
+            _pool_jobs = jobs
+        return _pool
+
+
+def _scarta_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def libera_pool():
+    """Stop the shared worker processes, waiting for the running tasks (queued
+    ones are cancelled). The next parallel batch starts a new pool."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+atexit.register(libera_pool)
+
+
+def avvia_pool(jobs: int | None = None):
+    """Start the shared worker processes now instead of on the first parallel
+    batch (e.g. while the caller is still small, or before timing a batch).
+    Returns once every worker is up; jobs as in esegui_batch."""
+    jobs = jobs or JOBS_DEFAULT
+    if jobs <= 1:
+        return
+    pool = _get_pool(jobs)
+    # tasks submitted together find no idle worker, so each one spawns its own
+    for futuro in [pool.submit(time.sleep, 0) for _ in range(jobs)]:
+        futuro.result()
+
+
+def _esegui_compito(compito, args: tuple, log_fn=None):
+    """Run compito(*args, log_fn) capturing its log lines and isolating errors.
+    Returns (log lines, result dict without the file name)."""
+    messaggi = []
+    t0 = time.perf_counter()
+    try:
+        uscite = compito(*args, log_fn or messaggi.append)
+        esito = {"status": "skipped" if uscite is None else "ok",
+                 "outputs": uscite or [], "error": None}
+    except Exception as e:
+        esito = {"status": "error", "outputs": [], "error": str(e)}
+    esito["seconds"] = round(time.perf_counter() - t0, 4)
+    return messaggi, esito
+
+
+# ── Structured events ─────────────────────────────────────────────────────────
+# The batch functions accept eventi_fn(evento), called with dicts:
+#   {"event": "started",  "file", "index", "total"}            job handed to a worker
+#   {"event": "stage",    "file", "stage", "seconds"[, "batch"]} decode / inference / encode / process
+#   {"event": "finished", "file", "status", "seconds", "bytes_in", "bytes_out",
+#                         "error", "completed", "total"}          one per input, in input order
+# Stage events of the background-removal pipeline come from its threads, so
+# eventi_fn must be thread-safe (TempiBatch is).
+
+def _notifica(eventi_fn, evento: str, file: str, **dati):
+    if eventi_fn is not None:
+        eventi_fn({"event": evento, "file": file, **dati})
+
+
+def _dimensione_file(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _progress_con_eventi(progress_fn, eventi_fn):
+    """Wrap progress_fn so that every delivered result also emits a "finished" event."""
+    if eventi_fn is None:
+        return progress_fn
+
+    def _progress(completati, totale, risultato):
+        _notifica(eventi_fn, "finished", risultato["file"], status=risultato["status"],
+                  seconds=risultato["seconds"], bytes_in=_dimensione_file(risultato["file"]),
+                  bytes_out=sum(_dimensione_file(u) for u in risultato["outputs"]),
+                  error=risultato["error"], completed=completati, total=totale)
+        if progress_fn:
+            progress_fn(completati, totale, risultato)
+    return _progress
+
+
+class TempiBatch:
+    """
+    eventi_fn that collects per-stage durations and summarizes them as
+    percentiles and histograms (for capacity planning). Thread-safe; events
+    are forwarded to inoltra, if given, after being recorded.
+    """
+    LIMITI_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+    def __init__(self, inoltra=None):
+        self.inoltra = inoltra
+        self._fasi: dict[str, list[float]] = {}
+        self._stati: dict[str, int] = {}
+        self._byte = [0, 0]
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+
+    def __call__(self, evento: dict):
+        with self._lock:
+            if evento["event"] == "stage":
+                self._fasi.setdefault(evento["stage"], []).append(evento["seconds"])
+            elif evento["event"] == "finished":
+                self._stati[evento["status"]] = self._stati.get(evento["status"], 0) + 1
+                self._byte[0] += evento["bytes_in"]
+                self._byte[1] += evento["bytes_out"]
+        if self.inoltra:
+            self.inoltra(evento)
+
+    def _riepilogo_fase(self, durate: list[float]) -> dict:
+        ordinate = sorted(durate)
+
+        def _percentile(p):
+            return ordinate[min(len(ordinate) - 1, int(p / 100 * len(ordinate)))]
+
+        conteggi = [0] * (len(self.LIMITI_MS) + 1)
+        for secondi in ordinate:
+            i = next((i for i, limite in enumerate(self.LIMITI_MS) if secondi * 1000 <= limite),
+                     len(self.LIMITI_MS))
+            conteggi[i] += 1
+        return {
+            "count": len(ordinate), "total_s": round(sum(ordinate), 4),
+            "mean_s": round(sum(ordinate) / len(ordinate), 4),
+            "p50_s": round(_percentile(50), 4), "p90_s": round(_percentile(90), 4),
+            "p99_s": round(_percentile(99), 4), "max_s": round(ordinate[-1], 4),
+            "histogram_ms": [{"le": limite, "count": n} for limite, n in zip(self.LIMITI_MS, conteggi)]
+                            + [{"le": None, "count": conteggi[-1]}],
+        }
+
+    def riepilogo(self) -> dict:
+        with self._lock:
+            fasi = {fase: list(durate) for fase, durate in self._fasi.items()}
+            stati, byte = dict(self._stati), list(self._byte)
+        return {
+            "wall_s": round(time.perf_counter() - self._t0, 4),
+            "files": stati, "bytes_in": byte[0], "bytes_out": byte[1],
+            "stages": {fase: self._riepilogo_fase(durate) for fase, durate in fasi.items() if durate},
+        }
+
+    def esporta(self, path: str):
+        """Write riepilogo() as JSON."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.riepilogo(), f, indent=2)
+
+
+def esegui_batch(compito, lavori, totale: int, log_fn=print, jobs: int | None = None,
+                 progress_fn=None, esclusivo=None, eventi_fn=None, fase: str = "process") -> list[dict]:
+    """Run compito(*args, log_fn) for each args tuple of lavori on a process pool.
+
+    compito is a module-level function whose first argument is the input
+    path; it returns the list of files written (None = skipped) and may raise,
+    which only fails that file. Log lines, progress_fn(completed, total,
+    result) and the returned results follow the input order. esclusivo(args)
+    returns the files a job writes when they are not unique to its input
+    (e.g. favicon.ico): jobs sharing one of them never run at the same time,
+    so the last input in order writes it last. jobs=1 runs everything in the
+    calling process.
+    eventi_fn receives "started" per job and a "stage" event named fase with
+    the worker time of each file.
+    The pool keeps the configured jobs size whatever totale is, so short
+    batches (e.g. incremental folder-scan rounds) reuse the warm workers;
+    only the tasks in flight are capped by totale.
+    """
+    jobs = max(1, jobs or JOBS_DEFAULT)
+    in_volo = 2 * min(jobs, totale)
+    risultati = []
+    avviati = 0
+
+    def _avvia(args):
+        nonlocal avviati
+        avviati += 1
+        _notifica(eventi_fn, "started", args[0], index=avviati, total=totale)
+
+    def _consegna(args, messaggi, esito):
+        nome = os.path.basename(args[0])
+        _notifica(eventi_fn, "stage", args[0], stage=fase, seconds=esito["seconds"])
+        for msg in messaggi:
+            log_fn(msg)
+        if esito["error"] is not None:
+            log_fn(f"[ERROR] {nome}: {esito['error']}")
+        risultato = {"file": args[0], **esito}
+        risultati.append(risultato)
+        if progress_fn:
+            progress_fn(len(risultati), totale, risultato)
+
+    with _pool_lock:
+        pool_pronto = _pool is not None and _pool_jobs == jobs
+    if jobs == 1 or (totale <= 1 and not pool_pronto):  # one file does not pay for starting the workers
+        for args in lavori:
+            _avvia(args)
+            _consegna(args, *_esegui_compito(compito, args, log_fn))
+        return risultati
+
+    from concurrent.futures.process import BrokenProcessPool
+    pool = _get_pool(jobs)
+    in_corso = deque()
+
+    def _attendi_primo():
+        args, _, futuro = in_corso.popleft()
+        try:
+            esito = futuro.result()
+        except BrokenProcessPool as e:
+            _scarta_pool()
+            esito = [], {"status": "error", "outputs": [], "error": f"worker crashed ({e})", "seconds": 0.0}
+        except Exception as e:
+            # e.g. args or result that cannot be pickled, or cancelled with a discarded pool
+            esito = [], {"status": "error", "outputs": [], "error": f"{type(e).__name__}: {e}".rstrip(": "),
+                         "seconds": 0.0}
+        _consegna(args, *esito)
+
+    for args in lavori:
+        uscite = frozenset(os.path.normcase(os.path.abspath(u)) for u in (esclusivo(args) if esclusivo else ()))
+        while in_corso and (len(in_corso) >= in_volo or any(uscite & u for _, u, _ in in_corso)):
+            _attendi_primo()
+        _avvia(args)
+        try:
+            futuro = pool.submit(_esegui_compito, compito, args)
+        except (BrokenProcessPool, RuntimeError):
+            pool = _get_pool(jobs)
+            futuro = pool.submit(_esegui_compito, compito, args)
+        in_corso.append((args, uscite, futuro))
+    while in_corso:
+        _attendi_primo()
+    return risultati
+
+
+def _apri_immagine(input_path: str) -> Image.Image:
+    """Decode one input with Pillow; SVG is rendered to 512×512 first, as in the ICO pipeline."""
+    if input_path.lower().endswith('.svg'):
+        return _render_svg_to_png(input_path)
+    return Image.open(input_path)
+
+
+def _apri_sorgente(input_path: str, log_fn) -> Image.Image | None:
+    """Check and decode one input of the ICO pipeline (SVG is rendered to 512×512).
+    Returns None, after logging the reason, if the file must be skipped;
+    raises, like the other modes, if it is missing or cannot be decoded."""
+    nome = os.path.basename(input_path)
+
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f"File not found: {nome}")
+
+    _, ext = os.path.splitext(input_path)
+    if ext.lower() not in SUPPORTED_EXT:
+        log_fn(f"[SKIP] Unsupported format ({ext}): {nome}")
+        return None
+
+    # Render SVG to PNG if needed (before Image.open)
+    if ext.lower() == '.svg':
+        try:
+            log_fn(f"[...] Rendering SVG: {nome}")
+            img = _render_svg_to_png(input_path)
+            log_fn(f"[OK] SVG rendered to PNG 512×512")
+        except Exception as e:
+            raise ValueError(f"SVG rendering failed: {e}") from e
+        return img
+    return Image.open(input_path)
+
+
+def _riduci_per_uscita(img: Image.Image, lato: int, quadrato: bool) -> Image.Image:
+    """Smallest downscale of img that still feeds a lato×lato output at full quality.
+
+    With quadrato the image is padded to a square, so its longest side must
+    stay ≥ lato; otherwise it is stretched to the square, so both sides must.
+    JPEGs are decoded at a reduced DCT scale (draft) when that is enough.
+    """
+    w, h = img.size
+    fattore = lato / (max(w, h) if quadrato else min(w, h))
+    if fattore >= 1:
+        return img
+    ridotta = (max(1, round(w * fattore)), max(1, round(h * fattore)))
+    img.draft(None, ridotta)
+    return img.resize(ridotta, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def _percorsi_uscita(input_path: str, output_dir: str | None, rimuovi_bg: bool, converti_ico: bool,
+                     riservati: set[str] | None = None, propri=()) -> tuple[str | None, str | None]:
+    """Unique output paths (_nobg.png, .ico) of the ICO pipeline, None if not produced."""
+    cartella_out = output_dir if output_dir else os.path.dirname(input_path)
+    nome_base = os.path.splitext(os.path.basename(input_path))[0]
+    png_nobg = (_path_univoco(os.path.join(cartella_out, nome_base + '_nobg.png'), riservati, propri)
+                if rimuovi_bg else None)
+    output_ico = (_path_univoco(os.path.join(cartella_out, nome_base + '.ico'), riservati, propri)
+                  if converti_ico else None)
+    return png_nobg, output_ico
+
+
+def _salva_risultati(img: Image.Image, png_nobg: str | None, output_ico: str | None, quadrato: bool,
+                     log_fn) -> list[str]:
+    """Write the outputs of the ICO pipeline for an already decoded (and cleaned) image."""
+    uscite = []
+
+    if png_nobg:
+        img.save(png_nobg, format='PNG')
+        uscite.append(png_nobg)
+        log_fn(f"[OK] PNG no-background: {os.path.basename(png_nobg)}")
+
+    if quadrato:
+        img = ritaglia_quadrato(img)
+
+    if output_ico:
+        salva_ico(img, output_ico)
+        uscite.append(output_ico)
+        log_fn(f"[OK] ICO saved: {os.path.basename(output_ico)}")
+
+    return uscite
+
+
+def _elabora_compito(input_path: str, png_nobg: str | None, output_ico: str | None, quadrato: bool,
+                     log_fn) -> list[str] | None:
+    """Batch task: decode, square and encode one file (no background removal)."""
+    img = _apri_sorgente(input_path, log_fn)
+    if img is None:
+        return None
+    return _salva_risultati(img, png_nobg, output_ico, quadrato, log_fn)
+
+
+def _salva_risultati_compito(input_path: str, img: Image.Image | None, errore: str | None,
+                             png_nobg: str | None, output_ico: str | None, quadrato: bool,
+                             log_fn) -> list[str] | None:
+    """Batch task: encode one file whose background was already removed."""
+    if errore is not None:
+        raise RuntimeError(errore)
+    if img is None:
+        return None
+    return _salva_risultati(img, png_nobg, output_ico, quadrato, log_fn)
 
 
 def elabora_file(
@@ -298,55 +1884,237 @@ def elabora_file(
     """
     nome = os.path.basename(input_path)
 
-    if not os.path.exists(input_path):
-        log_fn(f"[ERROR] File not found: {nome}")
-        return
-
-    _, ext = os.path.splitext(input_path)
-    if ext.lower() not in SUPPORTED_EXT:
-        log_fn(f"[SKIP] Unsupported format ({ext}): {nome}")
-        return
-
-    cartella_out = output_dir if output_dir else os.path.dirname(input_path)
-    nome_base = os.path.splitext(nome)[0]
-
     try:
-        # Render SVG to PNG if needed (before Image.open)
-        if ext.lower() == '.svg':
-            try:
-                log_fn(f"[...] Rendering SVG: {nome}")
-                img = _render_svg_to_png(input_path)
-                log_fn(f"[OK] SVG rendered to PNG 512×512")
-            except Exception as e:
-                log_fn(f"[ERROR] SVG rendering failed: {e}")
-                return
-        else:
-            img = Image.open(input_path)
+        img = _apri_sorgente(input_path, log_fn)
+        if img is None:
+            return
 
         if rimuovi_bg:
             log_fn(f"[...] Background removal [{modello}] [{provider.upper()}]: {nome}")
             img = rimuovi_sfondo(img, modello, log_fn, provider=provider)
-            png_nobg = _path_univoco(os.path.join(cartella_out, nome_base + '_nobg.png'))
-            img.save(png_nobg, format='PNG')
-            log_fn(f"[OK] PNG no-background: {os.path.basename(png_nobg)}")
 
-        if quadrato:
-            img = ritaglia_quadrato(img)
-
-        if converti_ico:
-            output_path = _path_univoco(os.path.join(cartella_out, nome_base + '.ico'))
-            salva_ico(img, output_path)
-            log_fn(f"[OK] ICO saved: {os.path.basename(output_path)}")
+        png_nobg, output_ico = _percorsi_uscita(input_path, output_dir, rimuovi_bg, converti_ico)
+        _salva_risultati(img, png_nobg, output_ico, quadrato, log_fn)
 
     except Exception as e:
         log_fn(f"[ERROR] {nome}: {e}")
 
 
+def elabora_batch(
+    file_list: list[str],
+    output_dir: str | None,
+    rimuovi_bg: bool,
+    quadrato: bool,
+    converti_ico: bool,
+    modello: str = MODELLO_DEFAULT,
+    log_fn=print,
+    provider: str = "cpu",
+    dimensione_batch: int = DIMENSIONE_BATCH_DEFAULT,
+    progress_fn=None,
+    jobs: int | None = None,
+    decoder: int = DECODER_DEFAULT,
+    incrementale: bool = False,
+    png_nobg: bool = True,
+    eventi_fn=None,
+    usa_cache: bool = True,
+    raffina: bool | None = None,
+    thread: int | None = None,
+) -> list[dict]:
+    """
+    ICO pipeline over a list of files, see esegui_batch for jobs/progress_fn.
+    With rimuovi_bg it runs as a streaming pipeline: decoder threads → one
+    batched inference stage → encoder/writer process pool, connected by
+    bounded queues so memory stays flat regardless of the batch size.
+    Busy time per stage is logged at the end of the run.
+    incrementale: skip files whose outputs are current (see _ManifestIncrementale)
+    png_nobg: also write the full-resolution _nobg.png when removing the
+        background. Without it (ICO only) sources are downscaled to the
+        512 px icon master before inference.
+    eventi_fn: receives structured per-file events (see _notifica)
+    usa_cache: False bypasses the background-removal result cache
+    raffina: guided-filter edge refinement (default RAFFINA_BORDI)
+    thread: ONNX Runtime intra-op threads (default: see _thread_inferenza)
+    """
+    riservati = set()
+    tempi = {}
+    t0 = time.perf_counter()
+    cache_prima = _snapshot_cache()
+    png_nobg = rimuovi_bg and (png_nobg or not converti_ico)
+    raffina = RAFFINA_BORDI if raffina is None else raffina
+
+    def _apri(path):
+        img = _apri_sorgente(path, log_fn)
+        if img is not None and not png_nobg:
+            img = _riduci_per_uscita(img, 512, quadrato)
+        return img
+
+    def _esegui(file_list, progress_fn, manifest):
+        propri = manifest.uscite if manifest else (lambda p: ())
+
+        def _lavori():
+            if not rimuovi_bg:
+                for path in file_list:
+                    yield (path, *_percorsi_uscita(path, output_dir, False, converti_ico, riservati,
+                                                   propri(path)), quadrato)
+                return
+            sorgenti = _sfondi_rimossi_pipeline(
+                file_list, _apri, modello, log_fn, provider, dimensione_batch, decoder, tempi, eventi_fn, jobs,
+                usa_cache, raffina, thread)
+            for path, img, errore in sorgenti:
+                yield (path, img, None if errore is None else str(errore),
+                       *_percorsi_uscita(path, output_dir, png_nobg, converti_ico, riservati, propri(path)),
+                       quadrato)
+
+        compito = _salva_risultati_compito if rimuovi_bg else _elabora_compito
+        return esegui_batch(compito, _lavori(), len(file_list), log_fn, jobs=jobs, progress_fn=progress_fn,
+                            eventi_fn=eventi_fn, fase="encode" if rimuovi_bg else "process")
+
+    impostazioni = ({"rimuovi_bg": rimuovi_bg, "quadrato": quadrato, "converti_ico": converti_ico,
+                     "modello": modello if rimuovi_bg else None, "png_nobg": png_nobg,
+                     "raffina": raffina and rimuovi_bg} if incrementale else None)
+    risultati = _esegui_incrementale(file_list, "ico", impostazioni, output_dir, log_fn,
+                                     _progress_con_eventi(progress_fn, eventi_fn), _esegui)
+
+    tempi['encode'] = sum(r['seconds'] for r in risultati)
+    fasi = ", ".join(f"{fase} {secondi:.1f}s" for fase, secondi in tempi.items())
+    log_fn(f"[STATS] Stage busy time: {fasi} | wall {time.perf_counter() - t0:.1f}s")
+    _log_statistiche_cache(cache_prima, log_fn)
+    return risultati
+
+
 # ── Additional features ────────────────────────────────────────────────────────
 
+CONVERSIONE_BACKEND_DEFAULT = "pillow"  # "pillow" (in-process encoders, magick fallback) or "magick"
+
+# Destination format -> Pillow encoder
+_FORMATI_PILLOW = {'png': 'PNG', 'jpg': 'JPEG', 'jpeg': 'JPEG', 'webp': 'WEBP', 'gif': 'GIF'}
+
+
+def _ha_alpha(img: Image.Image) -> bool:
+    return img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+
+
+def _in_srgb(img: Image.Image, modo: str) -> Image.Image:
+    """Convert img to modo, going through its ICC profile when leaving CMYK."""
+    if img.mode == 'CMYK' and 'icc_profile' in img.info:
+        try:
+            from PIL import ImageCms
+            profilo_src = ImageCms.ImageCmsProfile(io.BytesIO(img.info['icc_profile']))
+            return ImageCms.profileToProfile(img, profilo_src, ImageCms.createProfile('sRGB'), outputMode=modo)
+        except Exception:
+            pass
+    return img.convert(modo)
+
+
+def _prepara_per_formato(img: Image.Image, formato: str) -> Image.Image:
+    """Bring one frame to a mode the Pillow encoder for formato accepts."""
+    if formato == 'JPEG':
+        # JPG does not support transparency: flatten onto white
+        if _ha_alpha(img):
+            img = img.convert('RGBA')
+            sfondo = Image.new('RGB', img.size, (255, 255, 255))
+            sfondo.paste(img, mask=img.split()[3])
+            return sfondo
+        return img if img.mode in ('RGB', 'L', 'CMYK') else _in_srgb(img, 'RGB')
+    if formato == 'WEBP':
+        if img.mode in ('RGB', 'RGBA'):
+            return img
+        return _in_srgb(img, 'RGBA' if _ha_alpha(img) else 'RGB')
+    if formato == 'PNG':
+        return img if img.mode in ('1', 'L', 'LA', 'I', 'I;16', 'P', 'RGB', 'RGBA') else _in_srgb(img, 'RGB')
+    # GIF: Pillow quantizes RGB/RGBA itself
+    return img if img.mode in ('1', 'L', 'P', 'RGB', 'RGBA') else _in_srgb(img, 'RGBA' if _ha_alpha(img) else 'RGB')
+
+
+def _salva_convertito(img: Image.Image, output_path: str, formato_dest: str, qualita: int):
+    """Encode img to output_path with Pillow, mirroring ImageMagick's -quality handling.
+
+    JPG/WebP use qualita directly (JPG keeps 4:4:4 chroma from 90 up, like
+    ImageMagick); PNG maps it to the zlib level (qualita // 10). ICC and EXIF
+    metadata are carried over where the format supports them, and animated
+    sources stay animated for GIF/WebP/PNG.
+    """
+    formato = _FORMATI_PILLOW[formato_dest]
+    opzioni = {}
+    if formato == 'JPEG':
+        opzioni = {'quality': qualita, 'subsampling': 0 if qualita >= 90 else 2}
+    elif formato == 'WEBP':
+        opzioni = {'quality': qualita}
+    elif formato == 'PNG':
+        opzioni = {'compress_level': min(qualita // 10, 9)}
+
+    frames = [img]
+    if getattr(img, 'n_frames', 1) > 1 and formato != 'JPEG':
+        from PIL import ImageSequence
+        frames = [frame.copy() if formato == 'GIF' or frame.mode != 'P' else frame.convert('RGBA')
+                  for frame in ImageSequence.Iterator(img)]
+        opzioni.update(save_all=True, append_images=[], loop=img.info.get('loop', 0))
+        if 'duration' in img.info:
+            opzioni['duration'] = [frame.info.get('duration', img.info['duration']) for frame in frames]
+
+    convertiti = [_prepara_per_formato(frame, formato) for frame in frames]
+    if formato != 'GIF':
+        # Keep the embedded profile unless CMYK pixels were moved to sRGB
+        if img.info.get('icc_profile') and (img.mode != 'CMYK' or convertiti[0].mode == 'CMYK'):
+            opzioni['icc_profile'] = img.info['icc_profile']
+        if img.info.get('exif'):
+            opzioni['exif'] = img.info['exif']
+    if len(convertiti) > 1:
+        opzioni['append_images'] = convertiti[1:]
+    convertiti[0].save(output_path, formato, **opzioni)
+
+
+def _converti_compito(input_path: str, img: Image.Image | None, errore: str | None, output_path: str,
+                      indice: str, formato_dest: str, qualita: int, preprocessa: bool, quadrato: bool,
+                      backend: str, magick_path: str | None, log_fn) -> list[str]:
+    """Batch task: convert one file (img is set when its background was removed).
+
+    The "pillow" backend encodes in process and falls back to ImageMagick for
+    inputs Pillow cannot decode (or an encoder missing from this Pillow build).
+    """
+    if errore is not None:
+        raise RuntimeError(errore)
+    nome = os.path.basename(input_path)
+    log_fn(f"[...] Converting {indice}: {nome} -> {formato_dest.upper()}")
+
+    Image.init()
+    pillow = backend == "pillow" and _FORMATI_PILLOW[formato_dest] in Image.SAVE
+    if img is None and (pillow or preprocessa):
+        try:
+            img = _apri_immagine(input_path) if preprocessa else Image.open(input_path)
+        except Exception:
+            if preprocessa:
+                raise
+            pillow = False  # e.g. SVG: leave decoding to ImageMagick
+
+    if preprocessa:
+        # Crop to square (background already removed in batch)
+        if quadrato:
+            img = ritaglia_quadrato(img)
+
+        # For JPG: convert RGBA → RGB (JPG does not support transparency)
+        if formato_dest in ('jpg', 'jpeg') and img.mode == 'RGBA':
+            img = _prepara_per_formato(img, 'JPEG')
+
+    if pillow:
+        _salva_convertito(img, output_path, formato_dest, qualita)
+    elif preprocessa:
+        # Hand the pixels to ImageMagick on stdin for the quality conversion
+        _esegui_magick(['png:-', '-quality', str(qualita), output_path], _png_bytes(img), magick_path)
+    else:
+        # No preprocessing: direct conversion with ImageMagick
+        _esegui_magick([input_path, '-quality', str(qualita), output_path], magick_path=magick_path)
+
+    log_fn(f"[OK] Converted: {os.path.basename(output_path)}")
+    return [output_path]
+
+
 def converti_formato_batch(file_list: list[str], formato_dest: str, qualita: int, output_dir: str, log_fn,
                             rimuovi_bg: bool = False, modello: str = MODELLO_DEFAULT, quadrato: bool = False,
-                            provider: str = "cpu"):
+                            provider: str = "cpu", dimensione_batch: int = DIMENSIONE_BATCH_DEFAULT,
+                            jobs: int | None = None, progress_fn=None,
+                            incrementale: bool = False, eventi_fn=None, usa_cache: bool = True,
+                            raffina: bool | None = None, thread: int | None = None) -> list[dict]:
     """Batch convert files between PNG/JPG/WebP/GIF.
 
     Args:
@@ -358,72 +2126,126 @@ def converti_formato_batch(file_list: list[str], formato_dest: str, qualita: int
         rimuovi_bg: If True, remove background with rembg before converting
         modello: rembg model to use
         quadrato: If True, crop to square before converting
+        dimensione_batch: Images per batched background-removal inference
+        jobs: Worker processes (None = all cores, 1 = no pool)
+        progress_fn: Called as progress_fn(completed, total, result) per file
+        incrementale: Skip files whose outputs are current (manifest in the output folder)
+        eventi_fn: Receives structured per-file events (see _notifica)
+        usa_cache: False bypasses the background-removal result cache
+        raffina: Guided-filter edge refinement (default RAFFINA_BORDI)
+        thread: ONNX Runtime intra-op threads (default: see _thread_inferenza)
     """
     if not file_list:
         log_fn("[!] No files in list.")
-        return
+        return []
 
     formato_dest = formato_dest.lower()
     if formato_dest not in ['png', 'jpg', 'jpeg', 'webp', 'gif']:
         log_fn(f"[ERROR] Unsupported format: {formato_dest}")
-        return
+        return []
 
-    magick_path = _get_imagemagick_path()
+    backend = CONVERSIONE_BACKEND_DEFAULT
+    magick_path = _get_imagemagick_path() if backend == "magick" else None  # else resolved only on fallback
     preprocessa = rimuovi_bg or quadrato
+    ext_output = '.jpg' if formato_dest == 'jpeg' else f'.{formato_dest}'
+    riservati = set()
 
-    for i, input_path in enumerate(file_list, 1):
-        nome = os.path.basename(input_path)
-        nome_base = os.path.splitext(nome)[0]
-        tmp_png = None
-
-        try:
-            cartella_out = output_dir if output_dir else os.path.dirname(input_path)
-            ext_output = '.jpg' if formato_dest == 'jpeg' else f'.{formato_dest}'
-            output_path = _path_univoco(os.path.join(cartella_out, nome_base + ext_output))
-
-            log_fn(f"[...] Converting {i}/{len(file_list)}: {nome} -> {formato_dest.upper()}")
-
-            if preprocessa:
-                # Load with PIL to apply rembg and/or crop to square
-                img = Image.open(input_path)
-
-                if rimuovi_bg:
-                    log_fn(f"[...] Background removal [{modello}] [{provider.upper()}]: {nome}")
-                    img = rimuovi_sfondo(img, modello, log_fn, provider=provider)
-
-                if quadrato:
-                    img = ritaglia_quadrato(img)
+    def _esegui(file_list, progress_fn, manifest):
+        if rimuovi_bg:
+            sorgenti = _sfondi_rimossi_pipeline(file_list, _apri_immagine, modello, log_fn, provider, dimensione_batch,
+                                                eventi_fn=eventi_fn, jobs=jobs, usa_cache=usa_cache,
+                                                raffina=raffina, thread=thread)
+        else:
+            sorgenti = ((path, None, None) for path in file_list)
+
+        def _lavori():
+            for i, (input_path, img, errore) in enumerate(sorgenti, 1):
+                cartella_out = output_dir if output_dir else os.path.dirname(input_path)
+                nome_base = os.path.splitext(os.path.basename(input_path))[0]
+                output_path = _path_univoco(os.path.join(cartella_out, nome_base + ext_output), riservati,
+                                            manifest.uscite(input_path) if manifest else ())
+                yield (input_path, img, None if errore is None else str(errore), output_path,
+                       f"{i}/{len(file_list)}", formato_dest, qualita, preprocessa, quadrato, backend,
+                       magick_path)
+
+        return esegui_batch(_converti_compito, _lavori(), len(file_list), log_fn, jobs=jobs,
+                            progress_fn=progress_fn, eventi_fn=eventi_fn,
+                            fase="encode" if rimuovi_bg else "process")
+
+    raffina = RAFFINA_BORDI if raffina is None else raffina
+    impostazioni = ({"formato": ext_output, "qualita": qualita, "rimuovi_bg": rimuovi_bg, "quadrato": quadrato,
+                     "modello": modello if rimuovi_bg else None, "raffina": raffina and rimuovi_bg}
+                    if incrementale else None)
+    cache_prima = _snapshot_cache()
+    risultati = _esegui_incrementale(file_list, "format", impostazioni, output_dir, log_fn,
+                                     _progress_con_eventi(progress_fn, eventi_fn), _esegui)
+    _log_statistiche_cache(cache_prima, log_fn)
+    return risultati
+
+
+# favicon PNG outputs: (side, file name, log label)
+FAVICON_PNG = [
+    (32, 'favicon.png', '32x32'),
+    (192, 'favicon-192.png', 'Android'),
+    (512, 'favicon-512.png', 'iOS'),
+]
 
-                # For JPG: convert RGBA → RGB (JPG does not support transparency)
-                if formato_dest in ('jpg', 'jpeg') and img.mode == 'RGBA':
-                    sfondo = Image.new('RGB', img.size, (255, 255, 255))
-                    sfondo.paste(img, mask=img.split()[3])
-                    img = sfondo
 
-                # Save to temp PNG and let ImageMagick handle quality conversion
-                with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-                    tmp_png = tmp.name
-                    img.save(tmp_png, 'PNG')
+def _uscite_favicon(cartella_out: str) -> list[str]:
+    """Files every favicon job writes into cartella_out (fixed names)."""
+    nomi = ['favicon.ico'] + [nome_file for _, nome_file, _ in FAVICON_PNG] + ['manifest.json']
+    return [os.path.join(cartella_out, nome) for nome in nomi]
 
-                cmd = [magick_path, tmp_png, '-quality', str(qualita), output_path]
-            else:
-                # No preprocessing: direct conversion with ImageMagick
-                cmd = [magick_path, input_path, '-quality', str(qualita), output_path]
 
-            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=_NO_WINDOW)
-            log_fn(f"[OK] Converted: {os.path.basename(output_path)}")
+def _favicon_compito(input_path: str, cartella_out: str, indice: str, log_fn) -> list[str]:
+    """Batch task: full favicon set for one file."""
+    nome = os.path.basename(input_path)
+    nome_base = os.path.splitext(nome)[0]
+    lati_ico = sorted((w for w, _ in ICON_SIZES), reverse=True)
+    uscite = []
+
+    log_fn(f"[...] Favicon {indice}: {nome}")
+
+    img = _apri_immagine(input_path)
+    piramide = _piramide_resize(_master_512(img), lati_ico + [lato for lato, _, _ in FAVICON_PNG])
+
+    # 1. favicon.ico (7 frames)
+    ico_path = os.path.join(cartella_out, 'favicon.ico')
+    _scrivi_ico([piramide[lato] for lato in lati_ico], ico_path)
+    uscite.append(ico_path)
+    log_fn(f"  [OK] favicon.ico")
+
+    # 2-4. favicon.png (32x32), favicon-192.png (Android), favicon-512.png (iOS)
+    for lato, nome_file, etichetta in FAVICON_PNG:
+        png_path = os.path.join(cartella_out, nome_file)
+        piramide[lato].save(png_path, 'PNG')
+        uscite.append(png_path)
+        log_fn(f"  [OK] {nome_file} ({etichetta})")
+
+    # 5. manifest.json (PWA)
+    manifest = {
+        "name": nome_base,
+        "short_name": nome_base[:12],
+        "icons": [
+            {"src": "favicon-192.png", "sizes": "192x192", "type": "image/png"},
+            {"src": "favicon-512.png", "sizes": "512x512", "type": "image/png"}
+        ],
+        "theme_color": "#ffffff",
+        "background_color": "#ffffff",
+        "display": "standalone"
+    }
+    manifest_path = os.path.join(cartella_out, 'manifest.json')
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    uscite.append(manifest_path)
+    log_fn(f"  [OK] manifest.json (PWA)")
 
-        except Exception as e:
-            log_fn(f"[ERROR] {nome}: {e}")
-        finally:
-            if tmp_png and os.path.exists(tmp_png):
-                try:
-                    os.remove(tmp_png)
-                except Exception:
-                    pass
+    log_fn(f"[OK] Complete favicon generated")
+    return uscite
 
 
-def genera_favicon_batch(file_list: list[str], output_dir: str, log_fn):
+def genera_favicon_batch(file_list: list[str], output_dir: str, log_fn, jobs: int | None = None,
+                         progress_fn=None, incrementale: bool = False, eventi_fn=None) -> list[dict]:
     """Generate complete favicon (ico + png + manifest.json) for each file.
 
     Generates:
@@ -433,87 +2255,73 @@ def genera_favicon_batch(file_list: list[str], output_dir: str, log_fn):
     - favicon-512.png (iOS)
     - manifest.json (PWA)
 
+    Each source is decoded once; all sizes come from one in-memory resize
+    pyramid and are written directly, without temp files or subprocesses.
+    Files writing to the same folder are never processed concurrently, and
+    the last one in the list wins.
+
     Args:
         file_list: List of files to process
         output_dir: Output folder (None = same folder as input)
         log_fn: Logging function
+        jobs: Worker processes (None = all cores, 1 = no pool)
+        progress_fn: Called as progress_fn(completed, total, result) per file
+        incrementale: Skip files whose outputs are current (manifest in the output folder)
+        eventi_fn: Receives structured per-file events (see _notifica)
     """
     if not file_list:
         log_fn("[!] No files in list.")
-        return
+        return []
 
-    magick_path = _get_imagemagick_path()
+    def _cartella_out(input_path):
+        return output_dir if output_dir else os.path.dirname(input_path)
 
-    for i, input_path in enumerate(file_list, 1):
-        nome = os.path.basename(input_path)
-        nome_base = os.path.splitext(nome)[0]
+    def _esegui(file_list, progress_fn, manifest):
+        lavori = ((input_path, _cartella_out(input_path), f"{i}/{len(file_list)}")
+                  for i, input_path in enumerate(file_list, 1))
+        return esegui_batch(_favicon_compito, lavori, len(file_list), log_fn, jobs=jobs,
+                            progress_fn=progress_fn, esclusivo=lambda args: _uscite_favicon(args[1]),
+                            eventi_fn=eventi_fn)
 
-        try:
-            log_fn(f"[...] Favicon {i}/{len(file_list)}: {nome}")
+    return _esegui_incrementale(file_list, "favicon", {} if incrementale else None, output_dir, log_fn,
+                                _progress_con_eventi(progress_fn, eventi_fn), _esegui,
+                                lambda p: _uscite_favicon(_cartella_out(p)))
 
-            cartella_out = output_dir if output_dir else os.path.dirname(input_path)
 
-            img = Image.open(input_path)
-            if img.size != (512, 512):
-                img = img.resize((512, 512), Image.Resampling.LANCZOS)
-            img = img.convert('RGBA')
+def _app_store_compito(input_path: str, cartella_out: str, indice: str, store: str,
+                       dimensioni: list[tuple[int, int, str]], magick_path: str, log_fn) -> list[str]:
+    """Batch task: all icons of one store for one file, written by a single ImageMagick run.
+
+    The 512×512 master goes in on stdin and every size is a `+clone -resize
+    -write` branch of the same command, so a file costs one process whatever
+    the number of sizes.
+    """
+    nome = os.path.basename(input_path)
 
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-                tmp_path = tmp.name
-                img.save(tmp_path, 'PNG')
+    log_fn(f"[...] {store.upper()} Icons {indice}: {nome}")
 
-            try:
-                # 1. favicon.ico (7 frames)
-                ico_path = os.path.join(cartella_out, 'favicon.ico')
-                cmd = [magick_path, tmp_path, '-define', 'icon:auto-resize=256,128,64,48,32,24,16', ico_path]
-                subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=_NO_WINDOW)
-                log_fn(f"  [OK] favicon.ico")
-
-                # 2. favicon.png (32x32)
-                png32_path = os.path.join(cartella_out, 'favicon.png')
-                cmd = [magick_path, tmp_path, '-resize', '32x32', png32_path]
-                subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=_NO_WINDOW)
-                log_fn(f"  [OK] favicon.png (32x32)")
-
-                # 3. favicon-192.png (Android)
-                png192_path = os.path.join(cartella_out, 'favicon-192.png')
-                cmd = [magick_path, tmp_path, '-resize', '192x192', png192_path]
-                subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=_NO_WINDOW)
-                log_fn(f"  [OK] favicon-192.png (Android)")
-
-                # 4. favicon-512.png (iOS)
-                png512_path = os.path.join(cartella_out, 'favicon-512.png')
-                cmd = [magick_path, tmp_path, '-resize', '512x512', png512_path]
-                subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=_NO_WINDOW)
-                log_fn(f"  [OK] favicon-512.png (iOS)")
-
-                # 5. manifest.json (PWA)
-                manifest = {
-                    "name": nome_base,
-                    "short_name": nome_base[:12],
-                    "icons": [
-                        {"src": "favicon-192.png", "sizes": "192x192", "type": "image/png"},
-                        {"src": "favicon-512.png", "sizes": "512x512", "type": "image/png"}
-                    ],
-                    "theme_color": "#ffffff",
-                    "background_color": "#ffffff",
-                    "display": "standalone"
-                }
-                manifest_path = os.path.join(cartella_out, 'manifest.json')
-                with open(manifest_path, 'w') as f:
-                    json.dump(manifest, f, indent=2)
-                log_fn(f"  [OK] manifest.json (PWA)")
-
-                log_fn(f"[OK] Complete favicon generated")
-
-            finally:
-                os.remove(tmp_path)
+    img = _apri_immagine(input_path).convert('RGBA')
+    if img.size != (512, 512):
+        img = img.resize((512, 512), Image.Resampling.LANCZOS)
 
-        except Exception as e:
-            log_fn(f"[ERROR] {nome}: {e}")
+    argomenti = ['png:-']
+    uscite = []
+    for w, h, nome_file in dimensioni:
+        output_path = os.path.join(cartella_out, nome_file)
+        argomenti += ['(', '+clone', '-resize', f'{w}x{h}', '-write', output_path, '+delete', ')']
+        uscite.append(output_path)
+    argomenti.append('null:')
+    _esegui_magick(argomenti, _png_bytes(img), magick_path)
 
+    for w, h, nome_file in dimensioni:
+        log_fn(f"  [OK] {nome_file} ({w}x{h})")
+    log_fn(f"[OK] {store.upper()} icons generated")
+    return uscite
 
-def genera_app_store_icons_batch(file_list: list[str], store: str, output_dir: str, log_fn):
+
+def genera_app_store_icons_batch(file_list: list[str], store: str, output_dir: str, log_fn,
+                                 jobs: int | None = None, progress_fn=None,
+                                 incrementale: bool = False, eventi_fn=None) -> list[dict]:
     """Generate icons for app stores (Google Play, Apple, Microsoft).
 
     Args:
@@ -521,10 +2329,14 @@ def genera_app_store_icons_batch(file_list: list[str], store: str, output_dir: s
         store: 'google' / 'apple' / 'microsoft'
         output_dir: Output folder
         log_fn: Logging function
+        jobs: Worker processes (None = all cores, 1 = no pool)
+        progress_fn: Called as progress_fn(completed, total, result) per file
+        incrementale: Skip files whose outputs are current (manifest in the output folder)
+        eventi_fn: Receives structured per-file events (see _notifica)
     """
     if not file_list:
         log_fn("[!] No files in list.")
-        return
+        return []
 
     store = store.lower()
 
@@ -546,40 +2358,24 @@ def genera_app_store_icons_batch(file_list: list[str], store: str, output_dir: s
 
     if store not in store_dims:
         log_fn(f"[ERROR] Unsupported store: {store}. Use: google, apple, microsoft")
-        return
+        return []
 
     magick_path = _get_imagemagick_path()
     dimensioni = store_dims[store]
 
-    for i, input_path in enumerate(file_list, 1):
-        nome = os.path.basename(input_path)
-        nome_base = os.path.splitext(nome)[0]
-
-        try:
-            log_fn(f"[...] {store.upper()} Icons {i}/{len(file_list)}: {nome}")
-
-            cartella_out = output_dir if output_dir else os.path.dirname(input_path)
+    def _uscite(cartella_out):
+        return [os.path.join(cartella_out, nome) for _, _, nome in dimensioni]
 
-            img = Image.open(input_path)
-            img = img.convert('RGBA')
-
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-                tmp_path = tmp.name
-                if img.size != (512, 512):
-                    img = img.resize((512, 512), Image.Resampling.LANCZOS)
-                img.save(tmp_path, 'PNG')
-
-            try:
-                for w, h, nome_file in dimensioni:
-                    output_path = os.path.join(cartella_out, nome_file)
-                    cmd = [magick_path, tmp_path, '-resize', f'{w}x{h}', output_path]
-                    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=_NO_WINDOW)
-                    log_fn(f"  [OK] {nome_file} ({w}x{h})")
-
-                log_fn(f"[OK] {store.upper()} icons generated")
+    def _cartella_out(input_path):
+        return output_dir if output_dir else os.path.dirname(input_path)
 
-            finally:
-                os.remove(tmp_path)
+    def _esegui(file_list, progress_fn, manifest):
+        lavori = ((input_path, _cartella_out(input_path), f"{i}/{len(file_list)}", store, dimensioni, magick_path)
+                  for i, input_path in enumerate(file_list, 1))
+        return esegui_batch(_app_store_compito, lavori, len(file_list), log_fn, jobs=jobs,
+                            progress_fn=progress_fn, eventi_fn=eventi_fn,
+                            esclusivo=lambda args: _uscite(args[1]))
 
-        except Exception as e:
-            log_fn(f"[ERROR] {nome}: {e}")
+    return _esegui_incrementale(file_list, "appstore", {"store": store} if incrementale else None, output_dir,
+                                log_fn, _progress_con_eventi(progress_fn, eventi_fn), _esegui,
+                                lambda p: _uscite(_cartella_out(p)))
@@ -24,12 +24,14 @@ venv\Scripts\python.exe -m PyInstaller --onefile --windowed ^
   --collect-all rembg ^
   --collect-all svglib ^
   --collect-all reportlab ^
+  --collect-all onnx ^
   --copy-metadata rembg ^
   --copy-metadata pymatting ^
   --copy-metadata onnxruntime ^
   --copy-metadata Pillow ^
   --copy-metadata numpy ^
   --hidden-import=click ^
+  --hidden-import=onnxruntime.quantization ^
   --add-data "src\assets\RembgExporter.ico;src\assets" ^
   --add-data "src\third-party\imagemagick;imagemagick" ^
   app.py
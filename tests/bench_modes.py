@@ -0,0 +1,345 @@
+"""Throughput, stage latencies and peak memory of every processing mode.
+
+Run with: venv\Scripts\python tests\bench_modes.py [--modes ico,format,...] [--repeat 3]
+          [--save tests\bench_baseline.json] [--baseline tests\bench_baseline.json]
+
+A synthetic corpus (JPEG and alpha PNG at several sizes, animated GIF, SVG)
+is generated once, then each mode runs on it in a fresh subprocess, so peak
+RSS and caches are per mode. Background removal uses a stub rembg module
+with a fixed amount of numpy work instead of a real model: it runs offline
+and its cost does not change between commits, so differences come from the
+code around inference. The result cache is disabled.
+
+--save writes the results (with the current commit) as JSON; --baseline
+compares against such a file and exits with status 1 if a mode lost more
+than --tolerance of its throughput. A mode where any file fails is reported
+with its errors, left out of the results and makes the run exit with status 1:
+its throughput would not be comparable.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LATI = ((256, 256), (1024, 768), (3000, 2000))
+
+# Stand-in for rembg: same API as the parts core uses (new_session, remove,
+# session.inner_session for batched inference), cheap but not free.
+STUB_REMBG = '''
+"""Offline rembg stub for tests/bench_modes.py."""
+import numpy as np
+from PIL import Image
+
+
+class _Ingresso:
+    name = "input.1"
+    shape = ["batch", 3, 320, 320]
+
+
+class _Grafo:
+    def get_inputs(self):
+        return [_Ingresso()]
+
+    def run(self, uscite, ingressi):
+        mappa = next(iter(ingressi.values())).mean(axis=1, keepdims=True)
+        for _ in range(8):
+            mappa = (mappa + np.roll(mappa, 1, axis=2) + np.roll(mappa, 1, axis=3)) / 3
+        return [mappa]
+
+
+class _Sessione:
+    def __init__(self, nome):
+        self.model_name = nome
+        self.inner_session = _Grafo()
+
+
+def new_session(nome="u2net", *args, **kwargs):
+    return _Sessione(nome)
+
+
+def remove(data, session=None, **kwargs):
+    img = data.convert("RGBA")
+    ridotta = img.convert("RGB").resize((320, 320))
+    tensore = np.asarray(ridotta, dtype=np.float32).transpose(2, 0, 1)[None] / 255
+    mappa = session.inner_session.run(None, {"input.1": tensore})[0][0, 0]
+    maschera = Image.fromarray((mappa * 255).astype(np.uint8)).resize(img.size)
+    return Image.composite(img, Image.new("RGBA", img.size, 0), maschera)
+'''
+
+SVG = ('<svg xmlns="http://www.w3.org/2000/svg" width="512" height="512">'
+       '<rect width="512" height="512" fill="#2b6cb0"/>'
+       '<circle cx="256" cy="256" r="180" fill="#f6ad55"/>'
+       '<path d="M120 380 L256 90 L392 380 Z" fill="#2d3748" opacity="0.7"/></svg>')
+
+
+# ── corpus ─────────────────────────────────────────────────────────────────────
+
+def _immagine_sintetica(w, h, alpha, rng):
+    """Gradient + noise (so encoders do realistic work), with a soft disc as alpha."""
+    import numpy as np
+    from PIL import Image
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    base = np.stack([x / w * 255, y / h * 255, (x + y) / (w + h) * 255], axis=-1)
+    rgb = np.clip(base + rng.normal(0, 20, (h, w, 3)), 0, 255).astype(np.uint8)
+    img = Image.fromarray(rgb)
+    if alpha:
+        distanza = np.hypot(x - w / 2, y - h / 2) / (min(w, h) / 2)
+        img.putalpha(Image.fromarray((np.clip(1.2 - distanza, 0, 1) * 255).astype(np.uint8)))
+    return img
+
+
+def genera_corpus(cartella, quante, svg=True):
+    """quante files per kind: JPEG and alpha PNG at every size in LATI, animated GIF, SVG (if svg)."""
+    import numpy as np
+    rng = np.random.default_rng(0)
+    for i in range(quante):
+        for w, h in LATI:
+            _immagine_sintetica(w, h, False, rng).save(
+                os.path.join(cartella, f"foto_{w}x{h}_{i}.jpg"), quality=90)
+            _immagine_sintetica(w, h, True, rng).save(os.path.join(cartella, f"logo_{w}x{h}_{i}.png"))
+        fotogrammi = [_immagine_sintetica(320, 320, False, rng).quantize(64) for _ in range(4)]
+        fotogrammi[0].save(os.path.join(cartella, f"anim_{i}.gif"), save_all=True,
+                           append_images=fotogrammi[1:], duration=100, loop=0)
+        if not svg:
+            continue
+        with open(os.path.join(cartella, f"vettoriale_{i}.svg"), "w", encoding="utf-8") as f:
+            f.write(SVG)
+
+
+# ── one mode (child process) ───────────────────────────────────────────────────
+
+MODALITA = {
+    "ico":        lambda core, files, out, log, jobs, ev: core.elabora_batch(
+        files, out, False, True, True, log_fn=log, jobs=jobs, eventi_fn=ev),
+    "ico-bg":     lambda core, files, out, log, jobs, ev: core.elabora_batch(
+        files, out, True, True, True, modello="u2net", log_fn=log, jobs=jobs, eventi_fn=ev),
+    "format":     lambda core, files, out, log, jobs, ev: core.converti_formato_batch(
+        files, "webp", 85, out, log, jobs=jobs, eventi_fn=ev),
+    "format-bg":  lambda core, files, out, log, jobs, ev: core.converti_formato_batch(
+        files, "png", 85, out, log, rimuovi_bg=True, modello="u2net", jobs=jobs, eventi_fn=ev),
+    "favicon":    lambda core, files, out, log, jobs, ev: core.genera_favicon_batch(
+        files, out, log, jobs=jobs, eventi_fn=ev),
+    "appstore":   lambda core, files, out, log, jobs, ev: core.genera_app_store_icons_batch(
+        files, "apple", out, log, jobs=jobs, eventi_fn=ev),
+}
+
+
+def _picco_rss_mb():
+    """Peak RSS of this process and of its largest (finished) child, in MB."""
+    try:
+        import resource
+    except ImportError:  # Windows: no rusage, children are not measured
+        import ctypes
+        from ctypes import wintypes
+
+        class _Contatori(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (n, ctypes.c_size_t) for n in ("PeakWorkingSetSize", "WorkingSetSize",
+                                               "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                                               "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage",
+                                               "PagefileUsage", "PeakPagefileUsage")]
+        contatori = _Contatori(cb=ctypes.sizeof(_Contatori))
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                 ctypes.byref(contatori), contatori.cb)
+        return round(contatori.PeakWorkingSetSize / 2 ** 20, 1), None
+    unita = 1 if sys.platform == "darwin" else 1024  # ru_maxrss: bytes on macOS, KB elsewhere
+    proprio = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unita
+    figli = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unita
+    try:
+        # Linux: ru_maxrss survives exec, so it would include the parent's size at fork; VmHWM does not
+        with open("/proc/self/status") as f:
+            proprio = next(int(riga.split()[1]) * 1024 for riga in f if riga.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        pass
+    return round(proprio / 2 ** 20, 1), round(figli / 2 ** 20, 1)
+
+
+def esegui_figlio(modalita, cartella, jobs):
+    """Run one mode on the corpus in cartella and print its measurements as JSON."""
+    import core
+    core.imposta_cache_risultati(0)
+    files = sorted(os.path.join(cartella, n) for n in os.listdir(cartella)
+                   if n.lower().endswith(core.SUPPORTED_EXT))
+    uscita = tempfile.mkdtemp(prefix="bench-out-")
+    tempi = core.TempiBatch()
+    # start the workers while this process is small (their peak RSS would include it)
+    # and outside the timing: the GUI keeps the pool alive between runs
+    core.avvia_pool(jobs)
+    try:
+        t0 = time.perf_counter()
+        risultati = MODALITA[modalita](core, files, uscita, lambda msg: None, jobs, tempi)
+        secondi = time.perf_counter() - t0
+    finally:
+        core.libera_pool()  # reap the workers so their peak RSS is counted
+        shutil.rmtree(uscita, ignore_errors=True)
+    rss, rss_worker = _picco_rss_mb()
+    riepilogo = tempi.riepilogo()
+    ok = sum(1 for r in risultati if r["status"] == "ok")
+    falliti = [f"{os.path.basename(r['file'])}: {r['error'] or r['status']}"
+               for r in risultati if r["status"] != "ok"]
+    print(json.dumps({
+        "files": len(files), "ok": ok, "errors": len(files) - ok, "error_samples": falliti[:3],
+        "wall_s": round(secondi, 4), "files_per_s": round(ok / secondi, 3),
+        "mb_in_per_s": round(riepilogo["bytes_in"] / 2 ** 20 / secondi, 3),
+        "peak_rss_mb": rss, "peak_rss_worker_mb": rss_worker,
+        "stages": {fase: {k: v for k, v in dati.items() if k != "histogram_ms"}
+                   for fase, dati in riepilogo["stages"].items()},
+    }))
+
+
+# ── driver ─────────────────────────────────────────────────────────────────────
+
+def _misura(modalita, cartella, jobs, ambiente):
+    risultato = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--figlio", modalita, "--corpus", cartella,
+         "--jobs", str(jobs)],
+        cwd=RADICE, env=ambiente, capture_output=True, text=True)
+    if risultato.returncode:
+        raise RuntimeError(f"{modalita} failed:\n{risultato.stderr}")
+    return json.loads(risultato.stdout.strip().splitlines()[-1])
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RADICE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _prerequisiti():
+    """Modes (and "svg" for the SVG inputs of the corpus) that cannot run here, with the reason."""
+    mancanti = {}
+    sys.path.insert(0, RADICE)
+    import core
+    try:
+        core._get_imagemagick_path()
+    except FileNotFoundError:
+        mancanti["appstore"] = "ImageMagick not found"
+        mancanti["svg"] = "ImageMagick not found (format mode)"
+    try:
+        import svglib  # noqa: F401
+    except ImportError:
+        mancanti["svg"] = "svglib not installed"
+    return mancanti
+
+
+def confronta(attuale, riferimento, tolleranza):
+    """Print the deltas against a saved run; True if no mode regressed beyond tolleranza."""
+    print(f"\nvs baseline {riferimento.get('commit') or '?'} (tolerance {tolleranza:.0%})")
+    if riferimento.get("settings") != attuale["settings"]:
+        print(f"  [!] different settings: {riferimento.get('settings')}")
+    ok = True
+    for nome, dati in attuale["modes"].items():
+        prima = riferimento["modes"].get(nome)
+        if prima is None:
+            print(f"  {nome:<10} (not in baseline)")
+            continue
+        delta = dati["files_per_s"] / prima["files_per_s"] - 1 if prima["files_per_s"] else 0.0
+        regresso = delta < -tolleranza
+        ok &= not regresso
+        print(f"  {nome:<10} {prima['files_per_s']:8.2f} -> {dati['files_per_s']:8.2f} files/s ({delta:+.1%})"
+              f"  peak RSS {prima['peak_rss_mb']} -> {dati['peak_rss_mb']} MB"
+              + ("  REGRESSION" if regresso else ""))
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", default=",".join(MODALITA),
+                        help=f"Comma-separated subset of: {', '.join(MODALITA)}")
+    parser.add_argument("--count", type=int, default=2, help="Files per kind and size in the corpus.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode (the median run is kept).")
+    parser.add_argument("--jobs", type=int, default=2, help="Worker processes.")
+    parser.add_argument("--save", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against a JSON file written by --save.")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed throughput loss vs the baseline (fraction).")
+    parser.add_argument("--figlio", help=argparse.SUPPRESS)
+    parser.add_argument("--corpus", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.figlio:
+        sys.path.insert(0, RADICE)
+        esegui_figlio(args.figlio, args.corpus, args.jobs)
+        return
+
+    modalita = [m.strip() for m in args.modes.split(",") if m.strip()]
+    sconosciute = set(modalita) - set(MODALITA)
+    if sconosciute:
+        parser.error(f"unknown modes: {', '.join(sorted(sconosciute))}")
+    mancanti = _prerequisiti()
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as temp:
+        corpus = os.path.join(temp, "corpus")
+        stub = os.path.join(temp, "stub")
+        modelli = os.path.join(temp, "modelli")
+        for cartella in (corpus, stub, modelli):
+            os.makedirs(cartella)
+        if "svg" in mancanti:
+            print(f"[!] SVG left out of the corpus: {mancanti['svg']}")
+        genera_corpus(corpus, args.count, svg="svg" not in mancanti)
+        with open(os.path.join(stub, "rembg.py"), "w", encoding="utf-8") as f:
+            f.write(STUB_REMBG)
+        open(os.path.join(modelli, "u2net.onnx"), "wb").close()  # "downloaded", so no download message
+        ambiente = {**os.environ, "U2NET_HOME": modelli,
+                    "PYTHONPATH": os.pathsep.join([stub, RADICE, os.environ.get("PYTHONPATH", "")])}
+
+        risultati = {
+            "commit": _commit(), "python": platform.python_version(), "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "settings": {"count": args.count, "jobs": args.jobs, "sizes": [f"{w}x{h}" for w, h in LATI],
+                         "svg": "svg" not in mancanti},
+            "modes": {},
+        }
+        print(f"{len(os.listdir(corpus))} files, {args.repeat} runs per mode, jobs={args.jobs}")
+        falliti = []
+        for nome in modalita:
+            if nome in mancanti:
+                print(f"  {nome:<10} skipped: {mancanti[nome]}")
+                continue
+            corse = sorted((_misura(nome, corpus, args.jobs, ambiente) for _ in range(args.repeat)),
+                           key=lambda c: c["wall_s"])
+            con_errori = next((c for c in corse if c["errors"]), None)
+            if con_errori:
+                # failed files finish early: the throughput would look better than it is
+                falliti.append(nome)
+                print(f"  {nome:<10} FAILED: {con_errori['errors']} of {con_errori['files']} files, e.g.")
+                for errore in con_errori["error_samples"]:
+                    print(f"             {errore}")
+                continue
+            dati = corse[len(corse) // 2]
+            dati["wall_s_runs"] = [c["wall_s"] for c in corse]
+            dati["wall_s_stdev"] = round(statistics.pstdev(dati["wall_s_runs"]), 4)
+            risultati["modes"][nome] = dati
+            fasi = "  ".join(f"{fase} p50 {s['p50_s'] * 1000:.0f}/p90 {s['p90_s'] * 1000:.0f}/"
+                             f"p99 {s['p99_s'] * 1000:.0f} ms" for fase, s in dati["stages"].items())
+            print(f"  {nome:<10} {dati['files_per_s']:8.2f} files/s  {dati['mb_in_per_s']:7.2f} MB/s in"
+                  f"  peak RSS {dati['peak_rss_mb']} MB (worker {dati['peak_rss_worker_mb']})"
+                  f"\n             {fasi}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(risultati, f, indent=2)
+        print(f"\nSaved to {args.save}")
+    regressioni = False
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            riferimento = json.load(f)
+        regressioni = not confronta(risultati, riferimento, args.tolerance)
+    if falliti:
+        print(f"\n[ERROR] Modes with failed files: {', '.join(falliti)}")
+    if regressioni or falliti:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
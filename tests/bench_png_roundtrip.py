@@ -0,0 +1,88 @@
+"""Per-image latency of rimuovi_sfondo I/O: PNG round trip vs in-memory PIL.
+
+Run with: venv\Scripts\python tests\bench_png_roundtrip.py [--size 3840x2160] [--repeat 5]
+
+The model is replaced by a stub that predicts an all-foreground mask, so the
+numbers isolate the cost around inference (encode/decode + compositing). If
+rembg is installed its real remove() is used, otherwise its bytes/PIL
+handling is emulated with Pillow.
+"""
+import argparse
+import io
+import statistics
+import time
+
+from PIL import Image
+
+
+class _StubSession:
+    """Minimal rembg session: the whole image is foreground."""
+    def predict(self, img, *args, **kwargs):
+        return [Image.new('L', img.size, 255)]
+
+
+def _remove(data, session):
+    try:
+        from rembg import remove
+    except ImportError:
+        # Same steps rembg.remove performs for bytes and PIL inputs
+        img = Image.open(io.BytesIO(data)) if isinstance(data, bytes) else data
+        mask = session.predict(img)[0]
+        cutout = Image.composite(img.convert('RGBA'), Image.new('RGBA', img.size, 0), mask)
+        if isinstance(data, bytes):
+            buf = io.BytesIO()
+            cutout.save(buf, format='PNG')
+            return buf.getvalue()
+        return cutout
+    return remove(data, session=session)
+
+
+def percorso_png(img, session):
+    """Pre-change rimuovi_sfondo: PNG bytes in, PNG bytes out."""
+    buf = io.BytesIO()
+    img.save(buf, format='PNG')
+    output_data = _remove(buf.getvalue(), session)
+    return Image.open(io.BytesIO(output_data)).convert('RGBA')
+
+
+def percorso_pil(img, session):
+    """Current rimuovi_sfondo: PIL in, PIL out."""
+    return _remove(img, session).convert('RGBA')
+
+
+def _immagine_sintetica(w, h):
+    # Gradient + noise so PNG compression does realistic work
+    img = Image.linear_gradient('L').resize((w, h)).convert('RGB')
+    rumore = Image.effect_noise((w, h), 20).convert('RGB')
+    return Image.blend(img, rumore, 0.3)
+
+
+def misura(fn, img, session, repeat):
+    tempi = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(img, session)
+        tempi.append(time.perf_counter() - t0)
+    return statistics.median(tempi)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', default='3840x2160')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    w, h = (int(v) for v in args.size.lower().split('x'))
+    img = _immagine_sintetica(w, h)
+    session = _StubSession()
+
+    prima = misura(percorso_png, img, session, args.repeat)
+    dopo = misura(percorso_pil, img, session, args.repeat)
+    print(f"{w}x{h}, median of {args.repeat}")
+    print(f"  PNG round trip : {prima * 1000:8.1f} ms/image")
+    print(f"  in-memory PIL  : {dopo * 1000:8.1f} ms/image")
+    print(f"  saved          : {(prima - dopo) * 1000:8.1f} ms/image ({prima / dopo:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# Shared fixtures: a private model cache holding a tiny stand-in for
+# u2net.onnx, so background removal runs offline through the real rembg
+# session classes and ONNX Runtime.
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core  # noqa: E402
+
+
+def scrivi_modello_finto(path: str):
+    """u2net-shaped graph (N×3×320×320 → N×1×320×320): a 1×1 convolution plus a
+    fixed spatial ramp, so masks depend on the pixels and are not constant."""
+    import numpy as np
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+    rampa = np.linspace(-1, 1, 320, dtype=np.float32)[None, None, None, :].repeat(320, axis=2)
+    iniziali = [
+        numpy_helper.from_array(np.array([0.6, -0.4, 0.9], dtype=np.float32).reshape(1, 3, 1, 1), "peso"),
+        numpy_helper.from_array(np.array([0.1], dtype=np.float32), "bias"),
+        numpy_helper.from_array(rampa, "rampa"),
+    ]
+    nodi = [
+        helper.make_node("Conv", ["input.1", "peso", "bias"], ["conv"]),
+        helper.make_node("Add", ["conv", "rampa"], ["out"]),
+    ]
+    grafo = helper.make_graph(
+        nodi, "u2net_finto",
+        [helper.make_tensor_value_info("input.1", TensorProto.FLOAT, ["batch", 3, 320, 320])],
+        [helper.make_tensor_value_info("out", TensorProto.FLOAT, ["batch", 1, 320, 320])],
+        iniziali)
+    modello = helper.make_model(grafo, opset_imports=[helper.make_opsetid("", 13)])
+    modello.ir_version = 8
+    onnx.save(modello, path)
+
+
+@pytest.fixture
+def cache_modelli(tmp_path, monkeypatch):
+    """Empty model cache (U2NET_HOME) with the session pool and probes reset."""
+    cartella = tmp_path / "u2net"
+    cartella.mkdir()
+    monkeypatch.setenv("U2NET_HOME", str(cartella))
+    monkeypatch.setenv("MODEL_CHECKSUM_DISABLED", "1")
+    monkeypatch.setattr(core, "_cache_risultati", None)
+    core.libera_sessioni()
+    core.aggiorna_capacita()
+    yield cartella
+    core.libera_sessioni()
+    core.aggiorna_capacita()
+
+
+@pytest.fixture
+def modello_u2net(cache_modelli):
+    """cache_modelli with the stand-in u2net.onnx already downloaded."""
+    pytest.importorskip("onnx")
+    pytest.importorskip("rembg")
+    scrivi_modello_finto(str(cache_modelli / "u2net.onnx"))
+    core.aggiorna_capacita()
+    return cache_modelli
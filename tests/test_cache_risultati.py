@@ -0,0 +1,77 @@
+# On-disk result cache of background removal: hits and misses, keys that
+# change with the model and the edge refinement, LRU eviction by mtime.
+import os
+
+import numpy as np
+from PIL import Image
+
+import core
+
+
+def _rumore(seme: int, lato: int = 64) -> Image.Image:
+    rng = np.random.default_rng(seme)
+    return Image.fromarray(rng.integers(0, 256, (lato, lato, 4), dtype=np.uint8), 'RGBA')
+
+
+def test_hit_after_miss_and_stats(tmp_path):
+    cache = core._CacheRisultati(str(tmp_path), 10)
+    img = _rumore(0)
+    chiave = cache.chiave(img, "u2net")
+    assert cache.leggi(chiave) is None
+    cache.scrivi(chiave, img)
+    letta = cache.leggi(chiave)
+    assert np.array_equal(np.asarray(letta), np.asarray(img))
+    assert cache.statistiche() == (1, 1)
+
+
+def test_key_depends_on_pixels_and_model(tmp_path):
+    cache = core._CacheRisultati(str(tmp_path), 10)
+    img = _rumore(0)
+    chiavi = {cache.chiave(img, "u2net"), cache.chiave(img, "isnet-general-use"),
+              cache.chiave(img, "u2net|guided"), cache.chiave(_rumore(1), "u2net")}
+    assert len(chiavi) == 4
+    assert cache.chiave(img.copy(), "u2net") == cache.chiave(img, "u2net")
+
+
+def test_refined_masks_are_cached_separately(modello_u2net):
+    img = _rumore(2, 400).convert('RGB')  # larger than the model input: refinement applies
+    core.rimuovi_sfondo_batch([img], "u2net", lambda msg: None)
+    core.rimuovi_sfondo_batch([img], "u2net", lambda msg: None)
+    core.rimuovi_sfondo_batch([img], "u2net", lambda msg: None, raffina=True)
+    assert core._get_cache_risultati().statistiche() == (1, 2)
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path):
+    cache = core._CacheRisultati(str(tmp_path), 10)
+    chiavi = {nome: cache.chiave(_rumore(i), nome) for i, nome in enumerate("abcd")}
+    for i, nome in enumerate("abc"):
+        cache.scrivi(chiavi[nome], _rumore(i))
+        os.utime(cache._percorso(chiavi[nome]), (1000 + i, 1000 + i))
+    assert cache.leggi(chiavi["a"]) is not None  # a becomes the most recently used
+
+    dimensioni = [os.path.getsize(cache._percorso(chiavi[n])) for n in "abc"]
+    cache.max_byte = sum(dimensioni) + min(dimensioni) // 2
+    cache.scrivi(chiavi["d"], _rumore(3))
+
+    presenti = {n for n in "abcd" if os.path.exists(cache._percorso(chiavi[n]))}
+    assert presenti == {"a", "c", "d"}
+
+
+def test_changing_the_limit_keeps_the_cache_and_its_stats(cache_modelli, monkeypatch):
+    monkeypatch.setattr(core, "CACHE_RISULTATI_MB", 10)
+    cache = core._get_cache_risultati()
+    cache.leggi(cache.chiave(_rumore(0), "u2net"))
+    core.imposta_cache_risultati(20)
+    assert core._get_cache_risultati() is cache
+    assert cache.max_byte == 20 * 1024 * 1024 and cache.statistiche() == (0, 1)
+    core.imposta_cache_risultati(0)
+    assert core._get_cache_risultati() is None
+
+
+def test_previews_bypass_the_cache_also_on_the_per_image_fallback(modello_u2net, monkeypatch):
+    monkeypatch.setattr(core, "_PARAMETRI_MODELLI", {})  # preprocessing unknown: rimuovi_sfondo path
+    cartella = modello_u2net / "rembgexporter-results"
+    assert core.anteprima_sfondo(_rumore(4, 100).convert('RGB'), "u2net").size == (100, 100)
+    assert not cartella.exists()
+    core.rimuovi_sfondo_batch([_rumore(4, 100).convert('RGB')], "u2net", lambda msg: None)
+    assert len(list(cartella.iterdir())) == 1
@@ -0,0 +1,136 @@
+# Headless CLI: one JSON line per processed file on stdout, exit code 1 when
+# any file fails, usage error when nothing matches; folders and globs expand.
+import json
+
+import pytest
+from click.testing import CliRunner
+from PIL import Image
+
+import cli
+import core
+
+
+@pytest.fixture(autouse=True)
+def _pool_pulito():
+    yield
+    core.libera_pool()
+
+
+def _png(path, lato: int = 40):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new('RGBA', (lato, lato), (200, 30, 60, 255)).save(path)
+    return path
+
+
+def _righe_json(output: str) -> list[dict]:
+    return [json.loads(riga) for riga in output.splitlines() if riga.startswith('{')]
+
+
+def _esegui(*argomenti):
+    return CliRunner().invoke(cli.cli, [str(a) for a in argomenti], catch_exceptions=False)
+
+
+def test_format_streams_one_json_line_per_file(tmp_path):
+    a, b = _png(tmp_path / "a.png"), _png(tmp_path / "b.png")
+    uscita = tmp_path / "nuova" / "cartella"  # does not exist yet
+    esito = _esegui('format', a, b, '--to', 'webp', '-o', uscita, '-q')
+
+    assert esito.exit_code == 0, esito.output
+    righe = _righe_json(esito.output)
+    assert [r['file'] for r in righe] == [str(a), str(b)]
+    assert all(r['status'] == 'ok' for r in righe)
+    assert sorted(p.name for p in uscita.iterdir()) == ["a.webp", "b.webp"]
+
+
+def test_failed_file_sets_exit_code_1(tmp_path):
+    buono = _png(tmp_path / "buono.png")
+    rotto = tmp_path / "rotto.png"
+    rotto.write_bytes(b"not an image")
+    esito = _esegui('format', buono, rotto, '--to', 'png', '-o', tmp_path / "out", '-q', '-j', '1')
+
+    assert esito.exit_code == 1
+    stati = {r['file']: r['status'] for r in _righe_json(esito.output)}
+    assert stati == {str(buono): 'ok', str(rotto): 'error'}
+
+
+def test_no_matching_images_is_a_usage_error(tmp_path):
+    (tmp_path / "note.txt").write_text("x")
+    esito = _esegui('favicon', tmp_path, '-q')
+    assert esito.exit_code == 2
+    assert "No supported images found" in esito.output
+
+
+def test_folders_and_globs_expand_to_sorted_images(tmp_path):
+    _png(tmp_path / "in" / "b.png")
+    _png(tmp_path / "in" / "a.png")
+    _png(tmp_path / "in" / "sotto" / "c.png")
+    (tmp_path / "in" / "leggimi.txt").write_text("x")
+    _png(tmp_path / "altri" / "d.png")
+
+    esito = _esegui('format', tmp_path / "in", tmp_path / "altri" / "*.png", '--to', 'png',
+                    '-o', tmp_path / "out", '-q')
+    assert esito.exit_code == 0, esito.output
+    nomi = [r['file'] for r in _righe_json(esito.output)]
+    assert nomi == sorted(str(tmp_path / p) for p in ("in/a.png", "in/b.png", "altri/d.png"))
+
+    esito = _esegui('format', tmp_path / "in", '-r', '--to', 'png', '-o', tmp_path / "out", '-q')
+    assert str(tmp_path / "in" / "sotto" / "c.png") in [r['file'] for r in _righe_json(esito.output)]
+
+
+def test_no_cache_is_passed_to_the_batch_without_touching_core(tmp_path, monkeypatch):
+    chiamate = []
+    monkeypatch.setattr(core, "converti_formato_batch", lambda *a, **kw: chiamate.append(kw) or [])
+    limite = core.CACHE_RISULTATI_MB
+    _png(tmp_path / "a.png")
+
+    assert _esegui('format', tmp_path / "a.png", '--to', 'png', '--no-cache', '-q').exit_code == 0
+    assert _esegui('format', tmp_path / "a.png", '--to', 'png', '-q').exit_code == 0
+    assert [kw['usa_cache'] for kw in chiamate] == [False, True]
+    assert core.CACHE_RISULTATI_MB == limite
+
+
+def test_refine_edges_is_passed_to_the_batch_without_touching_core(tmp_path, monkeypatch):
+    chiamate = []
+    monkeypatch.setattr(core, "elabora_batch", lambda *a, **kw: chiamate.append(kw) or [])
+    _png(tmp_path / "a.png")
+
+    assert _esegui('ico', tmp_path / "a.png", '--remove-bg', '--refine-edges', '-q').exit_code == 0
+    assert _esegui('ico', tmp_path / "a.png", '--remove-bg', '-q').exit_code == 0
+    assert [kw['raffina'] for kw in chiamate] == [True, False]
+    assert core.RAFFINA_BORDI is False
+
+
+def test_check_content_drops_misnamed_files_in_folders(tmp_path):
+    _png(tmp_path / "in" / "vera.png")
+    (tmp_path / "in" / "finta.png").write_bytes(b"<html>not an image</html>")
+    argomenti = ['format', tmp_path / "in", '--to', 'png', '-o', tmp_path / "out", '-q', '-j', '1']
+
+    assert _esegui(*argomenti).exit_code == 1  # the fake file fails to decode
+    esito = _esegui(*argomenti, '--check-content')
+    assert esito.exit_code == 0
+    assert [r['file'] for r in _righe_json(esito.output)] == [str(tmp_path / "in" / "vera.png")]
+
+
+def test_onnx_threads_is_passed_to_the_batch_without_touching_core(tmp_path, monkeypatch):
+    chiamate = []
+    monkeypatch.setattr(core, "converti_formato_batch", lambda *a, **kw: chiamate.append(kw) or [])
+    _png(tmp_path / "a.png")
+
+    assert _esegui('format', tmp_path / "a.png", '--to', 'png', '--onnx-threads', '3', '-q').exit_code == 0
+    assert _esegui('format', tmp_path / "a.png", '--to', 'png', '-q').exit_code == 0
+    assert [kw['thread'] for kw in chiamate] == [3, None]
+    assert core.THREAD_ONNX is None
+
+
+@pytest.mark.parametrize("argomenti", [
+    ('ico',), ('ico', '--remove-bg', '-m', 'u2net'), ('format', '--to', 'png'),
+    ('format', '--to', 'png', '--remove-bg', '-m', 'u2net'), ('favicon',),
+])
+def test_missing_input_is_an_error_in_every_mode(tmp_path, modello_u2net, argomenti):
+    buono = _png(tmp_path / "buono.png")
+    manca = tmp_path / "manca.png"
+    esito = _esegui(argomenti[0], buono, manca, *argomenti[1:], '-o', tmp_path / "out", '-q', '-j', '1')
+
+    assert esito.exit_code == 1, esito.output
+    stati = {r['file']: r['status'] for r in _righe_json(esito.output)}
+    assert stati == {str(buono): 'ok', str(manca): 'error'}
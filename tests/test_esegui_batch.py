@@ -0,0 +1,81 @@
+# esegui_batch: results, progress and log lines follow the input order, a
+# failing file only fails itself, in the calling process and on the pool, and
+# the pool keeps its size across short batches.
+import time
+
+import pytest
+
+import core
+
+
+def _compito(path: str, ritardo: float, log_fn):
+    time.sleep(ritardo)
+    if path.startswith("rotto"):
+        raise ValueError(f"cannot read {path}")
+    log_fn(f"[OK] {path}")
+    return [path + ".out"]
+
+
+def _compito_cronometrato(path: str, uscita: str, log_fn):
+    inizio = time.time()
+    time.sleep(0.8)  # longer than a worker process takes to start
+    return [f"{inizio} {time.time()}"]
+
+
+@pytest.fixture(autouse=True)
+def _pool_pulito():
+    yield
+    core.libera_pool()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_results_follow_input_order_and_errors_stay_isolated(jobs):
+    # later files finish first on the pool
+    lavori = [("a", 0.4), ("rotto", 0.0), ("c", 0.2), ("d", 0.0)]
+    log, progressi = [], []
+    risultati = core.esegui_batch(_compito, lavori, len(lavori), log.append, jobs=jobs,
+                                  progress_fn=lambda i, n, r: progressi.append((i, n, r["file"])))
+
+    assert [r["file"] for r in risultati] == ["a", "rotto", "c", "d"]
+    assert [r["status"] for r in risultati] == ["ok", "error", "ok", "ok"]
+    assert risultati[1]["error"] == "cannot read rotto" and risultati[1]["outputs"] == []
+    assert risultati[3]["outputs"] == ["d.out"]
+    assert progressi == [(1, 4, "a"), (2, 4, "rotto"), (3, 4, "c"), (4, 4, "d")]
+    assert log == ["[OK] a", "[ERROR] rotto: cannot read rotto", "[OK] c", "[OK] d"]
+
+
+def test_jobs_sharing_an_output_never_overlap(tmp_path):
+    condiviso = str(tmp_path / "favicon.ico")
+    lavori = [("x1", condiviso), ("y", str(tmp_path / "y.ico")), ("x2", condiviso)]
+    risultati = core.esegui_batch(_compito_cronometrato, lavori, len(lavori), lambda msg: None, jobs=3,
+                                  esclusivo=lambda args: [args[1]])
+
+    intervalli = {r["file"]: tuple(map(float, r["outputs"][0].split())) for r in risultati}
+    assert intervalli["x1"][1] <= intervalli["x2"][0]
+    # a job with its own output is not held back
+    assert intervalli["y"][0] < intervalli["x1"][1]
+
+
+def test_short_batches_keep_the_warm_pool():
+    lavori = [(nome, 0.0) for nome in "abc"]
+    core.esegui_batch(_compito, lavori[:1], 1, lambda msg: None, jobs=3)
+    assert core._pool is None  # a single file does not start the workers
+
+    core.esegui_batch(_compito, lavori, 3, lambda msg: None, jobs=3)
+    pool = core._pool
+    assert pool is not None and core._pool_jobs == 3
+    for quanti in (1, 2):
+        risultati = core.esegui_batch(_compito, lavori[:quanti], quanti, lambda msg: None, jobs=3)
+        assert [r["status"] for r in risultati] == ["ok"] * quanti
+        assert core._pool is pool
+
+
+def test_future_errors_fail_only_their_file():
+    # the lambda cannot be pickled for the worker: that future fails, the others run
+    lavori = [("a", 0.0), ("b", lambda: None), ("c", 0.0)]
+    log = []
+    risultati = core.esegui_batch(_compito, lavori, len(lavori), log.append, jobs=2)
+
+    assert [r["status"] for r in risultati] == ["ok", "error", "ok"]
+    assert risultati[1]["error"] and risultati[1]["outputs"] == []
+    assert log[0] == "[OK] a" and log[1].startswith("[ERROR] b: ") and log[2] == "[OK] c"
@@ -0,0 +1,104 @@
+# In-process format conversion (_salva_convertito) must match ImageMagick's
+# -quality handling, flatten alpha onto white for JPG and keep animations.
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+from PIL import Image, ImageSequence
+from PIL.JpegImagePlugin import get_sampling
+
+import core
+
+
+def _sfumatura(w: int = 64, h: int = 48) -> Image.Image:
+    x = np.linspace(0, 255, w, dtype=np.uint8)[None, :].repeat(h, axis=0)
+    y = np.linspace(0, 255, h, dtype=np.uint8)[:, None].repeat(w, axis=1)
+    return Image.fromarray(np.stack([x, y, 255 - x], axis=2), 'RGB')
+
+
+def _animazione(path, durate=(40, 90, 150)):
+    colori = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+    frames = [Image.new('RGB', (32, 32), c) for c in colori[:len(durate)]]
+    frames[0].save(path, 'GIF', save_all=True, append_images=frames[1:], duration=list(durate), loop=0)
+    return path
+
+
+@pytest.mark.parametrize("qualita, campionamento", [(60, 2), (85, 2), (90, 0), (100, 0)])
+def test_jpeg_quality_and_chroma_subsampling(tmp_path, qualita, campionamento):
+    path = tmp_path / "out.jpg"
+    core._salva_convertito(_sfumatura(), str(path), 'jpg', qualita)
+    riferimento = tmp_path / "rif.jpg"
+    _sfumatura().save(riferimento, 'JPEG', quality=qualita, subsampling=campionamento)
+    with Image.open(path) as img, Image.open(riferimento) as rif:
+        assert get_sampling(img) == campionamento
+        assert img.quantization == rif.quantization
+
+
+@pytest.mark.skipif(not (shutil.which("magick") or shutil.which("convert")), reason="ImageMagick not installed")
+@pytest.mark.parametrize("qualita", [75, 92])
+def test_jpeg_matches_imagemagick_quality(tmp_path, qualita):
+    sorgente = tmp_path / "src.png"
+    _sfumatura().save(sorgente)
+    magick = tmp_path / "magick.jpg"
+    subprocess.run([shutil.which("magick") or shutil.which("convert"), str(sorgente), '-quality', str(qualita),
+                    str(magick)], check=True)
+    pillow = tmp_path / "pillow.jpg"
+    core._salva_convertito(Image.open(sorgente), str(pillow), 'jpg', qualita)
+    with Image.open(magick) as a, Image.open(pillow) as b:
+        assert get_sampling(a) == get_sampling(b)
+        assert a.quantization == b.quantization
+
+
+def test_png_quality_maps_to_zlib_level(tmp_path, monkeypatch):
+    livelli = []
+    salva = Image.Image.save
+
+    def _salva(img, fp, formato=None, **opzioni):
+        livelli.append(opzioni.get('compress_level'))
+        return salva(img, fp, formato, **opzioni)
+
+    monkeypatch.setattr(Image.Image, "save", _salva)
+    for qualita in (5, 75, 100):
+        core._salva_convertito(_sfumatura(), str(tmp_path / f"{qualita}.png"), 'png', qualita)
+    assert livelli == [0, 7, 9]
+
+
+def test_jpeg_flattens_alpha_onto_white(tmp_path):
+    rgba = np.zeros((32, 32, 4), dtype=np.uint8)
+    rgba[..., 0] = 200
+    rgba[:, 16:, 3] = 255       # right half opaque red, left half fully transparent
+    path = tmp_path / "out.jpg"
+    core._salva_convertito(Image.fromarray(rgba, 'RGBA'), str(path), 'jpg', 95)
+    with Image.open(path) as img:
+        assert img.mode == 'RGB'
+        pixel = np.asarray(img, dtype=np.int16)
+    assert np.abs(pixel[:, :12] - 255).max() <= 2
+    assert np.abs(pixel[:, 20:] - (200, 0, 0)).max() <= 4
+
+
+@pytest.mark.parametrize("formato", ['gif', 'webp', 'png'])
+def test_animation_keeps_frames_and_durations(tmp_path, formato):
+    sorgente = _animazione(tmp_path / "anim.gif")
+    path = tmp_path / f"out.{formato}"
+    with Image.open(sorgente) as img:
+        core._salva_convertito(img, str(path), formato, 85)
+    with Image.open(path) as img:
+        frames = []
+        for frame in ImageSequence.Iterator(img):
+            colore = frame.convert('RGB').getpixel((16, 16))  # WebP sets the duration on load
+            frames.append((frame.info.get('duration'), colore))
+    assert [d for d, _ in frames] == [40, 90, 150]
+    attesi = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+    for (_, colore), atteso in zip(frames, attesi):
+        assert max(abs(a - b) for a, b in zip(colore, atteso)) <= 8
+
+
+def test_animation_to_jpeg_keeps_first_frame(tmp_path):
+    sorgente = _animazione(tmp_path / "anim.gif")
+    path = tmp_path / "out.jpg"
+    with Image.open(sorgente) as img:
+        core._salva_convertito(img, str(path), 'jpg', 90)
+    with Image.open(path) as img:
+        assert getattr(img, 'n_frames', 1) == 1
+        assert max(abs(a - b) for a, b in zip(img.getpixel((16, 16)), (255, 0, 0))) <= 4
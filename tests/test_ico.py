@@ -0,0 +1,77 @@
+# The in-process ICO writer: frames must decode back to the pixels written,
+# in the ImageMagick layout (PNG 256 px frame, 32-bit DIBs with AND mask).
+import struct
+
+import numpy as np
+from PIL import Image
+
+import core
+
+
+def _sorgente(lato: int) -> Image.Image:
+    """RGBA with opaque, semi-transparent and fully transparent areas."""
+    rgba = np.zeros((lato, lato, 4), dtype=np.uint8)
+    rgba[..., 0] = np.linspace(0, 255, lato, dtype=np.uint8)[None, :]
+    rgba[..., 1] = np.linspace(255, 0, lato, dtype=np.uint8)[:, None]
+    rgba[..., 2] = 90
+    rgba[..., 3] = 255
+    rgba[: lato // 2, : lato // 3, 3] = 0      # transparent block, not aligned to 8 px
+    rgba[lato // 2:, lato // 2:, 3] = 128      # semi-transparent quadrant
+    return Image.fromarray(rgba, 'RGBA')
+
+
+def _directory(dati: bytes) -> list[tuple[int, int, int, int]]:
+    """(width, height, size, offset) of each ICONDIRENTRY."""
+    _, tipo, n = struct.unpack_from('<HHH', dati)
+    assert tipo == 1
+    voci = []
+    for i in range(n):
+        w, h, _, _, _, bpp, dimensione, offset = struct.unpack_from('<BBBBHHII', dati, 6 + 16 * i)
+        assert bpp == 32
+        voci.append((w or 256, h or 256, dimensione, offset))
+    return voci
+
+
+def test_frames_round_trip_through_pillow(tmp_path):
+    lati = sorted((w for w, _ in core.ICON_SIZES), reverse=True)
+    frames = [_sorgente(lato) for lato in lati]
+    path = tmp_path / "icona.ico"
+    core._scrivi_ico(frames, str(path))
+
+    with Image.open(path) as ico:
+        assert sorted(ico.info['sizes']) == sorted((lato, lato) for lato in lati)
+        for frame in frames:
+            letto = ico.ico.getimage(frame.size).convert('RGBA')
+            assert np.array_equal(np.asarray(letto), np.asarray(frame)), frame.size
+
+    voci = _directory(path.read_bytes())
+    assert [(w, h) for w, h, _, _ in voci] == [(lato, lato) for lato in lati]
+    dati = path.read_bytes()
+    w, _, _, offset = voci[0]
+    assert w == 256 and dati[offset:offset + 8] == b'\x89PNG\r\n\x1a\n'
+    assert voci[-1][3] + voci[-1][2] == len(dati)
+
+
+def test_and_mask_rows_are_padded_to_32_bits(tmp_path):
+    frame = _sorgente(24)
+    path = tmp_path / "icona.ico"
+    core._scrivi_ico([frame], str(path))
+    dati = path.read_bytes()
+    (_, _, dimensione, offset), = _directory(dati)
+
+    header = struct.unpack_from('<IiiHHIIiiII', dati, offset)
+    assert header[:5] == (40, 24, 48, 1, 32)
+    riga = 4  # 24 bits of mask → 3 bytes, padded to a 4-byte row
+    assert dimensione == 40 + 24 * 24 * 4 + 24 * riga
+
+    maschera = np.frombuffer(dati, np.uint8, 24 * riga, offset + 40 + 24 * 24 * 4).reshape(24, riga)
+    assert not maschera[:, 3].any()  # padding bytes stay zero
+    bit = np.unpackbits(maschera[:, :3], axis=1)[::-1]  # rows are stored bottom-up
+    assert np.array_equal(bit.astype(bool), np.asarray(frame)[..., 3] == 0)
+
+
+def test_salva_ico_writes_every_icon_size(tmp_path):
+    path = tmp_path / "da_foto.ico"
+    core.salva_ico(_sorgente(300).convert('RGB').convert('RGBA'), str(path))
+    with Image.open(path) as ico:
+        assert sorted(ico.info['sizes']) == sorted(core.ICON_SIZES)
@@ -0,0 +1,72 @@
+# Incremental mode: unchanged inputs are skipped, edited ones rerun, results
+# keep the input order, and inputs sharing fixed output names (favicon) rerun
+# after an earlier one so the last input still wins.
+import json
+
+import pytest
+from PIL import Image
+
+import core
+
+
+@pytest.fixture(autouse=True)
+def _pool_pulito():
+    yield
+    core.libera_pool()
+
+
+def _png(path, colore):
+    Image.new('RGBA', (48, 48), colore).save(path)
+    return str(path)
+
+
+def _converti(files, uscita):
+    return core.converti_formato_batch(files, 'png', 85, str(uscita), lambda msg: None, jobs=1,
+                                       incrementale=True)
+
+
+def test_second_run_skips_and_edited_input_reruns_in_order(tmp_path):
+    files = [_png(tmp_path / f"{n}.png", (i * 60, 0, 0, 255)) for i, n in enumerate("abc")]
+    uscita = tmp_path / "out"
+    uscita.mkdir()
+
+    assert [r['status'] for r in _converti(files, uscita)] == ['ok', 'ok', 'ok']
+    assert [r['status'] for r in _converti(files, uscita)] == ['unchanged'] * 3
+
+    _png(tmp_path / "b.png", (0, 0, 255, 255))
+    risultati = _converti(files, uscita)
+    assert [r['file'] for r in risultati] == files
+    assert [r['status'] for r in risultati] == ['unchanged', 'ok', 'unchanged']
+    assert risultati[1]['outputs'] == [str(uscita / "b.png")]  # same name, no b(1).png
+    with Image.open(uscita / "b.png") as img:
+        assert img.getpixel((0, 0)) == (0, 0, 255, 255)
+
+
+def test_modified_output_is_redone(tmp_path):
+    files = [_png(tmp_path / "a.png", (10, 20, 30, 255))]
+    uscita = tmp_path / "out"
+    uscita.mkdir()
+    _converti(files, uscita)
+    (uscita / "a.png").write_bytes(b"overwritten by someone else")
+    assert [r['status'] for r in _converti(files, uscita)] == ['ok']
+
+
+def test_shared_outputs_rerun_later_inputs(tmp_path):
+    uscita = tmp_path / "out"
+    uscita.mkdir()
+    files = [_png(tmp_path / "primo.png", (255, 0, 0, 255)), _png(tmp_path / "secondo.png", (0, 255, 0, 255))]
+
+    def _favicon():
+        return core.genera_favicon_batch(files, str(uscita), lambda msg: None, jobs=1, incrementale=True)
+
+    assert [r['status'] for r in _favicon()] == ['ok', 'ok']
+    assert [r['status'] for r in _favicon()] == ['unchanged', 'unchanged']
+
+    _png(tmp_path / "primo.png", (0, 0, 255, 255))
+    assert [r['status'] for r in _favicon()] == ['ok', 'ok']
+    with open(uscita / "manifest.json") as f:
+        assert json.load(f)["name"] == "secondo"  # the last input still wins
+    with Image.open(uscita / "favicon-512.png") as img:
+        assert img.convert('RGBA').getpixel((256, 256)) == (0, 255, 0, 255)
+
+    assert [r['status'] for r in _favicon()] == ['unchanged', 'unchanged']
@@ -0,0 +1,55 @@
+# INT8 variants: quantized once from the downloaded model into the derived
+# graphs folder, and compared with the FP32 model by confronta_int8.
+import numpy as np
+import pytest
+from PIL import Image
+
+import core
+
+
+@pytest.fixture
+def modello_int8(modello_u2net):
+    pytest.importorskip("onnxruntime.quantization")
+    return modello_u2net
+
+
+def _png(path, seme: int):
+    rng = np.random.default_rng(seme)
+    Image.fromarray(rng.integers(0, 256, (96, 128, 3), dtype=np.uint8)).save(path)
+    return str(path)
+
+
+def test_int8_model_is_quantized_once_into_the_derived_folder(modello_int8):
+    assert not core._modello_in_cache("u2net-int8")
+    percorso = core._modello_int8("u2net-int8")
+    assert percorso == str(modello_int8 / "rembgexporter-graphs" / "u2net-int8.onnx")
+    assert core._modello_in_cache("u2net-int8")
+
+    import onnx
+    assert "ConvInteger" in {n.op_type for n in onnx.load(percorso).graph.node}
+    scritto = (modello_int8 / "rembgexporter-graphs" / "u2net-int8.onnx").stat().st_mtime_ns
+    assert core._modello_int8("u2net-int8") == percorso
+    assert (modello_int8 / "rembgexporter-graphs" / "u2net-int8.onnx").stat().st_mtime_ns == scritto
+
+
+def test_int8_session_runs_close_to_fp32(modello_int8):
+    tensore = np.random.default_rng(0).random((1, 3, 320, 320), dtype=np.float32)
+    fp32 = core._inferenza_batch(core.get_sessione("u2net", "cpu", lambda msg: None, jobs=1), tensore)
+    int8 = core._inferenza_batch(core.get_sessione("u2net-int8", "cpu", lambda msg: None, jobs=1), tensore)
+    assert int8.shape == fp32.shape
+    assert np.abs(int8 - fp32).max() < 0.05
+
+
+def test_report_compares_latency_and_masks(modello_int8, tmp_path):
+    files = [_png(tmp_path / f"{i}.png", i) for i in range(3)]
+    messaggi = []
+    report = core.confronta_int8(files + [str(tmp_path / "manca.png")], ["u2net"], "cpu", messaggi.append)
+
+    assert len(report) == 1
+    voce = report[0]
+    assert voce["model"] == "u2net" and voce["images"] == 3
+    assert voce["fp32_p50_ms"] > 0 and voce["int8_p50_ms"] > 0 and voce["speedup"] > 0
+    assert 0.9 <= voce["iou_min"] <= voce["iou_mean"] <= 1
+    assert "[SKIP] manca.png: File not found: manca.png" in messaggi
+    assert any(m.startswith("[STATS] u2net") for m in messaggi)
+    assert not core._sessioni  # both variants are released after measuring
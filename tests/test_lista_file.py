@@ -0,0 +1,64 @@
+# ListaFile, the model of the virtualized file list: insertion order, O(1)
+# membership and positional rows that stay right across removals.
+import random
+
+import pytest
+
+pytest.importorskip("customtkinter")
+from app import ListaFile  # noqa: E402
+
+
+def _lista(voci):
+    lista = ListaFile()
+    for voce in voci:
+        lista.aggiungi(voce)
+    return lista
+
+
+def test_keeps_insertion_order_and_ignores_duplicates():
+    lista = ListaFile()
+    assert [lista.aggiungi(p) for p in ("b", "a", "b", "c")] == [True, True, False, True]
+    assert list(lista) == ["b", "a", "c"] and len(lista) == 3
+    assert [lista[i] for i in range(3)] == ["b", "a", "c"] and lista[-1] == "c"
+    assert "a" in lista and "z" not in lista
+    with pytest.raises(IndexError):
+        lista[3]
+
+
+def test_rows_follow_removals_and_appends():
+    lista = _lista(f"{i}.png" for i in range(10))
+    lista.rimuovi("0.png")
+    lista.rimuovi("5.png")
+    lista.aggiungi("0.png")  # re-added files go to the end
+    atteso = [f"{i}.png" for i in (1, 2, 3, 4, 6, 7, 8, 9, 0)]
+    assert [lista[i] for i in range(len(lista))] == atteso == list(lista)
+    assert lista.primo() == "1.png"
+    with pytest.raises(KeyError):
+        lista.rimuovi("5.png")
+
+
+def test_matches_a_plain_list_under_random_edits():
+    rng = random.Random(7)
+    lista, modello = ListaFile(), []
+    for passo in range(5000):
+        if modello and rng.random() < 0.45:
+            voce = rng.choice(modello)
+            lista.rimuovi(voce)
+            modello.remove(voce)
+        else:
+            voce = f"{rng.randrange(3000)}.png"
+            if lista.aggiungi(voce):
+                modello.append(voce)
+        if passo % 250 == 0:
+            assert [lista[i] for i in range(len(lista))] == modello
+    assert list(lista) == modello and len(lista) == len(modello)
+    # tombstones never pile up beyond the compaction threshold
+    assert len(lista._ordine) - len(lista) <= max(len(lista), ListaFile.COMPATTA_MIN)
+
+
+def test_svuota_and_primo():
+    lista = _lista(["a", "b"])
+    lista.svuota()
+    assert len(lista) == 0 and lista.primo() is None and list(lista) == []
+    lista.aggiungi("c")
+    assert lista.primo() == "c" and lista[0] == "c"
@@ -0,0 +1,80 @@
+# Folder scanning: depth-first order sorted by name, chunked output, and the
+# optional magic-byte filter (SVG recognised past a long XML prolog).
+import os
+
+import pytest
+from PIL import Image
+
+import core
+
+
+def _png(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new('RGB', (4, 4)).save(path, 'PNG')
+
+
+def _albero(radice):
+    for nome in ("b.png", "A.png", "c.jpg", "sotto/z.png", "sotto/y/x.png", "Altra/k.png"):
+        _png(radice / nome)
+    (radice / "note.txt").write_text("x")
+    return radice
+
+
+def _relativi(radice, blocchi):
+    return [os.path.relpath(p, radice).replace(os.sep, "/") for blocco in blocchi for p in blocco]
+
+
+def test_recursive_order_is_depth_first_and_sorted_by_name(tmp_path):
+    radice = _albero(tmp_path)
+    trovati = _relativi(radice, core.scansiona_cartelle([str(radice)]))
+    # files of a folder first, then its subfolders in (case-insensitive) name order
+    assert trovati == ["A.png", "b.png", "c.jpg", "Altra/k.png", "sotto/z.png", "sotto/y/x.png"]
+    assert _relativi(radice, core.scansiona_cartelle([str(radice)], ricorsivo=False)) == ["A.png", "b.png", "c.jpg"]
+
+
+def test_several_roots_keep_their_order(tmp_path):
+    _png(tmp_path / "uno" / "a.png")
+    _png(tmp_path / "due" / "a.png")
+    radici = [str(tmp_path / "uno"), str(tmp_path / "due")]
+    assert _relativi(tmp_path, core.scansiona_cartelle(radici)) == ["uno/a.png", "due/a.png"]
+
+
+@pytest.mark.parametrize("blocco", [1, 2, 4, 100])
+def test_chunks_concatenate_to_the_full_scan(tmp_path, blocco):
+    radice = _albero(tmp_path)
+    blocchi = list(core.scansiona_cartelle([str(radice)], blocco=blocco))
+    assert all(0 < len(b) <= blocco for b in blocchi)
+    assert all(len(b) == blocco for b in blocchi[:-1])
+    assert _relativi(radice, blocchi) == _relativi(radice, core.scansiona_cartelle([str(radice)]))
+
+
+def test_symlinked_folders_are_not_followed(tmp_path):
+    _png(tmp_path / "vera" / "a.png")
+    try:
+        os.symlink(tmp_path / "vera", tmp_path / "collegamento", target_is_directory=True)
+    except (OSError, NotImplementedError):
+        pytest.skip("symlinks not available")
+    assert _relativi(tmp_path, core.scansiona_cartelle([str(tmp_path)])) == ["vera/a.png"]
+
+
+SVG_PROLOGO_LUNGO = (
+    b'\xef\xbb\xbf<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+    b'<!-- Created with Inkscape (http://www.inkscape.org/) -->\n<!-- ' + b'licence text ' * 400 + b'-->\n'
+    b'<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN" "http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd" [\n'
+    b'  <!ENTITY ns_svg "http://www.w3.org/2000/svg">\n]>\n'
+    b'<svg xmlns="http://www.w3.org/2000/svg" width="4" height="4"/>\n')
+
+
+def test_content_check_drops_misnamed_files(tmp_path):
+    _png(tmp_path / "vera.png")
+    _png(tmp_path / "png_chiamata.jpg")  # wrong extension but a real image: kept
+    (tmp_path / "finta.png").write_bytes(b"<html><body>404</body></html>")
+    (tmp_path / "vuota.webp").write_bytes(b"")
+    (tmp_path / "lunga.svg").write_bytes(SVG_PROLOGO_LUNGO)
+    (tmp_path / "prefisso.svg").write_bytes(b'<svg:svg xmlns:svg="http://www.w3.org/2000/svg"/>')
+    (tmp_path / "pagina.svg").write_bytes(b'<!-- <svg> --><html><svg/></html>')
+
+    tutti = _relativi(tmp_path, core.scansiona_cartelle([str(tmp_path)]))
+    assert len(tutti) == 7
+    verificati = _relativi(tmp_path, core.scansiona_cartelle([str(tmp_path)], verifica_contenuto=True))
+    assert verificati == ["lunga.svg", "png_chiamata.jpg", "prefisso.svg", "vera.png"]
@@ -0,0 +1,114 @@
+# rembg session pool: sessions keyed by model, provider and thread count and
+# created without blocking other keys, the optimized graph cached for the next
+# session, and errors naming the failed step.
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import core
+
+
+def test_explicit_thread_count_gets_its_own_session(modello_u2net):
+    automatica = core.get_sessione("u2net", "cpu", lambda msg: None, jobs=1)
+    thread = core._thread_inferenza(1) + 1
+    esplicita = core.get_sessione("u2net", "cpu", lambda msg: None, thread=thread)
+    assert esplicita is not automatica
+    assert core.get_sessione("u2net", "cpu", lambda msg: None, jobs=5, thread=thread) is esplicita
+    assert ("u2net", "cpu", thread) in core._sessioni
+
+
+def test_optimized_graph_is_written_apart_and_reloaded_through_rembg(modello_u2net):
+    from rembg.sessions.u2net import U2netSession
+    from rembg.sessions.u2net_custom import U2netCustomSession
+
+    prima = core.get_sessione("u2net", "cpu", lambda msg: None, jobs=1)
+    assert isinstance(prima, U2netSession)
+    derivati = modello_u2net / "rembgexporter-graphs"
+    assert [p.name for p in derivati.iterdir()] == [os.path.basename(core._percorso_ottimizzato("u2net", "cpu"))]
+    assert sorted(p.name for p in modello_u2net.iterdir()) == ["rembgexporter-graphs", "u2net.onnx"]
+
+    core.libera_sessioni()
+    ricaricata = core.get_sessione("u2net", "cpu", lambda msg: None, jobs=1)
+    assert isinstance(ricaricata, U2netCustomSession)
+    tensore = np.random.default_rng(0).random((1, 3, 320, 320), dtype=np.float32)
+    assert np.allclose(core._inferenza_batch(prima, tensore), core._inferenza_batch(ricaricata, tensore), atol=1e-5)
+
+
+def test_cache_lookups_and_cleanup_match_exact_model_names(modello_u2net):
+    derivati = modello_u2net / "rembgexporter-graphs"
+    derivati.mkdir()
+    altri = [modello_u2net / "u2netp.onnx", modello_u2net / "u2net_human_seg.onnx",
+             derivati / "u2net-int8.onnx", derivati / "u2net_human_seg.cpu.ort-1.opt.onnx"]
+    for path in altri + [derivati / "u2net.cpu.ort-1.opt.onnx"]:
+        path.write_bytes(b"x")
+    (modello_u2net / "u2net.onnx").unlink()
+    core.aggiorna_capacita()
+    assert not core._modello_in_cache("u2net")
+    assert core._modello_in_cache("u2net-int8") and core._modello_in_cache("u2net_human_seg")
+    assert not core._modello_in_cache("isnet-general-use-int8")
+
+    core._pulisci_cache_corrotta("u2net")
+    assert all(path.exists() for path in altri)
+    assert not (derivati / "u2net.cpu.ort-1.opt.onnx").exists()
+
+
+def test_failures_name_the_step_that_failed(modello_u2net, monkeypatch):
+    def _senza_onnx(modello):
+        raise ImportError("No module named 'onnx'")
+
+    monkeypatch.setattr(core, "_modello_int8", _senza_onnx)
+    with pytest.raises(RuntimeError, match="INT8 quantization of model 'u2net' failed") as errore:
+        core.get_sessione("u2net-int8", "cpu", lambda msg: None, jobs=1)
+    assert "internet" not in str(errore.value)
+    assert (modello_u2net / "u2net.onnx").exists()
+
+    (modello_u2net / "u2net.onnx").write_bytes(b"not an onnx graph")
+    with pytest.raises(RuntimeError, match="Loading model 'u2net' on CPU failed") as errore:
+        core.get_sessione("u2net", "cpu", lambda msg: None, jobs=1)
+    assert "internet" not in str(errore.value)
+    assert (modello_u2net / "u2net.onnx").exists()  # a provider or build error must not delete the download
+
+
+def test_failed_download_points_at_the_network(cache_modelli, monkeypatch):
+    def _offline(modello):
+        raise OSError("connection refused")
+
+    monkeypatch.setattr(core, "_scarica_modello", _offline)
+    with pytest.raises(RuntimeError, match="Model download 'u2net' failed .*internet"):
+        core.get_sessione("u2net-int8", "cpu", lambda msg: None, jobs=1)
+
+
+def test_slow_creation_only_blocks_callers_of_the_same_session(monkeypatch):
+    avviata, sblocca = threading.Event(), threading.Event()
+    create = []
+
+    def _lenta(modello, provider, log_fn, thread):
+        create.append(modello)
+        if modello == "lento":
+            avviata.set()
+            assert sblocca.wait(10)
+        return object()
+
+    monkeypatch.setattr(core, "_crea_sessione", _lenta)
+    monkeypatch.setattr(core, "_dimensione_modello_mb", lambda modello: 0)
+    core.libera_sessioni()
+    pronta = core.get_sessione("pronto", "cpu", lambda msg: None, thread=1)
+
+    ottenute = []
+    lenti = [threading.Thread(target=lambda: ottenute.append(core.get_sessione("lento", "cpu", None, thread=1)))
+             for _ in range(2)]
+    for t in lenti:
+        t.start()
+    assert avviata.wait(10)
+    # the cached session and a new one are served while "lento" is still being created
+    assert core.get_sessione("pronto", "cpu", lambda msg: None, thread=1) is pronta
+    core.get_sessione("altro", "cpu", lambda msg: None, thread=1)
+    sblocca.set()
+    for t in lenti:
+        t.join(10)
+
+    assert len(ottenute) == 2 and ottenute[0] is ottenute[1]
+    assert create == ["pronto", "lento", "altro"]
+    core.libera_sessioni()
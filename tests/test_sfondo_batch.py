@@ -0,0 +1,90 @@
+# Batched background removal must give the same pixels as rembg's own
+# per-image path (rimuovi_sfondo → rembg.remove → session.predict), and the
+# decode/inference pipeline must wind down when its consumer stops early.
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+import core
+
+
+def _immagine(w: int, h: int, modo: str = 'RGB') -> Image.Image:
+    x = np.linspace(0, 255, w, dtype=np.float32)[None, :]
+    y = np.linspace(255, 0, h, dtype=np.float32)[:, None]
+    rgb = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=2).astype(np.uint8)
+    return Image.fromarray(rgb).convert(modo)
+
+
+def _differenza(a: Image.Image, b: Image.Image) -> int:
+    assert a.size == b.size and a.mode == b.mode == 'RGBA'
+    return int(np.abs(np.asarray(a, dtype=np.int16) - np.asarray(b, dtype=np.int16)).max())
+
+
+def test_batch_matches_per_image_path(modello_u2net, monkeypatch):
+    monkeypatch.setattr(core, "CACHE_RISULTATI_MB", 0)
+    immagini = [_immagine(320, 320), _immagine(200, 150, 'RGBA'), _immagine(64, 300), _immagine(900, 500)]
+    batch = core.rimuovi_sfondo_batch(immagini, "u2net", lambda msg: None, dimensione_batch=3)
+    singole = [core.rimuovi_sfondo(img, "u2net", lambda msg: None) for img in immagini]
+    for a, b in zip(batch, singole):
+        # float32 vs float64 normalization: at most one level of rounding apart
+        assert _differenza(a, b) <= 1
+
+
+def test_odd_image_fails_alone_in_pipeline(modello_u2net, monkeypatch):
+    monkeypatch.setattr(core, "CACHE_RISULTATI_MB", 0)
+    immagini = {"a.png": _immagine(100, 80), "vuota.png": Image.new('RGB', (0, 0)), "b.png": _immagine(60, 90)}
+    risultati = list(core._sfondi_rimossi_pipeline(
+        list(immagini), immagini.get, "u2net", lambda msg: None, "cpu", dimensione_batch=4))
+    assert [path for path, _, _ in risultati] == list(immagini)
+    esiti = {path: (img, errore) for path, img, errore in risultati}
+    assert esiti["vuota.png"][0] is None and esiti["vuota.png"][1] is not None
+    for path in ("a.png", "b.png"):
+        img, errore = esiti[path]
+        assert errore is None and img.size == immagini[path].size
+
+
+def test_closing_pipeline_early_stops_its_threads(monkeypatch):
+    monkeypatch.setattr(core, "rimuovi_sfondo_batch", lambda immagini, *args, **kwargs: list(immagini))
+    percorsi = [f"{i}.png" for i in range(200)]
+    pipeline = core._sfondi_rimossi_pipeline(
+        percorsi, lambda path: _immagine(8, 8), "u2net", lambda msg: None, "cpu", dimensione_batch=2)
+    assert next(pipeline)[0] == "0.png"
+    pipeline.close()
+
+    scadenza = time.time() + 5
+    while time.time() < scadenza and any(t.name.startswith("pipeline-") for t in threading.enumerate()):
+        time.sleep(0.05)
+    assert not [t.name for t in threading.enumerate() if t.name.startswith("pipeline-")]
+
+
+def _gradino(lato: int, bordo: int) -> Image.Image:
+    guida = np.full((lato, lato), 40, dtype=np.uint8)
+    guida[:, bordo:] = 220
+    return Image.fromarray(guida).convert('RGB')
+
+
+def test_guided_filter_snaps_mask_edge_to_image_edge():
+    lato, bordo = 1280, 643  # edge not on the 4 px grid of the 320 px mask
+    centri = (np.arange(320) + 0.5) * lato / 320
+    sfumata = 1 / (1 + np.exp(-(centri - bordo) / 6))
+    maschera = Image.fromarray((np.tile(sfumata, (320, 1)) * 255).astype(np.uint8))
+
+    riga = np.asarray(core._filtro_guidato_veloce(_gradino(lato, bordo), maschera), dtype=np.int16)[lato // 2]
+    salti = np.diff(riga)
+    assert int(np.argmax(salti)) + 1 == bordo
+    assert salti.max() >= 80  # one-pixel step where LANCZOS spreads it over ~20 px
+    lanczos = np.asarray(maschera.resize((lato, lato), Image.Resampling.LANCZOS), dtype=np.int16)[lato // 2]
+    assert np.diff(lanczos).max() < 20
+    # away from the edge the mask is kept
+    assert riga[:500].max() <= 1 and riga[800:].min() >= 253
+
+
+def test_guided_filter_leaves_flat_regions_unchanged():
+    guida = Image.new('RGB', (900, 700), (120, 130, 140))
+    for valore in (0, 77, 255):
+        maschera = Image.new('L', (320, 320), valore)
+        risultato = np.asarray(core._filtro_guidato_veloce(guida, maschera), dtype=np.int16)
+        assert risultato.shape == (700, 900)
+        assert np.abs(risultato - valore).max() <= 1
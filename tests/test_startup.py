@@ -0,0 +1,37 @@
+# Cold-start budget for core: importing it must stay cheap and must not pull
+# in the heavy dependencies, which are loaded on first use (or in the
+# background by the GUI, see core.precarica_moduli).
+import json
+import os
+import subprocess
+import sys
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous for slow CI machines; a heavy eager import (rembg/onnxruntime) costs seconds
+BUDGET_IMPORT_CORE_S = float(os.environ.get("REMBGEXPORTER_IMPORT_BUDGET_S", "1.0"))
+
+_SONDA = """
+import json, sys, time
+t0 = time.perf_counter()
+import core
+secondi = time.perf_counter() - t0
+pesanti = [m for m in core.MODULI_PESANTI + ("multiprocessing", "tkinter", "customtkinter") if m in sys.modules]
+print(json.dumps({"secondi": secondi, "pesanti": pesanti}))
+"""
+
+
+def _import_a_freddo() -> dict:
+    risultato = subprocess.run([sys.executable, "-c", _SONDA], cwd=RADICE, capture_output=True,
+                               text=True, check=True)
+    return json.loads(risultato.stdout)
+
+
+def test_import_core_does_not_load_heavy_modules():
+    assert _import_a_freddo()["pesanti"] == []
+
+
+def test_import_core_within_budget():
+    # Best of three, to keep a busy machine from failing the test
+    secondi = min(_import_a_freddo()["secondi"] for _ in range(3))
+    assert secondi < BUDGET_IMPORT_CORE_S, f"import core took {secondi:.3f}s (budget {BUDGET_IMPORT_CORE_S}s)"
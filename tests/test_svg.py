@@ -0,0 +1,60 @@
+# SVG inputs are rendered to 512×512 in every mode that decodes with Pillow,
+# not only in the ICO and favicon pipelines.
+import importlib.util
+import io
+import shutil
+
+import pytest
+from PIL import Image
+
+import core
+
+SVG = ('<svg xmlns="http://www.w3.org/2000/svg" width="64" height="64">'
+       '<rect width="64" height="64" fill="#2b6cb0"/><circle cx="32" cy="32" r="20" fill="#f6ad55"/></svg>')
+
+
+@pytest.fixture(autouse=True)
+def _pool_pulito():
+    yield
+    core.libera_pool()
+
+
+@pytest.fixture
+def svg(tmp_path, monkeypatch):
+    if importlib.util.find_spec("svglib") is None:
+        # stand-in rasterizer: what matters here is that the modes call it
+        monkeypatch.setattr(core, "_render_svg_to_png",
+                            lambda path: Image.new('RGBA', (512, 512), (43, 108, 176, 255)))
+    path = tmp_path / "vettoriale.svg"
+    path.write_text(SVG, encoding="utf-8")
+    return str(path)
+
+
+def test_format_with_background_removal_reads_svg(svg, modello_u2net, tmp_path):
+    uscita = tmp_path / "out"
+    uscita.mkdir()
+    risultati = core.converti_formato_batch([svg], 'png', 85, str(uscita), lambda msg: None,
+                                            rimuovi_bg=True, modello="u2net", jobs=1, usa_cache=False)
+    assert [r['status'] for r in risultati] == ['ok'], risultati
+    with Image.open(uscita / "vettoriale.png") as img:
+        assert img.size == (512, 512) and img.mode == 'RGBA'
+
+
+@pytest.mark.skipif(not (shutil.which("magick") or shutil.which("convert")), reason="ImageMagick not installed")
+def test_appstore_reads_svg(svg, tmp_path):
+    uscita = tmp_path / "out"
+    uscita.mkdir()
+    risultati = core.genera_app_store_icons_batch([svg], 'google', str(uscita), lambda msg: None, jobs=1)
+    assert [r['status'] for r in risultati] == ['ok'], risultati
+    with Image.open(next(uscita.rglob("play_store_512.png"))) as img:
+        assert img.size == (512, 512)
+
+
+def test_appstore_task_renders_svg_before_imagemagick(svg, tmp_path, monkeypatch):
+    ricevuti = []
+    monkeypatch.setattr(core, "_esegui_magick",
+                        lambda argomenti, dati=None, magick_path=None: ricevuti.append(dati))
+    core._app_store_compito(svg, str(tmp_path), "1/1", "google", [(512, 512, "play_store_512.png")], None,
+                            lambda msg: None)
+    with Image.open(io.BytesIO(ricevuti[0])) as img:
+        assert img.size == (512, 512)